@@ -0,0 +1,117 @@
+"""Measurement and baseline helpers shared by the benchmark scripts."""
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+import psutil
+
+
+class PeakMemory:
+    """Sample the process RSS in a background thread and keep the peak."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def rss_mb(self) -> float:
+        return self.process.memory_info().rss / (1024 * 1024)
+
+    def __enter__(self):
+        self.start_mb = self.peak_mb = self.rss_mb()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, self.rss_mb())
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, self.rss_mb())
+
+
+@contextmanager
+def measure(result: dict, tokens: int = 0):
+    """Fill `result` with seconds, CPU seconds, peak RSS, peak RSS growth and tokens/s of the block."""
+    with PeakMemory() as memory:
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        yield result
+        seconds = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+    result.update({
+        "seconds": round(seconds, 4),
+        "cpu_seconds": round(cpu, 4),
+        "peak_rss_mb": round(memory.peak_mb, 1),
+        "peak_delta_mb": round(memory.peak_mb - memory.start_mb, 1),
+        "tokens_per_s": round(tokens / seconds, 1) if tokens and seconds > 0 else None,
+    })
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=False,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save(path: str, report: dict) -> None:
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.25, min_seconds: float = 0.05) -> list:
+    """
+    Return a row per measurement present in both reports.
+
+    A row is a regression when it got more than `tolerance` slower and the
+    baseline took at least `min_seconds` (shorter timings are mostly noise).
+    """
+    rows = []
+    for size, stages in current.get("results", {}).items():
+        for stage, result in stages.items():
+            before = baseline.get("results", {}).get(size, {}).get(stage)
+            if not before or not before.get("seconds"):
+                continue
+            ratio = result["seconds"] / before["seconds"]
+            rows.append({
+                "size": size,
+                "stage": stage,
+                "baseline_seconds": before["seconds"],
+                "seconds": result["seconds"],
+                "ratio": round(ratio, 3),
+                "regression": ratio > 1 + tolerance and before["seconds"] >= min_seconds,
+            })
+    return rows
+
+
+def print_comparison(rows: list) -> None:
+    print(f"{'size':>8} {'stage':<32} {'baseline':>10} {'current':>10} {'change':>8}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(
+            f"{row['size']:>8} {row['stage']:<32} {row['baseline_seconds']:>10.3f} "
+            f"{row['seconds']:>10.3f} {row['ratio'] - 1:>+8.1%}{flag}"
+        )
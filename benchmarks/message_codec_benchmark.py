@@ -0,0 +1,171 @@
+"""
+Benchmark supervisor message passing per codec and payload size.
+
+Every run sends a batch of messages from one process to another through a
+relay playing the supervisor, over the same multiprocessing Pipes the
+workers use. The relay decodes only the routing header and forwards the
+frame, like Supervisor._start_listener does. "legacy" is the old path:
+json.dumps in the sender, json.loads in the supervisor and a pickled dict
+to the receiver. "pickle+shm" passes the payload through shared memory
+and the relay unlinks each segment when the receiver acknowledges it.
+Payloads are lists of synthetic tweets:
+
+    python benchmarks/message_codec_benchmark.py --sizes 10kb,1mb,10mb --output codecs.json
+    python benchmarks/message_codec_benchmark.py --compare codecs.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from common import compare, environment, print_comparison, save
+from synthetic_tweets import generate_tweets
+from utils.handleMessage import (
+    decodeHeader, encodeMessage, msgpack, receiveMessage, releaseSegment, setSharedMemoryThreshold
+)
+
+UNITS = {"kb": 1024, "mb": 1024 * 1024}
+
+
+def parse_bytes(value: str) -> int:
+    value = value.lower()
+    for unit, factor in UNITS.items():
+        if value.endswith(unit):
+            return int(float(value[:-len(unit)]) * factor)
+    return int(value)
+
+
+def build_payload(size: int, seed: int) -> dict:
+    """Synthetic tweets adding up to roughly `size` bytes of JSON."""
+    sample = generate_tweets(200, seed)
+    per_tweet = len(json.dumps(sample)) / len(sample)
+    # distinct tweets, so pickle's memo cannot shortcut repeated objects
+    return {"keyword": "benchmark", "raw_tweets": generate_tweets(max(1, int(size / per_tweet)), seed)}
+
+
+def message_for(data: dict, index: int) -> dict:
+    return {
+        "messageId": str(index),
+        "status": "completed",
+        "reason": "",
+        "destination": ["PreprocessingWorker/run_preprocessing/benchmark"],
+        "data": data,
+    }
+
+
+def split_codec(codec: str):
+    name, _, transport = codec.partition("+")
+    return name, transport == "shm"
+
+
+def sender(conn, codec: str, size: int, seed: int, count: int):
+    data = build_payload(size, seed)
+    codec, shared = split_codec(codec)
+    # everything but the smallest payloads goes through shared memory
+    setSharedMemoryThreshold(1024 if shared else 0)
+    conn.recv_bytes()  # start signal
+    for index in range(count):
+        message = message_for(data, index)
+        if codec == "legacy":
+            conn.send(json.dumps(message))
+        else:
+            conn.send_bytes(encodeMessage(message, codec))
+    conn.close()
+
+
+def receiver(conn, codec: str, count: int, done):
+    for _ in range(count):
+        message = conn.recv() if codec == "legacy" else receiveMessage(conn)
+        assert message["data"]["raw_tweets"]
+    done.send(time.perf_counter())
+    conn.close()
+
+
+def run(codec: str, size: int, seed: int, count: int) -> dict:
+    context = multiprocessing.get_context("spawn")
+    to_supervisor, worker_a = context.Pipe()
+    to_receiver, worker_b = context.Pipe()
+    done_parent, done_child = context.Pipe()
+    processes = [
+        context.Process(target=sender, args=(worker_a, codec, size, seed, count)),
+        context.Process(target=receiver, args=(worker_b, codec, count, done_child)),
+    ]
+    for process in processes:
+        process.start()
+
+    def release():
+        # acknowledgements come back on the receiver's pipe, like they reach the supervisor's listener
+        for _ in range(count):
+            for name in decodeHeader(to_receiver.recv_bytes()).get("release", []):
+                releaseSegment(name)
+
+    releaser = threading.Thread(target=release, daemon=True)
+    if split_codec(codec)[1]:
+        releaser.start()
+
+    start = time.perf_counter()
+    to_supervisor.send_bytes(b"go")
+    for _ in range(count):
+        if codec == "legacy":
+            message = json.loads(to_supervisor.recv())
+            to_receiver.send(message)
+        else:
+            frame = to_supervisor.recv_bytes()
+            decodeHeader(frame)
+            to_receiver.send_bytes(frame)
+    finished = done_parent.recv()
+    if releaser.ident:
+        releaser.join()
+    for process in processes:
+        process.join()
+    # perf_counter is system-wide on Linux, so the receiver's clock is comparable
+    seconds = finished - start
+    return {
+        "seconds": round(seconds, 4),
+        "messages_per_s": round(count / seconds, 1),
+        "mb_per_s": round(count * size / seconds / (1024 * 1024), 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark supervisor message codecs by payload size")
+    parser.add_argument("--sizes", default="10kb,1mb,10mb", help="comma separated payload sizes, e.g. 10kb,1mb,10mb")
+    parser.add_argument("--codecs", default="legacy,pickle,pickle+shm,json,msgpack")
+    parser.add_argument("--messages", type=int, default=0, help="messages per run, by default about 100MB worth (at least 5)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    codecs = [codec for codec in args.codecs.split(",") if codec and (codec != "msgpack" or msgpack is not None)]
+    report = {"meta": {**environment(), "seed": args.seed}, "results": {}}
+    for value in [value for value in args.sizes.split(",") if value]:
+        size = parse_bytes(value)
+        count = args.messages or max(5, min(2000, (100 * 1024 * 1024) // size))
+        results = report["results"].setdefault(value, {})
+        for codec in codecs:
+            results[codec] = run(codec, size, args.seed, count)
+            result = results[codec]
+            print(f"{value:>8} {codec:<10} {count:>5} msgs {result['seconds']:>8.3f}s "
+                  f"{result['messages_per_s']:>10,.1f} msg/s {result['mb_per_s']:>8,.1f} MB/s")
+
+    if args.output:
+        save(args.output, report)
+        print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            rows = compare(json.load(file), report, args.tolerance)
+        print_comparison(rows)
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
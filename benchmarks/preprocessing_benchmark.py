@@ -0,0 +1,150 @@
+"""
+Benchmark every PreprocessingWorker stage and the full run_preprocessing path.
+
+Augmentation is answered in-process with the same replies as the offline
+stub server (src/utils/llmStubServer.py), or by a running stub when
+--llm-endpoint is given, so only our own code is measured. Results (time,
+CPU time, peak RSS and input tokens per second) are written as a JSON
+baseline that later runs can be compared against:
+
+    python benchmarks/preprocessing_benchmark.py --sizes 1k,10k --output baseline.json
+    python benchmarks/preprocessing_benchmark.py --sizes 1k,10k --compare baseline.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from common import compare, environment, measure, print_comparison, save
+from synthetic_tweets import generate_tweets, parse_size
+from utils.llmStubServer import augmentation_reply, explanation_reply
+from workers.PreprocessingWorker import PreprocessingWorker
+
+
+class InProcessLLM:
+    """Async chat-completions client answering like the stub server, without HTTP."""
+
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=self)
+        self.calls = 0
+
+    async def create(self, messages, response_format=None, **kwargs):
+        self.calls += 1
+        prompt = messages[-1]["content"]
+        json_mode = (response_format or {}).get("type") == "json_object"
+        content = augmentation_reply(prompt, json_mode) or explanation_reply(prompt, random.Random(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def build_worker(dataset_root: str, llm_endpoint: str = None) -> PreprocessingWorker:
+    worker = PreprocessingWorker()
+    worker.setup({
+        "azure": {
+            "endpoint": llm_endpoint or "http://127.0.0.1:9",
+            "api_key": "benchmark",
+            "api_version": "2024-10-21",
+            "model": {"completion": "benchmark"},
+        },
+        "chunk_size": 2000,
+    })
+    if not llm_endpoint:
+        worker.async_client = InProcessLLM()
+    worker.dataset_root = dataset_root
+    worker.sent = []
+    worker.sendToOtherWorker = lambda **message: worker.sent.append(message)
+    return worker
+
+
+def bench_stages(worker: PreprocessingWorker, tweets: list, dataset_root: str) -> dict:
+    results = {}
+    texts = [tweet["full_text"] for tweet in tweets]
+    tokens = sum(len(text.split()) for text in texts)
+
+    with measure(results.setdefault("dedup", {}), tokens):
+        worker.deduplicator.cluster(texts)
+    with measure(results.setdefault("formality", {}), tokens):
+        [worker.formality.needs_rewrite(text) for text in texts]
+
+    data = texts
+    for stage, step in worker.pipeline_stages():
+        with measure(results.setdefault(stage, {}), tokens):
+            data = step(data)
+    with measure(results.setdefault("curating_stopword", {}), tokens):
+        worker.curating_stopword(data)
+    with measure(results.setdefault("stopword_removal", {}), tokens):
+        data = worker.stopword_removal(data)
+    documents = [document for document in data if document]
+    with measure(results.setdefault("build_dataset", {}), tokens):
+        worker.build_dataset(documents, os.path.join(dataset_root, "stages"))
+    return results
+
+
+def bench_full(worker: PreprocessingWorker, tweets: list) -> dict:
+    result = {}
+    tokens = sum(len(tweet["full_text"].split()) for tweet in tweets)
+    data = {"tweets": tweets, "keyword": "benchmark", "start_date": "2024-01-01", "end_date": "2024-01-31"}
+    with measure(result, tokens):
+        asyncio.run(worker.run_preprocessing(id="benchmark", data=data, message={"messageId": "benchmark"}))
+    sent = worker.sent[-1]["data"] if worker.sent else {}
+    result["documents"] = len(sent.get("tweets", []))
+    result["llm_calls"] = getattr(worker.async_client, "calls", None)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the preprocessing pipeline on synthetic tweets")
+    parser.add_argument("--sizes", default="1k,10k", help="comma separated: 1k, 10k, 100k, 1m or numbers")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a stage counts as a regression")
+    parser.add_argument("--repeat", type=int, default=1, help="run each size this many times and keep the fastest run of every stage")
+    parser.add_argument("--skip-stages", action="store_true", help="only run the full run_preprocessing path")
+    parser.add_argument("--skip-full", action="store_true", help="only run the individual stages")
+    parser.add_argument("--llm-endpoint", help="URL of a running llmStubServer instead of the in-process stub")
+    parser.add_argument("--verbose", action="store_true", help="show the worker's own log output")
+    args = parser.parse_args(argv)
+
+    report = {"meta": {**environment(), "seed": args.seed}, "results": {}}
+    with tempfile.TemporaryDirectory() as dataset_root:
+        for size in [parse_size(value) for value in args.sizes.split(",") if value]:
+            tweets = generate_tweets(size, args.seed)
+            results = {}
+            for _ in range(max(1, args.repeat)):
+                run = {}
+                with contextlib.ExitStack() as stack:
+                    if not args.verbose:
+                        stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+                    if not args.skip_stages:
+                        run.update(bench_stages(build_worker(dataset_root, args.llm_endpoint), tweets, dataset_root))
+                    if not args.skip_full:
+                        run["run_preprocessing"] = bench_full(build_worker(dataset_root, args.llm_endpoint), tweets)
+                for stage, result in run.items():
+                    if stage not in results or result["seconds"] < results[stage]["seconds"]:
+                        results[stage] = result
+            report["results"][str(size)] = results
+            for stage, result in results.items():
+                rate = f"{result['tokens_per_s']:>12,.0f} tok/s" if result.get("tokens_per_s") else ""
+                print(f"{size:>8} {stage:<32} {result['seconds']:>9.3f}s {result['peak_delta_mb']:>+8.1f}MB {rate}")
+
+    if args.output:
+        save(args.output, report)
+        print(f"Wrote {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            rows = compare(json.load(file), report, args.tolerance)
+        print_comparison(rows)
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
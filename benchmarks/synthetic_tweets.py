@@ -0,0 +1,161 @@
+"""
+Synthetic Indonesian tweet corpora for the preprocessing benchmarks.
+
+Tweets are drawn from topic-specific word pools built on Sastrawi's root
+words, with affixes, kbba.txt slang, elongated letters, emoticons, URLs,
+mentions, hashtags, a little English, retweets and exact copies, so every
+preprocessing stage has real work to do. Output is deterministic per seed.
+
+    python benchmarks/synthetic_tweets.py --size 10000 --output tweets.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+from datetime import datetime, timedelta
+
+SIZES = {"1k": 1000, "10k": 10000, "100k": 100000, "1m": 1000000}
+KBBA_PATH = os.path.join(os.path.dirname(__file__), '..', 'src', 'utils', 'kbba.txt')
+
+PREFIXES = ["me", "mem", "men", "meng", "di", "ber", "ter", "pe", "pen", "se", "ke"]
+SUFFIXES = ["kan", "an", "nya", "i", "lah", "kah"]
+EMOTICONS = [":)", ":-)", ":(", ":D", ";)", ":P", ":O", ":/", "<3", ":*", "=)"]
+ENGLISH = ["the", "is", "and", "really", "good", "bad", "people", "what", "this", "so", "just"]
+FALLBACK_WORDS = [
+    "harga", "naik", "turun", "rakyat", "pemerintah", "jalan", "rumah", "makan", "kerja", "uang",
+    "sekolah", "banjir", "hujan", "pasar", "beras", "minyak", "listrik", "air", "kota", "desa",
+]
+
+
+def load_slang(path: str = KBBA_PATH) -> list:
+    with open(path, 'r', encoding='utf-8') as file:
+        rows = [line.rstrip('\n').split('\t') for line in file]
+    return [row[0] for row in rows if len(row) == 2 and row[0].isalpha()]
+
+
+def load_root_words() -> list:
+    try:
+        from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+        words = [word for word in StemmerFactory().get_words() if word.isalpha() and 3 <= len(word) <= 10]
+        return sorted(words) or FALLBACK_WORDS
+    except ImportError:
+        return FALLBACK_WORDS
+
+
+class TweetGenerator:
+    """Deterministic generator of raw tweet documents shaped like the ones DatabaseInteractionWorker returns."""
+
+    def __init__(self, seed: int = 42, topics: int = 12, words_per_topic: int = 80, start: datetime = datetime(2024, 1, 1)):
+        self.rng = random.Random(seed)
+        roots = load_root_words()
+        self.slang = load_slang()
+        self.topics = [self.rng.sample(roots, min(words_per_topic, len(roots))) for _ in range(topics)]
+        self.common = self.rng.sample(roots, min(300, len(roots)))
+        self.users = [f"user{''.join(self.rng.choices(string.ascii_lowercase, k=6))}" for _ in range(5000)]
+        self.start = start
+        self.history = []
+
+    def word(self, topic: list) -> str:
+        rng = self.rng
+        # a skewed pick so every topic has frequent and rare words
+        pool = topic if rng.random() < 0.7 else self.common
+        word = pool[min(len(pool) - 1, int(rng.paretovariate(1.2)) - 1)] if rng.random() < 0.5 else rng.choice(pool)
+        roll = rng.random()
+        if roll < 0.15:
+            word = rng.choice(PREFIXES) + word
+        elif roll < 0.3:
+            word = word + rng.choice(SUFFIXES)
+        elif roll < 0.5 and self.slang:
+            word = rng.choice(self.slang)
+        return word
+
+    def text(self) -> str:
+        rng = self.rng
+        topic = rng.choice(self.topics)
+        words = [self.word(topic) for _ in range(rng.randint(6, 24))]
+        if rng.random() < 0.1:
+            index = rng.randrange(len(words))
+            word = words[index]
+            words[index] = word + word[-1] * rng.randint(2, 6)
+        if rng.random() < 0.05:
+            index = rng.randrange(len(words))
+            words[index:index] = rng.sample(ENGLISH, 3)
+        if rng.random() < 0.3:
+            words[0] = words[0].capitalize()
+        if rng.random() < 0.4:
+            words.insert(0, "@" + rng.choice(self.users))
+        if rng.random() < 0.15:
+            words.append("#" + rng.choice(topic))
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(EMOTICONS))
+        text = " ".join(words)
+        if rng.random() < 0.5:
+            text += rng.choice([".", "!", "?", "!!", "...", ","])
+        if rng.random() < 0.3:
+            text += " https://t.co/" + "".join(rng.choices(string.ascii_letters + string.digits, k=10))
+        return text
+
+    def tweet(self, index: int) -> dict:
+        rng = self.rng
+        roll = rng.random()
+        if self.history and roll < 0.1:
+            # retweet of an earlier tweet
+            text = f"RT @{rng.choice(self.users)}: " + rng.choice(self.history)
+        elif self.history and roll < 0.13:
+            text = rng.choice(self.history)
+        else:
+            text = self.text()
+            if len(self.history) < 5000:
+                self.history.append(text)
+            else:
+                self.history[rng.randrange(5000)] = text
+        created = self.start + timedelta(seconds=rng.randrange(30 * 24 * 3600))
+        username = rng.choice(self.users)
+        return {
+            "full_text": text,
+            "username": username,
+            "tweet_url": f"https://x.com/{username}/status/{1700000000000000000 + index}",
+            "created_at": created.strftime("%a %b %d %H:%M:%S +0000 %Y"),
+        }
+
+    def __iter__(self):
+        index = 0
+        while True:
+            yield self.tweet(index)
+            index += 1
+
+
+def iter_tweets(size: int, seed: int = 42):
+    generator = iter(TweetGenerator(seed=seed))
+    for _ in range(size):
+        yield next(generator)
+
+
+def generate_tweets(size: int, seed: int = 42) -> list:
+    return list(iter_tweets(size, seed))
+
+
+def parse_size(value: str) -> int:
+    return SIZES.get(value.lower()) or int(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic Indonesian tweet corpus as JSON lines")
+    parser.add_argument("--size", default="1k", help="1k, 10k, 100k, 1m or a number")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="-", help="file path, - for stdout")
+    args = parser.parse_args(argv)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        for tweet in iter_tweets(parse_size(args.size), args.seed):
+            output.write(json.dumps(tweet, ensure_ascii=False) + "\n")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,127 @@ azure={
     }
 }
 
+preprocessing = {
+    "chunk_size": int(os.getenv("PREPROCESSING_CHUNK_SIZE", 2000)),
+    # 0 disables the ceiling
+    "memory_limit_mb": int(os.getenv("PREPROCESSING_MEMORY_LIMIT_MB", 0)),
+    # projects preprocessed at the same time by one worker
+    "max_concurrent_jobs": int(os.getenv("PREPROCESSING_MAX_CONCURRENT_JOBS", 2)),
+    # default cap on unique tweets per project when the request has none, 0 keeps everything
+    "max_documents": int(os.getenv("PREPROCESSING_MAX_DOCUMENTS", 0)),
+}
+
+messaging = {
+    # payload codec of supervisor/worker messages: pickle (protocol 5), msgpack or json
+    "codec": os.getenv("MESSAGE_CODEC", "pickle"),
+    # payloads above this many bytes go through shared memory instead of the pipe, 0 disables it
+    "shm_threshold": int(os.getenv("MESSAGE_SHM_THRESHOLD", 1024 * 1024)),
+}
+
+routing = {
+    # how messages are spread over several instances of a worker type:
+    # least_outstanding, round_robin or sticky (same project id, same instance)
+    "strategy": os.getenv("ROUTING_STRATEGY", "least_outstanding"),
+    # messages waiting for credit per worker type before new ones are dropped
+    "queue_size": int(os.getenv("MESSAGE_QUEUE_SIZE", 10000)),
+}
+
+pending = {
+    # append-only log of messages not finished by a worker, replayed when the supervisor starts; empty keeps them in memory only
+    "wal_path": os.getenv("PENDING_WAL_PATH", "./cache/pending.wal"),
+    # fsync every record to survive a host crash, not only a supervisor crash
+    "fsync": os.getenv("PENDING_WAL_FSYNC", "false").lower() == "true",
+    # deliveries of a message before it is dropped when its worker keeps dying or stalling on it, 0 retries forever
+    "max_attempts": int(os.getenv("PENDING_MAX_ATTEMPTS", 3)),
+}
+
+health = {
+    # seconds between worker heartbeats, 0 turns them off
+    "heartbeat_interval": float(os.getenv("HEARTBEAT_INTERVAL", 0.5)),
+    # a worker whose last heartbeat is older than this is restarted; a long pickle or C call holding
+    # the GIL keeps the heartbeat thread from running, so leave room for several seconds of it
+    "heartbeat_deadline": float(os.getenv("HEARTBEAT_DEADLINE", 30)),
+    # time a new worker has to send its first heartbeat
+    "startup_deadline": float(os.getenv("WORKER_STARTUP_DEADLINE", 60)),
+    # a worker on the same message for longer, without reporting progress for as long, gets no new messages
+    # and is restarted once the others are done, 0 disables it
+    "stall_deadline": float(os.getenv("WORKER_STALL_DEADLINE", 3600)),
+}
+
+autoscaling = {
+    "enabled": os.getenv("AUTOSCALE_ENABLED", "true").lower() == "true",
+    # seconds between scaling decisions
+    "interval": float(os.getenv("AUTOSCALE_INTERVAL", 2)),
+    # (minimum, maximum) instances; ETMWorker already fits its topic counts on every core
+    "limits": {
+        "PreprocessingWorker": (int(os.getenv("PREPROCESSING_WORKER_MIN", 1)), int(os.getenv("PREPROCESSING_WORKER_MAX") or os.cpu_count() or 1)),
+        "ETMWorker": (int(os.getenv("ETM_WORKER_MIN", 1)), int(os.getenv("ETM_WORKER_MAX", 2))),
+        "LLMWorker": (int(os.getenv("LLM_WORKER_MIN", 1)), int(os.getenv("LLM_WORKER_MAX", 4))),
+    },
+    # queued messages per instance, or seconds the oldest one waited, before adding an instance
+    "queue_per_instance": int(os.getenv("AUTOSCALE_QUEUE_PER_INSTANCE", 2)),
+    "max_queue_age": float(os.getenv("AUTOSCALE_MAX_QUEUE_AGE", 5)),
+    # host CPU and memory use (percent) above which no instance is added
+    "max_cpu": float(os.getenv("AUTOSCALE_MAX_CPU", 85)),
+    "max_memory": float(os.getenv("AUTOSCALE_MAX_MEMORY", 85)),
+    "scale_up_cooldown": float(os.getenv("AUTOSCALE_UP_COOLDOWN", 10)),
+    "scale_down_cooldown": float(os.getenv("AUTOSCALE_DOWN_COOLDOWN", 60)),
+}
+
+startup = {
+    # forkserver forks workers from a process that already loaded the modules below; spawn re-imports them per worker
+    "start_method": os.getenv("WORKER_START_METHOD", "forkserver"),
+    "preload": [name.strip() for name in (
+        os.getenv("WORKER_PRELOAD")
+        or "numpy,pandas,joblib,sklearn.feature_extraction.text,gensim.models,torch,"
+        "octis.models.ETM,octis.evaluation_metrics.coherence_metrics,octis.dataset.dataset,"
+        "Sastrawi.Stemmer.StemmerFactory,Sastrawi.StopWordRemover.StopWordRemoverFactory,"
+        "openai,redis,pika,flask,strawberry"
+    ).split(",") if name.strip()],
+    "preload_stemmer": os.getenv("WORKER_PRELOAD_STEMMER", "true").lower() == "true",
+}
+
+jobs = {
+    # worker types whose messages start a tracked job, the job id then follows every hop
+    "origins": [name.strip() for name in os.getenv("JOB_ORIGINS", "RabbitMQWorker").split(",") if name.strip()],
+    # jobs kept for the /jobs endpoint
+    "max_jobs": int(os.getenv("JOB_TRACKER_MAX_JOBS", 1000)),
+}
+
+dedup = {
+    "enabled": os.getenv("DEDUP_ENABLED", "true").lower() == "true",
+    # estimated Jaccard similarity of character shingles
+    "threshold": float(os.getenv("DEDUP_THRESHOLD", 0.8)),
+}
+
+formality = {
+    # skip the LLM rewrite for tweets that already read as formal Indonesian
+    "enabled": os.getenv("FORMALITY_FAST_PATH", "true").lower() == "true",
+    "max_slang_ratio": float(os.getenv("FORMALITY_MAX_SLANG_RATIO", 0.05)),
+    "min_indonesian_ratio": float(os.getenv("FORMALITY_MIN_INDONESIAN_RATIO", 0.8)),
+}
+
+augmentation = {
+    "max_concurrency": int(os.getenv("AUGMENTATION_MAX_CONCURRENCY", 8)),
+    # quota of the whole deployment, split evenly over the most PreprocessingWorker instances (PREPROCESSING_WORKER_MAX
+    # with autoscaling, PREPROCESSING_WORKER_MIN without); 0 disables the per-minute budgets
+    "requests_per_minute": int(os.getenv("AUGMENTATION_REQUESTS_PER_MINUTE", 0)),
+    "tokens_per_minute": int(os.getenv("AUGMENTATION_TOKENS_PER_MINUTE", 0)),
+    "batch_token_target": int(os.getenv("AUGMENTATION_BATCH_TOKEN_TARGET", 1500)),
+    "max_batch_size": int(os.getenv("AUGMENTATION_MAX_BATCH_SIZE", 10)),
+    # response_format json_object needs api version 2023-12-01-preview or later
+    "json_mode": os.getenv("AUGMENTATION_JSON_MODE", "true").lower() == "true",
+}
+
+augmentation_cache = {
+    "path": os.getenv("AUGMENTATION_CACHE_PATH", "./cache/preprocessing.sqlite3"),
+    "ttl": int(os.getenv("AUGMENTATION_CACHE_TTL", 30 * 24 * 3600)),
+    # 0 disables size eviction
+    "max_entries": int(os.getenv("AUGMENTATION_CACHE_MAX_ENTRIES", 1000000)),
+    "use_redis": os.getenv("AUGMENTATION_CACHE_USE_REDIS", "false").lower() == "true",
+    "explanation_ttl": int(os.getenv("EXPLANATION_CACHE_TTL", 7 * 24 * 3600)),
+}
+
 rabbitmq = {
     "url": os.getenv("RABBITMQ_URL", "amqp://localhost:5672/"),
     "consume":{
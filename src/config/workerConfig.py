@@ -1,4 +1,15 @@
-from .env import database,port,azure,rabbitmq,redis
+from .env import database,port,azure,rabbitmq,redis,preprocessing,dedup,formality,augmentation,augmentation_cache,autoscaling
+
+# every PreprocessingWorker instance enforces the per-minute LLM budgets on its own,
+# so each gets an equal share for the most instances that can run at once
+preprocessing_instances = autoscaling["limits"]["PreprocessingWorker"][1 if autoscaling["enabled"] else 0]
+preprocessing_augmentation = {
+    **augmentation,
+    **{
+        budget: max(1, augmentation[budget] // max(1, preprocessing_instances)) if augmentation[budget] else 0
+        for budget in ("requests_per_minute", "tokens_per_minute")
+    },
+}
 
 RestApiWorkerConfig = {
     "port": port
@@ -29,6 +40,15 @@ PreprocessingWorkerConfig = {
         "completion": azure["model"]["completion"]
     }
   },
+  "chunk_size": preprocessing["chunk_size"],
+  "memory_limit_mb": preprocessing["memory_limit_mb"],
+  "max_concurrent_jobs": preprocessing["max_concurrent_jobs"],
+  "max_documents": preprocessing["max_documents"],
+  "dedup": dedup,
+  "formality": formality,
+  "augmentation": preprocessing_augmentation,
+  "augmentation_cache": augmentation_cache,
+  "redis": redis,
 }
 
 ETMWorkerConfig = {
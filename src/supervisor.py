@@ -6,11 +6,17 @@ import threading
 import importlib
 import multiprocessing
 from datetime import datetime
-from multiprocessing.connection import Connection
+from multiprocessing.connection import Connection, wait
 import traceback
+from collections import deque
 from config.workerConfig import DatabaseInteractionWorkerConfig, ETMWorkerConfig, CacheWorkerConfig, LLMWorkerConfig, PreprocessingWorkerConfig, RabbitMQWorkerConfig, RestApiWorkerConfig, GraphQLWorkerConfig, allConfigs
 from utils.log import log
-from utils.handleMessage import sendMessage,convertMessage
+from utils.handleMessage import sendMessage,convertMessage,decodeHeader,encodeMessage,setCodec,setSharedMemoryThreshold,releaseSegment,startHeartbeat,setHeader
+from config.env import messaging, routing, pending, health, autoscaling, startup, jobs
+from utils.router import Router
+from utils.pendingStore import PendingStore
+from utils.autoscaler import Autoscaler
+from utils.jobTracker import JobTracker
 import psutil
 
 #########
@@ -18,9 +24,40 @@ import psutil
 #########
 class Supervisor:
     _workers:dict={}
-    pending_messages:dict={}
+    pending_messages:PendingStore=PendingStore()
+    # shared memory payload -> {pid: deliveries not acknowledged yet}
+    segments:dict={}
+    _segments_lock = threading.Lock()
+    # worker name -> messages waiting for credit, pid -> messages it takes at once
+    queues:dict={}
+    credits:dict={}
+    # pid -> {method: messages of that method it takes at once}
+    limits:dict={}
+    default_credit:int = 1
+    # guards the queues and every change to _workers, so no instance goes away while a message is routed to it
+    _queue_lock = threading.RLock()
+    # seconds a stopped worker gets to exit before it is killed
+    stop_timeout:float = 5
+    # pid -> last heartbeat with the time it was received, pid -> when it started draining
+    heartbeats:dict={}
+    draining:dict={}
+    heartbeat_deadline:float = health['heartbeat_deadline']
+    startup_deadline:float = health['startup_deadline']
+    stall_deadline:float = health['stall_deadline']
+    max_attempts:int = pending['max_attempts']
+    job_tracker:JobTracker = JobTracker(jobs['max_jobs'])
+    # written to when the set of worker connections changes, so the listener waits on the new set
+    _wakeup = None
     
     def __init__(self):
+        self.router = Router(routing['strategy'])
+        self.queue_size = routing['queue_size']
+        # replayed from the write-ahead log, create_worker sends them again
+        self.pending_messages = PendingStore(pending['wal_path'], fsync=pending['fsync'])
+        self.autoscaler = Autoscaler(**{key: value for key, value in autoscaling.items() if key not in ('enabled', 'interval')})
+        self._wakeup_reader, self._wakeup = multiprocessing.Pipe(duplex=False)
+        self._listener = threading.Thread(target=self._listen_loop, daemon=True)
+        self._listener.start()
 
         ####
         # just edit this part to add your workers
@@ -29,9 +66,9 @@ class Supervisor:
         self.create_worker("DatabaseInteractionWorker", count=1, config=DatabaseInteractionWorkerConfig)
         self.create_worker("RestApiWorker", count=1, config=RestApiWorkerConfig)    
         self.create_worker("GraphQLWorker", count=1, config=GraphQLWorkerConfig)
-        self.create_worker("PreprocessingWorker", count=1, config=PreprocessingWorkerConfig)
-        self.create_worker("ETMWorker", count=1, config=ETMWorkerConfig)
-        self.create_worker('LLMWorker',count=1, config=LLMWorkerConfig)
+        self.create_worker("PreprocessingWorker", count=self.autoscaler.minimum("PreprocessingWorker"), config=PreprocessingWorkerConfig)
+        self.create_worker("ETMWorker", count=self.autoscaler.minimum("ETMWorker"), config=ETMWorkerConfig)
+        self.create_worker('LLMWorker',count=self.autoscaler.minimum("LLMWorker"), config=LLMWorkerConfig)
         self.create_worker("RabbitMQWorker", count=1, config=RabbitMQWorkerConfig)
         self.create_worker("CacheWorker", count=1, config=CacheWorkerConfig)
 
@@ -44,6 +81,11 @@ class Supervisor:
             log("Shutting down Supervisor", "info")
             for pid in list(self._workers.keys()):
                 self._kill_worker(pid)
+            for name in list(self.segments):
+                # payloads of pending messages are read again after a restart
+                if not self.pending_messages.uses_segment(name):
+                    releaseSegment(name)
+            self.pending_messages.close()
             sys.exit(0)
         import signal
         signal.signal(signal.SIGINT, signal_handler)
@@ -51,13 +93,18 @@ class Supervisor:
         # Start periodic health check thread
         self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
         self._health_thread.start()
+        if autoscaling['enabled']:
+            self._autoscale_thread = threading.Thread(target=self._autoscale_loop, daemon=True)
+            self._autoscale_thread.start()
         log("Supervisor initialized", "info")
 
-    def create_worker(self, worker: str, count: int = 1, config: dict = None) -> None:
+    def create_worker(self, worker: str, count: int = 1, config: dict = None, routing: str = None) -> None:
         if count <= 0:
             log("Worker count must be greater than zero", "error")
             raise ValueError("Worker count must be greater than zero")
         config = config or {}
+        if routing:
+            self.router.set_strategy(worker, routing)
         # log(f"Creating {count} worker(s) of type {worker}", "info")
 
         for _ in range(count):
@@ -69,16 +116,24 @@ class Supervisor:
                 daemon=False
             )
             p.start()
-            self._workers[p.pid] = {"process": p, "conn": parent_conn, "name": worker}
-            self._start_listener(p.pid)
+            with self._queue_lock:
+                self._workers[p.pid] = {"process": p, "conn": parent_conn, "name": worker, "started": time.monotonic()}
+            self._wake()
             
-        running = list([pid for pid, info in self._workers.items() if info['process'].is_alive() and info['name'] == worker])
+        running = [pid for pid, info in list(self._workers.items()) if info['process'].is_alive() and info['name'] == worker]
         log(f"{worker} running on pid(s): {running}", "success")
         self.resend_pending_messages(worker)
     @staticmethod
     def _worker_runner( worker_name: str, conn: Connection, config: dict):
         try:
+            setCodec(messaging['codec'])
+            setSharedMemoryThreshold(messaging['shm_threshold'])
+            # started before the import so slow imports count as alive
+            if health['heartbeat_interval'] > 0:
+                startHeartbeat(conn, health['heartbeat_interval'])
+            start = time.perf_counter()
             module = importlib.import_module(f"workers.{worker_name}")
+            log(f"{worker_name} imported its module in {time.perf_counter() - start:.2f}s", "info")
             module.main(conn, config)
         except ModuleNotFoundError as e:
             print(e)
@@ -89,51 +144,169 @@ class Supervisor:
         finally:
             conn.close()
 
-    def _start_listener(self, pid: int):
-        def listen():
-            conn = self._workers[pid]["conn"]
-            while True:
+    def _listen_loop(self):
+        """Wait on every worker connection at once and handle frames as they become readable."""
+        closed = set()
+        while True:
+            connections = {info['conn']: pid for pid, info in list(self._workers.items())}
+            closed &= set(connections)
+            try:
+                ready = wait([self._wakeup_reader, *(conn for conn in connections if conn not in closed)])
+            except (OSError, ValueError):
+                # a connection was closed by _kill_worker while building the list
+                continue
+            for conn in ready:
+                if conn is self._wakeup_reader:
+                    while conn.poll():
+                        conn.recv_bytes()
+                    continue
+                pid = connections[conn]
                 try:
-                    message = conn.recv()
-                    self.handle_worker_message(convertMessage(message), pid)
-                except EOFError as e:
-                    log(f"Worker {pid} connection closed: {e}", "error")
-                    log(f"Connection closed for worker {self._workers[pid]['name']} ({pid})", "warn")
-                    break
+                    # only the routing header is decoded, the frame is forwarded as is
+                    frame = conn.recv_bytes()
+                except (EOFError, OSError) as e:
+                    closed.add(conn)
+                    info = self._workers.get(pid)
+                    if info:
+                        log(f"Connection closed for worker {info['name']} ({pid}): {e}", "warn")
+                    continue
+                try:
+                    self.handle_worker_message({**decodeHeader(frame), 'frame': frame}, pid)
                 except Exception as e:
-                    log(f"Error listening to worker {pid}: {e}", "error")
-                    break
-        t = threading.Thread(target=listen, daemon=True)
-        t.start()
+                    log(f"Error handling message from worker {pid}: {e}", "error")
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.send_bytes(b"")
 
     def _health_loop(self):
         while True:
-            time.sleep(10)
+            time.sleep(health['heartbeat_interval'] or 10)
             self.check_worker_health()
 
+    def record_heartbeat(self, pid: int, load: dict):
+        """Keep the last load of `pid`, and when its progress count last moved."""
+        now = time.monotonic()
+        previous = self.heartbeats.get(pid)
+        moved = previous is None or previous.get('progress') != load.get('progress')
+        self.heartbeats[pid] = {**load, 'received': now, 'progressed': now if moved else previous['progressed']}
+
+    def is_stalled(self, beat: dict, now: float) -> bool:
+        """On one message past the stall deadline with no progress reported for as long."""
+        return (
+            beat.get('stalled_for', 0) > self.stall_deadline
+            and now - beat.get('progressed', now) > self.stall_deadline
+        )
+
     def check_worker_health(self):
-        
-        for pid,metadata in list(self._workers.items()):
-            psutil_pid = psutil.pid_exists(pid)
-            process_status = psutil.Process(pid).status() if psutil_pid else None
-            if not psutil_pid or process_status == psutil.STATUS_ZOMBIE or process_status == psutil.STATUS_DEAD:
-                log(f"Worker {metadata['name']} ({pid}) is not alive, removing from tracking", "warn")
-                self._kill_worker(pid)
-                self.create_worker(metadata['name'], count=1, config=allConfigs.get(metadata['name'], {}))
-                
-        
+        """Restart workers that exited or missed their heartbeat, and drain the ones stuck on a message."""
+        now = time.monotonic()
+        for pid, info in list(self._workers.items()):
+            beat = self.heartbeats.get(pid)
+            if beat and self.stall_deadline and pid not in self.draining and self.is_stalled(beat, now):
+                log(f"Worker {info['name']} ({pid}) has been on {beat.get('current')} for {beat['stalled_for']:.0f}s without progress, draining it", "warn")
+                self.draining[pid] = now
+            if not info['process'].is_alive():
+                reason = "is not alive"
+            elif beat is None:
+                if health['heartbeat_interval'] <= 0 or now - info.get('started', now) <= self.startup_deadline:
+                    continue
+                reason = f"sent no heartbeat {self.startup_deadline:.0f}s after starting"
+            elif now - beat['received'] > self.heartbeat_deadline:
+                reason = f"missed its heartbeat for {now - beat['received']:.1f}s"
+            elif pid in self.draining and (self.router.in_flight.get(pid, 0) <= 1 or now - self.draining[pid] > self.stall_deadline):
+                reason = f"is stuck on {beat.get('current')}"
+            else:
+                continue
+            log(f"Worker {info['name']} ({pid}) {reason}, restarting it", "warn")
+            self._restart_worker(pid)
+
+    def _autoscale_loop(self):
+        psutil.cpu_percent(interval=None)
+        while True:
+            time.sleep(autoscaling['interval'])
+            try:
+                self.autoscale()
+            except Exception as e:
+                log(f"Autoscaling failed: {e}", "error")
+
+    def autoscale(self):
+        """Add or retire instances of the scaled worker types from their queues, heartbeats and host load."""
+        cpu = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        now = time.monotonic()
+        for worker_name in self.autoscaler.limits:
+            pids = [pid for pid, w in list(self._workers.items()) if w['name'] == worker_name]
+            queue = list(self.queues.get(worker_name) or ())
+            rss = [self.heartbeats[pid]['rss'] for pid in pids if self.heartbeats.get(pid, {}).get('rss')]
+            change = self.autoscaler.decide(
+                worker_name,
+                instances=len(pids),
+                queued=len(queue),
+                oldest_age=now - queue[0][1].get('queued_at', now) if queue else 0,
+                busy=sum(1 for pid in pids if self.router.in_flight.get(pid, 0) > 0),
+                cpu_percent=cpu,
+                memory_percent=memory.percent,
+                free_memory=memory.available,
+                instance_memory=max(rss) if rss else None,
+                now=now,
+            )
+            if change > 0:
+                log(f"Scaling {worker_name} up to {len(pids) + 1} instances ({len(queue)} queued, CPU {cpu:.0f}%, memory {memory.percent:.0f}%)", "info")
+                self.create_worker(worker_name, count=1, config=allConfigs.get(worker_name, {}))
+            elif change < 0:
+                self._retire_worker(worker_name, pids)
+
+    def _retire_worker(self, worker_name: str, pids: list):
+        """Stop the newest idle instance of `worker_name`; messages that reach it meanwhile are sent again."""
+        with self._queue_lock:
+            idle = [
+                pid for pid in pids
+                if pid in self._workers and self.router.in_flight.get(pid, 0) == 0 and pid not in self.draining
+            ]
+            if not idle:
+                return
+            pid = max(idle, key=lambda pid: self._workers[pid].get('started', 0))
+        log(f"Scaling {worker_name} down to {len(pids) - 1} instances, stopping {pid}", "info")
+        self._kill_worker(pid)
+        self.resend_pending_messages(worker_name)
+
+    def _restart_worker(self, pid: int):
+        name = self._workers.get(pid, {}).get('name')
+        self._kill_worker(pid)
+        if name:
+            self.create_worker(name, count=1, config=allConfigs.get(name, {}))
+
     def handle_worker_message(self, message: dict, pid: int):
         dests = message.get('destination')
         status = message.get('status')
         msg_id = message.get('messageId')
+        if message.get('reason') == 'ACK':
+            self.acknowledge(message, pid)
+            return
+        if message.get('reason') == 'DONE':
+            self.complete(message, pid)
+            return
+        if message.get('reason') == 'CREDIT':
+            self.set_credit(pid, message.get('credit'), message.get('limits'))
+            return
+        if message.get('reason') == 'HEARTBEAT':
+            self.record_heartbeat(pid, message.get('heartbeat') or {})
+            return
         for dest in dests:
+          if dest.startswith('supervisor/'):
+              self.handle_request(dest, message, pid)
+              return
           if dest != 'supervisor':
+              self._track_job(dest, message, pid)
               self._send_to_worker(dest, message)
               return
+        if message.get('shm'):
+            # nobody will read a payload addressed to the supervisor
+            releaseSegment(message['shm'])
         if status == 'error':
             log(f"Worker {pid} returned an error: {message.get('reason', 'Unknown reason')}", "error")
-            self._kill_worker(pid)
-            self.create_worker(self._workers[pid]['name'], count=1, config=allConfigs.get(self._workers[pid]['name'], {}))
+            self._restart_worker(pid)
             return
         # Supervisor-specific handling
         elif status == 'completed' and dest:
@@ -141,69 +314,254 @@ class Supervisor:
             self.remove_pending_message(worker_name, msg_id)
         
 
+    def handle_request(self, destination: str, message: dict, pid: int):
+        """Answer a worker asking the supervisor itself, e.g. "supervisor/getJobs/<projectId>"."""
+        parts = destination.split('/')
+        method, param = parts[1], parts[2] if len(parts) > 2 else ''
+        if method == 'getJobs':
+            data = self.job_tracker.jobs_of(param)
+        else:
+            log(f"Unknown supervisor method {method} requested by worker {pid}", "warn")
+            data = None
+        info = self._workers.get(pid)
+        if info is None:
+            return
+        # routed like any other message, but only to the very instance whose request is waiting for it
+        destination = f"{info['name']}/onProcessed"
+        self._send_to_worker(destination, {
+            "messageId": message.get('messageId'),
+            "status": "completed",
+            "reason": "",
+            "destination": [destination],
+            "data": data,
+            "instance": pid,
+        })
+
+    def _track_job(self, destination: str, message: dict, pid: int):
+        """Start a job for messages from an origin worker and record the stage this message begins."""
+        sender = self._workers.get(pid, {}).get('name')
+        if message.get('jobId') is None and sender in jobs['origins']:
+            message['jobId'] = self.job_tracker.new_job(sender)
+            if message.get('frame'):
+                message['frame'] = setHeader(message['frame'], jobId=message['jobId'])
+        if message.get('jobId') is not None:
+            self.job_tracker.enqueued(message['jobId'], message.get('messageId'), destination)
+
     def _send_to_worker(self, destination: str, message: dict):
         worker_name = destination.split('/')[0].split('.')[0]
-        method= destination.split('/')[1] if '/' in destination else None
-        msg_id = message.get('messageId')
-        status = message.get('status')
-        reason = message.get('reason')
-
         self.track_pending_message(worker_name, message)
+        if not self._enqueue(worker_name, destination, message):
+            return
+        if not any(w['name'] == worker_name for w in list(self._workers.values())):
+            log(f"No available worker for destination: {destination}, message queued", "warn")
+        self._drain(worker_name)
+
+    def _enqueue(self, worker_name: str, destination: str, message: dict) -> bool:
+        with self._queue_lock:
+            queue = self.queues.setdefault(worker_name, deque())
+            if len(queue) >= self.queue_size:
+                log(f"Queue of {worker_name} is full ({len(queue)} messages), dropping message {message.get('messageId')}", "error")
+                self.pending_messages.discard(worker_name, message)
+                self.release_segment(message.get('shm'), None)
+                return False
+            message['queued'] = True
+            message.setdefault('queued_at', time.monotonic())
+            queue.append((destination, message))
+            return True
 
-        # Find available worker
-        available = [w for w in self._workers.values() if w['name'] == worker_name]
-        if status == 'failed' and reason == 'SERVER_BUSY':
-            # filter out busy
-            log(f"Filtering out busy workers for {worker_name}", "error")
-            available = []
-
-        if not available:
-            log(f"No available worker for destination: {destination}", "warn")
-            # retry later - fix the lambda to capture pid properly
-            def retry_message():
-                self.handle_worker_message({**message, 'status':'completed'}, 0)
-            threading.Timer(5, retry_message).start()
+    def _drain(self, worker_name: str):
+        """Send queued messages of `worker_name` while its instances have credit left."""
+        with self._queue_lock:
+            queue = self.queues.get(worker_name)
+            pids = [pid for pid, w in list(self._workers.items()) if w['name'] == worker_name]
+            if not queue or not pids:
+                return
+            waiting = deque()
+            while queue:
+                free = [
+                    pid for pid in pids
+                    if pid not in self.draining and self.router.in_flight.get(pid, 0) < self.credits.get(pid, self.default_credit)
+                ]
+                if not free:
+                    break
+                destination, message = queue.popleft()
+                if message.get('instance') is not None:
+                    if message['instance'] not in self._workers:
+                        # a reply to a request of an instance that is gone
+                        self.pending_messages.discard(worker_name, message)
+                        continue
+                    free = [pid for pid in free if pid == message['instance']]
+                free = [pid for pid in free if self._under_limit(worker_name, pid, destination)]
+                if not free or not self._deliver(worker_name, destination, message, pids, free):
+                    waiting.append((destination, message))
+            waiting.extend(queue)
+            self.queues[worker_name] = waiting
+
+    def set_credit(self, pid: int, credit, limits: dict = None):
+        """A worker advertised how many messages it takes at once, and of some methods how many of those."""
+        info = self._workers.get(pid)
+        if info is None:
             return
+        self.credits[pid] = max(1, int(credit or self.default_credit))
+        self.limits[pid] = {method: max(1, int(limit)) for method, limit in (limits or {}).items()}
+        if 'started' in info and 'ready' not in info:
+            # workers advertise credit once they listen, which ends their startup
+            info['ready'] = time.monotonic()
+            log(f"{info['name']} ({pid}) ready {info['ready'] - info['started']:.2f}s after start ({multiprocessing.get_start_method()})", "info")
+        self._drain(info['name'])
+
+    def _under_limit(self, worker_name: str, pid: int, destination: str) -> bool:
+        """Whether `pid` has fewer messages of the method of `destination` in flight than its limit for it."""
+        method = self._method_of(destination)
+        limit = self.limits.get(pid, {}).get(method)
+        if limit is None:
+            return True
+        # delivered messages stay pending until their DONE, so they are the ones in flight
+        busy = sum(
+            1 for m in self.pending_messages.messages(worker_name)
+            if m.get('pid') == pid and not m.get('queued')
+            and any(self._method_of(d) == method for d in m.get('destination') or [] if d.split('/')[0].split('.')[0] == worker_name)
+        )
+        return busy < limit
+
+    @staticmethod
+    def _method_of(destination: str) -> str:
+        return destination.split('/')[1] if '/' in destination else None
 
-        target = available[0]
-        log(f"Sending message to worker: {worker_name}, PID: {target['process'].pid}, Method: {method}, Message ID: {msg_id}, Status: {status}, Reason: {reason}", "info")
+    def _deliver(self, worker_name: str, destination: str, message: dict, pids: list, available: list = None) -> bool:
+        """Send `message` to the instance of `worker_name` chosen by the router."""
+        pid = self.router.pick(worker_name, pids, destination, available)
+        if pid is None:
+            return False
+        method = self._method_of(destination)
+        queued = len(self.queues.get(worker_name, ()))
+        log(f"Sending message to worker: {worker_name}, PID: {pid} ({self.router.strategy(worker_name)}, {self.router.in_flight.get(pid, 0)} in flight, {queued} queued), Method: {method}, Message ID: {message.get('messageId')}, Status: {message.get('status')}, Reason: {message.get('reason')}", "info")
+        self.retain_segment(message, pid)
         try:
-            target['conn'].send(message)
+            self._workers[pid]['conn'].send_bytes(self._frame_of(message))
+            message['pid'] = pid
+            message['queued'] = False
+            message['attempts'] = message.get('attempts', 0) + 1
+            self.job_tracker.started(message.get('jobId'), message.get('messageId'), worker_name, pid)
+            return True
         except Exception as e:
             traceback.print_exc()
             log(f"Failed to send message to worker {worker_name}: {e}", "error")
+            self.router.done(pid)
+            self.release_segment(message.get('shm'), pid)
+            return False
+
+    @staticmethod
+    def _frame_of(message: dict) -> bytes:
+        """The frame a worker sent, or a new one for messages built by the supervisor itself."""
+        return message.get('frame') or encodeMessage(message)
 
     def track_pending_message(self, worker_name: str, message: dict):
-        self.pending_messages.setdefault(worker_name, []).append(message)
+        self.pending_messages.add(worker_name, message)
 
-    def remove_pending_message(self, worker_name: str, message_id: str):
-        if worker_name in self.pending_messages:
-            self.pending_messages[worker_name] = [m for m in self.pending_messages[worker_name] if m.get('messageId') != message_id]
+    def remove_pending_message(self, worker_name: str, message_id: str, pid: int = None) -> list:
+        """Drop the pending messages with `message_id` (only those delivered to `pid` when given)."""
+        return self.pending_messages.remove(worker_name, message_id, pid)
 
     def resend_pending_messages(self, worker_name: str):
-        msgs = self.pending_messages.get(worker_name, [])
-        if not msgs:
+        """
+        Queue again the pending messages whose instance is gone, then send what credit allows.
+
+        A message already delivered `max_attempts` times is dropped instead,
+        so one that kills or stalls every instance it reaches is not sent forever.
+        """
+        msgs = []
+        for m in self.pending_messages.messages(worker_name):
+            if m.get('queued') or m.get('pid') in self._workers:
+                continue
+            if self.max_attempts and m.get('attempts', 0) >= self.max_attempts:
+                log(f"Dropping message {m.get('messageId')} to {worker_name} after {m['attempts']} deliveries, its instance died or stalled on every one", "error")
+                self.pending_messages.discard(worker_name, m)
+                self.release_segment(m.get('shm'), None)
+                continue
+            msgs.append(m)
+        if msgs:
+            log(f"Resending {len(msgs)} pending messages to {worker_name}", "info")
+        for msg in msgs:
+            destination = next(
+                (d for d in msg.get('destination') or [] if d.split('/')[0].split('.')[0] == worker_name), worker_name
+            )
+            msg.pop('pid', None)
+            self._enqueue(worker_name, destination, msg)
+        self._drain(worker_name)
+
+    def retain_segment(self, message: dict, pid: int):
+        name = message.get('shm')
+        if not name:
             return
-        log(f"Resending {len(msgs)} pending messages to {worker_name}", "info")
-        connections = [w['conn'] for w in self._workers.values() if w['name'] == worker_name]
-        if not connections:
-            log(f"No connection available for {worker_name}", "warn")
+        with self._segments_lock:
+            holders = self.segments.setdefault(name, {})
+            holders[pid] = holders.get(pid, 0) + 1
+
+    def release_segment(self, name: str, pid: int, all_deliveries: bool = False):
+        """
+        Drop one (or every) delivery of a shared payload to `pid`.
+
+        The segment is unlinked when no delivery is left unacknowledged and
+        no pending message still needs it for a resend. That includes the
+        segment of a message dropped before it was ever delivered.
+        """
+        if not name:
             return
-        for msg in msgs:
-            try:
-                connections[0].send(msg)
-                log(f"Resent message {msg.get('messageId')} to {worker_name}", "success")
-            except Exception as e:
-                log(f"Failed to resend: {e}", "error")
+        with self._segments_lock:
+            holders = self.segments.get(name)
+            if holders is None:
+                if self.pending_messages.uses_segment(name):
+                    return
+                holders = {}
+            remaining = 0 if all_deliveries else holders.get(pid, 0) - 1
+            if remaining > 0:
+                holders[pid] = remaining
+            else:
+                holders.pop(pid, None)
+            if holders or self.pending_messages.uses_segment(name):
+                return
+            self.segments.pop(name, None)
+        releaseSegment(name)
+
+    def acknowledge(self, message: dict, pid: int):
+        """A worker has read a shared payload; the segment stays while the message is pending."""
+        for name in message.get('release') or []:
+            self.release_segment(name, pid)
+
+    def complete(self, message: dict, pid: int):
+        """A worker has finished a message: it gets routing credit back and the message is no longer resent."""
+        self.router.done(pid)
+        worker_name = self._workers.get(pid, {}).get('name')
+        if worker_name:
+            self.job_tracker.finished(message.get('jobId'), message.get('messageId'), worker_name)
+            for done in self.remove_pending_message(worker_name, message.get('messageId'), pid):
+                self.release_segment(done.get('shm'), pid)
+            self._drain(worker_name)
 
     def _kill_worker(self, pid: int):
-        info = self._workers.pop(pid, None)
+        with self._queue_lock:
+            self.router.forget(pid)
+            self.credits.pop(pid, None)
+            self.limits.pop(pid, None)
+            self.heartbeats.pop(pid, None)
+            self.draining.pop(pid, None)
+            for name in [name for name, holders in list(self.segments.items()) if pid in holders]:
+                self.release_segment(name, pid, all_deliveries=True)
+            info = self._workers.pop(pid, None)
         if info:
             try:
                 info['conn'].close()
                 info['process'].terminate()
+                # reaped here so stopped workers do not pile up as zombies
+                info['process'].join(self.stop_timeout)
+                if info['process'].is_alive():
+                    log(f"Worker {pid} did not exit {self.stop_timeout:.0f}s after terminate, killing it", "warn")
+                    info['process'].kill()
+                    info['process'].join()
             except Exception as e:
                 log(f"Error terminating worker {pid}: {e}", "error")
+        self._wake()
 
     def is_worker_alive(self, pid: int) -> bool:
         info = self._workers.get(pid)
@@ -211,8 +569,13 @@ class Supervisor:
 
 
 if __name__ == '__main__':
-    # Add this for Windows multiprocessing support
-    multiprocessing.set_start_method('spawn', force=True)
+    # forkserver where the platform has it, spawn otherwise (Windows)
+    start_method = startup['start_method'] if startup['start_method'] in multiprocessing.get_all_start_methods() else 'spawn'
+    multiprocessing.set_start_method(start_method, force=True)
+    if start_method == 'forkserver':
+        multiprocessing.set_forkserver_preload(['__main__', 'utils.forkserverPreload'])
+    setCodec(messaging['codec'])
+    setSharedMemoryThreshold(messaging['shm_threshold'])
     
     supervisor = Supervisor()
     try:
@@ -0,0 +1,73 @@
+import ast
+import json
+import re
+
+_FENCE = re.compile(r'^```[a-zA-Z]*\s*|\s*```$')
+_ITEM = re.compile(r'\{\s*"id"\s*:\s*"?(\d+)"?\s*,\s*"text"\s*:\s*"((?:[^"\\]|\\.)*)"\s*\}')
+
+
+def format_items(items: dict) -> str:
+    """Serialize {id: text} as the JSON list of posts sent in the prompt."""
+    return json.dumps([{"id": item_id, "text": text} for item_id, text in items.items()], ensure_ascii=False)
+
+
+def _load(text: str):
+    for loader in (json.loads, ast.literal_eval):
+        try:
+            return loader(text)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            continue
+    return None
+
+
+def _collect(parsed, ids: list) -> dict:
+    if isinstance(parsed, dict):
+        parsed = parsed.get("items", parsed.get("posts"))
+    if not isinstance(parsed, list):
+        return {}
+    if parsed and all(isinstance(item, str) for item in parsed):
+        # legacy plain list, only trustworthy when nothing is missing
+        return dict(zip(ids, parsed)) if len(parsed) == len(ids) else {}
+    wanted = set(ids)
+    result = {}
+    for item in parsed:
+        if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+            continue
+        try:
+            item_id = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        if item_id in wanted:
+            result[item_id] = item["text"]
+    return result
+
+
+def parse_augmentation(output: str, ids: list) -> dict:
+    """
+    Extract {id: text} for as many of `ids` as the model reply allows.
+
+    Accepts the JSON-mode object {"items": [{"id": .., "text": ..}]}, a bare
+    list of such objects, or a plain list of strings in input order, with or
+    without code fences or surrounding prose. When the reply is not valid
+    JSON as a whole (for example truncated), every well-formed item object
+    in it is still salvaged.
+    """
+    ids = list(ids)
+    text = _FENCE.sub('', (output or '').strip())
+    parsed = _load(text)
+    if parsed is None:
+        start = min((i for i in (text.find('{'), text.find('[')) if i >= 0), default=-1)
+        end = max(text.rfind('}'), text.rfind(']'))
+        if start >= 0 and end > start:
+            parsed = _load(text[start:end + 1])
+    result = _collect(parsed, ids)
+    if len(result) < len(ids):
+        wanted = set(ids)
+        for item_id, raw in _ITEM.findall(text):
+            item_id = int(item_id)
+            if item_id in wanted and item_id not in result:
+                try:
+                    result[item_id] = json.loads(f'"{raw}"')
+                except ValueError:
+                    continue
+    return result
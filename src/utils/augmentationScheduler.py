@@ -0,0 +1,190 @@
+import asyncio
+import contextlib
+import math
+import random
+import time
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for Indonesian/English text (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+class AugmentationScheduler:
+    """
+    Admission control for LLM augmentation requests.
+
+    Requests wait for a concurrency slot and for room in the optional
+    requests-per-minute and tokens-per-minute budgets before they are sent.
+    The concurrency limit adapts AIMD-style: it grows by about one slot per
+    window of successful requests and halves on throttling, while a 429 also
+    pauses every request until the server's Retry-After (or a jittered
+    exponential delay) has passed, so throughput settles at the deployment's
+    quota instead of oscillating around it.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        requests_per_minute: int = 0,
+        tokens_per_minute: int = 0,
+        batch_token_target: int = 1500,
+        max_batch_size: int = 10,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.batch_token_target = batch_token_target
+        self.max_batch_size = max(1, max_batch_size)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.throttled = 0
+        self._active = 0
+        self._resume_at = 0.0
+        self._request_budget = float(requests_per_minute)
+        self._token_budget = float(tokens_per_minute)
+        self._refilled_at = time.monotonic()
+        self._loop = None
+        self._cond = None
+
+    def plan_batches(self, texts: list) -> list:
+        """Split texts into consecutive batches of at most `max_batch_size` items and about `batch_token_target` tokens."""
+        batches = []
+        batch = []
+        batch_tokens = 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if batch and (len(batch) >= self.max_batch_size or batch_tokens + tokens > self.batch_token_target):
+                batches.append(batch)
+                batch = []
+                batch_tokens = 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tokens: int):
+        """Hold one admitted request for the duration of the block."""
+        await self.acquire(tokens)
+        try:
+            yield
+        except BaseException:
+            await self.release(success=False)
+            raise
+        else:
+            await self.release(success=True)
+
+    async def acquire(self, tokens: int) -> None:
+        cond = self._condition()
+        async with cond:
+            while True:
+                delay = self._admission_delay(tokens)
+                if delay <= 0:
+                    self._active += 1
+                    if self.requests_per_minute:
+                        self._request_budget -= 1
+                    if self.tokens_per_minute:
+                        self._token_budget -= min(tokens, self.tokens_per_minute)
+                    return
+                try:
+                    await asyncio.wait_for(cond.wait(), timeout=None if math.isinf(delay) else delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self, success: bool) -> None:
+        cond = self._condition()
+        async with cond:
+            self._active -= 1
+            if success:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            cond.notify_all()
+
+    async def backoff(self, error: Exception, attempt: int) -> None:
+        """Sleep before retry number `attempt`, shrinking the concurrency limit when the server throttled us."""
+        status = getattr(error, "status_code", None)
+        now = time.monotonic()
+        if status == 429:
+            self.throttled += 1
+            delay = self._retry_after(error)
+            if delay is None:
+                delay = random.uniform(0.5, 1.0) * min(self.max_delay, self.base_delay * 2 ** attempt)
+            # only the first 429 of a pause window halves the limit
+            if now >= self._resume_at:
+                self.limit = max(1.0, self.limit / 2)
+            self._resume_at = max(self._resume_at, now + delay)
+        elif self._is_transient(error, status):
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        else:
+            delay = random.uniform(0.5, 1.0) * self.base_delay
+        await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "active": self._active,
+            "throttled": self.throttled,
+        }
+
+    def _condition(self) -> asyncio.Condition:
+        # asyncio primitives are bound to the loop that first uses them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._cond = asyncio.Condition()
+            self._active = 0
+        return self._cond
+
+    def _admission_delay(self, tokens: int) -> float:
+        now = time.monotonic()
+        if now < self._resume_at:
+            return self._resume_at - now
+        if self._active >= int(self.limit):
+            return math.inf
+        self._refill(now)
+        if self.requests_per_minute and self._request_budget < 1:
+            return (1 - self._request_budget) * 60.0 / self.requests_per_minute
+        needed = min(tokens, self.tokens_per_minute)
+        if self.tokens_per_minute and self._token_budget < needed:
+            return (needed - self._token_budget) * 60.0 / self.tokens_per_minute
+        return 0.0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._refilled_at
+        self._refilled_at = now
+        if self.requests_per_minute:
+            self._request_budget = min(
+                float(self.requests_per_minute),
+                self._request_budget + elapsed * self.requests_per_minute / 60.0,
+            )
+        if self.tokens_per_minute:
+            self._token_budget = min(
+                float(self.tokens_per_minute),
+                self._token_budget + elapsed * self.tokens_per_minute / 60.0,
+            )
+
+    @staticmethod
+    def _retry_after(error: Exception):
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000.0
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except (TypeError, ValueError):
+            pass
+        return None
+
+    @staticmethod
+    def _is_transient(error: Exception, status) -> bool:
+        if status is not None:
+            return status >= 500 or status == 408
+        return isinstance(error, (asyncio.TimeoutError, ConnectionError)) or type(error).__name__ in (
+            "APIConnectionError",
+            "APITimeoutError",
+        )
@@ -0,0 +1,99 @@
+import time
+
+
+class Autoscaler:
+    """
+    Decide when to add or retire instances of a worker type.
+
+    An instance is added when more messages wait for credit than
+    `queue_per_instance` per running instance, or when the oldest one has
+    waited longer than `max_queue_age` seconds, as long as host CPU and
+    memory use are under `max_cpu` / `max_memory` percent and the free memory
+    fits one more instance of that type. An instance is retired once the
+    queue has been empty and at least one instance idle for
+    `scale_down_cooldown` seconds. Types are kept within their
+    (minimum, maximum) limits, and `scale_up_cooldown` /
+    `scale_down_cooldown` seconds must pass after a change before the next
+    one, so a new instance can take work before it is judged.
+    """
+
+    def __init__(
+        self,
+        limits: dict,
+        queue_per_instance: int = 2,
+        max_queue_age: float = 5,
+        max_cpu: float = 85,
+        max_memory: float = 85,
+        scale_up_cooldown: float = 10,
+        scale_down_cooldown: float = 60,
+    ):
+        self.limits = limits
+        self.queue_per_instance = queue_per_instance
+        self.max_queue_age = max_queue_age
+        self.max_cpu = max_cpu
+        self.max_memory = max_memory
+        self.scale_up_cooldown = scale_up_cooldown
+        self.scale_down_cooldown = scale_down_cooldown
+        self._changed = {}
+        self._idle_since = {}
+
+    def minimum(self, worker_name: str, default: int = 1) -> int:
+        return self.limits.get(worker_name, (default, default))[0]
+
+    def decide(
+        self,
+        worker_name: str,
+        instances: int,
+        queued: int,
+        oldest_age: float = 0,
+        busy: int = 0,
+        cpu_percent: float = 0,
+        memory_percent: float = 0,
+        free_memory: int = None,
+        instance_memory: int = None,
+        now: float = None,
+    ) -> int:
+        """
+        Return 1 to add an instance of `worker_name`, -1 to retire one, 0 to keep the count.
+
+        `busy` is the number of instances with messages in flight and
+        `instance_memory` the RSS of one instance, both as last reported.
+        """
+        if worker_name not in self.limits:
+            return 0
+        now = time.monotonic() if now is None else now
+        minimum, maximum = self.limits[worker_name]
+        if instances < minimum:
+            return self._change(worker_name, now, 1)
+        if instances > maximum:
+            return self._change(worker_name, now, -1)
+        since_change = now - self._changed.get(worker_name, float("-inf"))
+
+        if queued > self.queue_per_instance * instances or (queued and oldest_age > self.max_queue_age):
+            self._idle_since.pop(worker_name, None)
+            if (
+                instances < maximum
+                and since_change >= self.scale_up_cooldown
+                and cpu_percent < self.max_cpu
+                and memory_percent < self.max_memory
+                and (free_memory is None or instance_memory is None or free_memory > instance_memory)
+            ):
+                return self._change(worker_name, now, 1)
+            return 0
+
+        if queued or busy >= instances:
+            self._idle_since.pop(worker_name, None)
+            return 0
+        idle_since = self._idle_since.setdefault(worker_name, now)
+        if (
+            instances > minimum
+            and now - idle_since >= self.scale_down_cooldown
+            and since_change >= self.scale_down_cooldown
+        ):
+            return self._change(worker_name, now, -1)
+        return 0
+
+    def _change(self, worker_name: str, now: float, change: int) -> int:
+        self._changed[worker_name] = now
+        self._idle_since.pop(worker_name, None)
+        return change
@@ -0,0 +1,93 @@
+import hashlib
+import re
+import zlib
+
+import numpy
+
+_MERSENNE_PRIME = numpy.uint64((1 << 61) - 1)
+_MAX_HASH = numpy.uint64((1 << 32) - 1)
+_URL = re.compile(r'(?:https?://|www\.)\S+')
+_MENTION = re.compile(r'@\w+')
+_RETWEET = re.compile(r'\brt\b')
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_for_dedup(text: str) -> str:
+    """Lowercase a tweet and drop URLs, mentions, the RT marker and punctuation."""
+    text = text.lower()
+    text = _URL.sub(' ', text)
+    text = _MENTION.sub(' ', text)
+    text = _RETWEET.sub(' ', text)
+    return _NON_WORD.sub(' ', text).strip()
+
+
+class TweetDeduplicator:
+    """
+    Collapse exact and near-duplicate tweets (retweets, copy-paste posts).
+
+    Exact duplicates are found by hashing the normalized text. The remaining
+    tweets are compared with MinHash signatures over character shingles and
+    banded LSH, and a tweet joins the cluster of the first earlier tweet
+    whose estimated Jaccard similarity reaches `threshold`.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        generator = numpy.random.RandomState(seed)
+        self._a = generator.randint(1, (1 << 31) - 1, size=num_perm, dtype=numpy.uint64)
+        self._b = generator.randint(0, (1 << 31) - 1, size=num_perm, dtype=numpy.uint64)
+
+    def signature(self, text: str) -> numpy.ndarray:
+        k = self.shingle_size
+        shingles = {text[i:i + k] for i in range(max(1, len(text) - k + 1))}
+        hashes = numpy.fromiter(
+            (zlib.crc32(shingle.encode('utf-8')) for shingle in shingles),
+            dtype=numpy.uint64,
+            count=len(shingles),
+        )
+        # uint64 arithmetic wraps on overflow, which is fine for hashing
+        permuted = ((hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+        return permuted.min(axis=0)
+
+    def cluster(self, texts: list) -> list:
+        """Return, for every text, the index of the first text of its duplicate cluster."""
+        representative = list(range(len(texts)))
+        exact = {}
+        signatures = {}
+        buckets = {}
+        for index, text in enumerate(texts):
+            normalized = normalize_for_dedup(text)
+            digest = hashlib.sha1(normalized.encode('utf-8')).digest()
+            if digest in exact:
+                representative[index] = exact[digest]
+                continue
+            exact[digest] = index
+            if not normalized:
+                continue
+
+            signature = self.signature(normalized)
+            band_keys = [
+                (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)
+            ]
+            candidates = []
+            for key in band_keys:
+                for candidate in buckets.get(key, ()):
+                    if candidate not in candidates:
+                        candidates.append(candidate)
+            for candidate in sorted(candidates):
+                if numpy.mean(signatures[candidate] == signature) >= self.threshold:
+                    representative[index] = candidate
+                    exact[digest] = candidate
+                    break
+            else:
+                signatures[index] = signature
+                for key in band_keys:
+                    buckets.setdefault(key, []).append(index)
+        return representative
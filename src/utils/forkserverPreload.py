@@ -0,0 +1,10 @@
+"""
+Imported once by the forkserver before it forks any worker.
+
+Workers forked from it start with the heavy modules and the stemmer dictionary
+already loaded instead of loading them on every (re)start.
+"""
+from config.env import startup
+from utils.preload import preload
+
+timings = preload(startup)
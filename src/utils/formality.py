@@ -0,0 +1,68 @@
+import re
+
+_NOISE = re.compile(r'(?:https?://|www\.)\S+|[@#]\w+|\bRT\b')
+_ELONGATED = re.compile(r'([a-z])\1{2,}')
+_EMOTICON = re.compile(r'[:;=][-]?[()DPO/*\\]|<3')
+_WORD = re.compile(r'[a-z]+')
+
+# frequent function words of languages that show up in Indonesian keyword pulls
+FOREIGN_MARKERS = frozenset([
+    "the", "and", "is", "are", "was", "were", "of", "to", "in", "for", "with", "this",
+    "that", "you", "it", "on", "be", "have", "not", "but", "what", "they", "will",
+    "my", "your", "just", "so", "if", "we", "from", "by", "at", "or", "can",
+    "el", "los", "las", "que", "del", "por", "una", "para", "con",
+])
+
+
+class FormalityClassifier:
+    """
+    CPU-only check that decides whether a tweet needs the LLM rewrite.
+
+    A tweet is left alone when it reads as formal Indonesian: every token is a
+    known Indonesian word or looks like one by its character trigrams, no
+    more than `max_slang_ratio` of the tokens appear in the kbba slang list,
+    and it has no elongated letters, emoticons or foreign function words.
+    """
+
+    def __init__(self, lexicon, slang, max_slang_ratio: float = 0.05, min_indonesian_ratio: float = 0.8):
+        self.lexicon = frozenset(lexicon)
+        self.slang = frozenset(slang)
+        self.max_slang_ratio = max_slang_ratio
+        self.min_indonesian_ratio = min_indonesian_ratio
+        self.trigrams = frozenset(gram for word in self.lexicon for gram in self._trigrams(word))
+
+    @staticmethod
+    def _trigrams(word: str) -> list:
+        padded = f" {word} "
+        return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+    def indonesian_likelihood(self, token: str) -> float:
+        if token in self.lexicon:
+            return 1.0
+        grams = self._trigrams(token)
+        return sum(gram in self.trigrams for gram in grams) / len(grams)
+
+    def score(self, text: str) -> dict:
+        raw = _NOISE.sub(' ', text)
+        informal_marks = bool(_EMOTICON.search(raw))
+        lowered = raw.lower()
+        informal_marks = informal_marks or bool(_ELONGATED.search(lowered))
+        tokens = _WORD.findall(lowered)
+        if not tokens:
+            return {"tokens": 0, "slang_ratio": 0.0, "indonesian_ratio": 1.0, "foreign": 0, "informal_marks": informal_marks}
+        return {
+            "tokens": len(tokens),
+            "slang_ratio": sum(token in self.slang for token in tokens) / len(tokens),
+            "indonesian_ratio": sum(self.indonesian_likelihood(token) for token in tokens) / len(tokens),
+            "foreign": sum(token in FOREIGN_MARKERS for token in tokens),
+            "informal_marks": informal_marks,
+        }
+
+    def needs_rewrite(self, text: str) -> bool:
+        score = self.score(text)
+        return (
+            score["informal_marks"]
+            or score["foreign"] > 0
+            or score["slang_ratio"] > self.max_slang_ratio
+            or score["indonesian_ratio"] < self.min_indonesian_ratio
+        )
@@ -1,7 +1,205 @@
+from multiprocessing import resource_tracker, shared_memory
 from multiprocessing.connection import Connection
 from .log import log
 from typing import Any, Literal
+import contextvars
 import json
+import os
+import pickle
+import struct
+import threading
+import time
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional
+    msgpack = None
+try:
+    import psutil
+except ImportError:  # heartbeats then carry no RSS
+    psutil = None
+
+# A frame is a JSON header (routing fields, codec, out-of-band buffer sizes)
+# followed by the encoded `data` and its buffers:
+#   [header length: 4 bytes][header][payload][buffer 0][buffer 1]...
+# The supervisor only reads the header and forwards the frame untouched, so
+# `data` is encoded once by the sender and decoded once by the receiver.
+# Payloads above the shared memory threshold are written to a segment named
+# in the header's "shm" field instead, and the frame is just the header. The
+# receiver acknowledges it with a "release" header so the supervisor can
+# unlink the segment once nobody needs it.
+HEADER_FIELDS = ("messageId", "status", "reason", "destination")
+# supervisor bookkeeping carried in the header when present
+HEADER_EXTRAS = ("release", "credit", "limits", "heartbeat", "jobId")
+_LENGTH = struct.Struct("!I")
+
+
+def _pickle_encode(data: Any):
+    buffers = []
+    payload = pickle.dumps(data, protocol=5, buffer_callback=buffers.append)
+    return payload, [buffer.raw() for buffer in buffers]
+
+
+def _pickle_decode(payload, buffers):
+    return pickle.loads(payload, buffers=buffers)
+
+
+def _json_encode(data: Any):
+    return json.dumps(data).encode("utf-8"), []
+
+
+def _json_decode(payload, buffers):
+    return json.loads(bytes(payload))
+
+
+def _msgpack_encode(data: Any):
+    return msgpack.packb(data, use_bin_type=True), []
+
+
+def _msgpack_decode(payload, buffers):
+    return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+
+CODECS = {
+    "pickle": (_pickle_encode, _pickle_decode),
+    "json": (_json_encode, _json_decode),
+    "msgpack": (_msgpack_encode, _msgpack_decode),
+}
+_codec = "pickle"
+_shm_threshold = 0
+# acknowledgements are sent from the receiving thread while others may be sending
+_send_lock = threading.Lock()
+# job of the message being handled, carried into every message sent while handling it
+_job = contextvars.ContextVar("jobId", default=None)
+# messages this process has received and not completed yet: id(message) -> (message, received at),
+# changed by the receiving, handling and heartbeat threads
+_active = {}
+_active_lock = threading.Lock()
+# steps of work finished by this process, reported in heartbeats to tell a long job from a hung one
+_progress = 0
+
+
+def setCodec(name: str) -> str:
+    """Choose the codec of every message this process sends; unknown or unavailable ones fall back to pickle."""
+    global _codec
+    if name not in CODECS:
+        log(f"Unknown message codec {name}, using pickle", "warn")
+        name = "pickle"
+    elif name == "msgpack" and msgpack is None:
+        log("msgpack is not installed, using pickle for messages", "warn")
+        name = "pickle"
+    _codec = name
+    return name
+
+
+def setSharedMemoryThreshold(size: int) -> int:
+    """Payloads larger than `size` bytes travel in shared memory instead of the pipe; 0 disables it."""
+    global _shm_threshold
+    _shm_threshold = max(0, int(size or 0))
+    return _shm_threshold
+
+
+def _untrack(segment: shared_memory.SharedMemory):
+    # the supervisor owns segment lifetimes, not the resource tracker of whichever process touched them last
+    if os.name == "posix":
+        resource_tracker.unregister(segment._name, "shared_memory")
+
+
+def _write_segment(parts: list) -> str:
+    segment = shared_memory.SharedMemory(create=True, size=sum(len(part) for part in parts))
+    _untrack(segment)
+    offset = 0
+    for part in parts:
+        segment.buf[offset:offset + len(part)] = part
+        offset += len(part)
+    segment.close()
+    return segment.name
+
+
+def releaseSegment(name: str) -> None:
+    """Unlink a payload segment; a segment that is already gone is ignored."""
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+def encodeMessage(message: dict, codec: str = None) -> bytes:
+    codec = codec or _codec
+    payload, buffers = CODECS[codec][0](message.get("data", []))
+    header = {field: message.get(field) for field in HEADER_FIELDS}
+    header.update({"codec": codec, "payload": len(payload), "buffers": [len(buffer) for buffer in buffers]})
+    for key in HEADER_EXTRAS:
+        if message.get(key) is not None:
+            header[key] = message[key]
+    body = [payload, *buffers]
+    if _shm_threshold and sum(len(part) for part in body) > _shm_threshold:
+        header["shm"] = _write_segment(body)
+        body = []
+    header = json.dumps(header).encode("utf-8")
+    return b"".join([_LENGTH.pack(len(header)), header, *body])
+
+
+def decodeHeader(frame) -> dict:
+    """Routing fields of a frame, without touching its payload."""
+    (length,) = _LENGTH.unpack_from(frame, 0)
+    return json.loads(bytes(memoryview(frame)[_LENGTH.size:_LENGTH.size + length]))
+
+
+def _decode_body(header: dict, view: memoryview, offset: int):
+    buffers = []
+    position = offset + header["payload"]
+    for size in header["buffers"]:
+        # a writable copy, so arrays rebuilt from it are not read-only
+        buffers.append(bytearray(view[position:position + size]))
+        position += size
+    with view[offset:offset + header["payload"]] as payload:
+        return CODECS[header["codec"]][1](payload, buffers)
+
+
+def _decode(frame):
+    with memoryview(frame) as view:
+        (length,) = _LENGTH.unpack_from(view, 0)
+        offset = _LENGTH.size + length
+        header = json.loads(bytes(view[_LENGTH.size:offset]))
+        message = {field: header.get(field) for field in HEADER_FIELDS}
+        if header.get("jobId") is not None:
+            message["jobId"] = header["jobId"]
+        if header.get("shm"):
+            segment = shared_memory.SharedMemory(name=header["shm"])
+            _untrack(segment)
+            try:
+                message["data"] = _decode_body(header, segment.buf, 0)
+            finally:
+                segment.close()
+        else:
+            message["data"] = _decode_body(header, view, offset)
+    return header, message
+
+
+def decodeMessage(frame) -> dict:
+    return _decode(frame)[1]
+
+
+def setHeader(frame, **fields) -> bytes:
+    """A copy of `frame` with `fields` added to its header; the payload is copied as is."""
+    (length,) = _LENGTH.unpack_from(frame, 0)
+    header = {**decodeHeader(frame), **fields}
+    encoded = json.dumps(header).encode("utf-8")
+    return b"".join([_LENGTH.pack(len(encoded)), encoded, memoryview(frame)[_LENGTH.size + length:]])
+
+
+def useJob(message: dict) -> None:
+    """Make `message`'s job the one carried by messages sent from this context."""
+    _job.set(message.get("jobId"))
+
+
+def currentJob() -> str:
+    return _job.get()
+
+
 def sendMessage(
   conn:Connection,
   messageId:str,
@@ -15,13 +213,144 @@ def sendMessage(
         "status": status,
         "reason": reason,
         "destination": destination,
-        "data": data
+        "data": data,
+        "jobId": _job.get(),
+    }
+    frame = encodeMessage(message)
+    with _send_lock:
+        conn.send_bytes(frame)
+
+
+def receiveMessage(conn:Connection) -> dict:
+    """
+    Block until the next message arrives on `conn` and decode it.
+
+    A payload read from shared memory is acknowledged to the supervisor right
+    away. Messages whose segment was already released (a resend after its
+    consumer acknowledged it) are skipped. The message's job becomes the
+    current one, so what is sent while handling it belongs to the same job.
+    """
+    while True:
+        try:
+            header, message = _decode(conn.recv_bytes())
+        except FileNotFoundError as e:
+            log(f"Dropping message whose shared payload is gone: {e}", "warn")
+            continue
+        if header.get("shm"):
+            ack = encodeMessage({
+                "messageId": message["messageId"],
+                "status": "completed",
+                "reason": "ACK",
+                "destination": ["supervisor"],
+                "release": [header["shm"]],
+            })
+            with _send_lock:
+                conn.send_bytes(ack)
+        with _active_lock:
+            _active[id(message)] = (message, time.monotonic())
+        useJob(message)
+        return message
+
+
+def completeMessage(conn:Connection, message:dict) -> None:
+    """Tell the supervisor this worker has finished handling `message`, so it can route more work here."""
+    with _active_lock:
+        _active.pop(id(message), None)
+    frame = encodeMessage({
+        "messageId": message.get("messageId"),
+        "status": "completed",
+        "reason": "DONE",
+        "destination": ["supervisor"],
+        "jobId": message.get("jobId"),
+    })
+    with _send_lock:
+        conn.send_bytes(frame)
+
+
+def advertiseCredit(conn:Connection, credit:int, limits:dict=None) -> None:
+    """
+    Tell the supervisor how many messages this worker takes at once; it queues the rest.
+
+    `limits` caps single methods below `credit`, e.g. {"run_preprocessing": 2},
+    so the credit left over stays free for the other methods.
+    """
+    frame = encodeMessage({
+        "messageId": "",
+        "status": "healthy",
+        "reason": "CREDIT",
+        "destination": ["supervisor"],
+        "credit": int(credit),
+        "limits": {method: int(limit) for method, limit in (limits or {}).items()} or None,
+    })
+    with _send_lock:
+        conn.send_bytes(frame)
+
+
+def reportProgress(steps:int=1) -> None:
+    """Count finished steps of a long message (a chunk, a batch, a trained model) for the heartbeat."""
+    global _progress
+    with _active_lock:
+        _progress += steps
+
+
+def workerLoad() -> dict:
+    """
+    Load of this process as reported in heartbeats.
+
+    `queue_depth` counts received messages not completed yet, `current` is the
+    destination of the oldest of them and `stalled_for` how long it has been
+    running, which keeps growing when a worker hangs with its process alive.
+    `progress` is the `reportProgress` count, which keeps moving on a long
+    message that is still being worked on.
+    """
+    with _active_lock:
+        active = sorted(_active.values(), key=lambda entry: entry[1])
+        progress = _progress
+    oldest = active[0] if active else None
+    return {
+        "queue_depth": len(active),
+        "current": (oldest[0].get("destination") or [None])[0] if oldest else None,
+        "stalled_for": round(time.monotonic() - oldest[1], 3) if oldest else 0.0,
+        "progress": progress,
+        "rss": psutil.Process().memory_info().rss if psutil else None,
     }
-    conn.send(json.dumps(message))
-    
+
+
+def startHeartbeat(conn:Connection, interval:float) -> threading.Thread:
+    """
+    Send `workerLoad()` to the supervisor every `interval` seconds from a daemon thread.
+
+    The thread stops only when the connection is gone; any other error is
+    logged and the next beat is tried, since a dead heartbeat thread gets a
+    healthy worker restarted.
+    """
+    def beat():
+        while True:
+            try:
+                frame = encodeMessage({
+                    "messageId": "",
+                    "status": "healthy",
+                    "reason": "HEARTBEAT",
+                    "destination": ["supervisor"],
+                    "heartbeat": workerLoad(),
+                })
+                with _send_lock:
+                    conn.send_bytes(frame)
+            except (OSError, EOFError):
+                return
+            except Exception as e:
+                log(f"Heartbeat failed: {e}", "error")
+            time.sleep(interval)
+    thread = threading.Thread(target=beat, name="heartbeat", daemon=True)
+    thread.start()
+    return thread
+
+
 def convertMessage(message)->dict:
     try:
-        if isinstance(message, str):
+        if isinstance(message, (bytes, bytearray, memoryview)):
+            return decodeMessage(message)
+        elif isinstance(message, str):
             return json.loads(message)
         elif isinstance(message, dict):
             return message
@@ -30,4 +359,4 @@ def convertMessage(message)->dict:
             return {}
     except json.JSONDecodeError as e:
         log(f"Failed to decode message: {e}", "error")
-        return {}
\ No newline at end of file
+        return {}
@@ -0,0 +1,98 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class JobTracker:
+    """
+    Per-stage timings of jobs as their messages move through the workers.
+
+    A job starts with a message from an origin worker (a RabbitMQ project
+    request) and its id travels in the header of every message sent while
+    handling it. Each hop is a stage, "Worker/method", with the time it was
+    enqueued by the supervisor, started (delivered to an instance) and
+    finished (the instance reported it done). The project id is the first
+    non-empty third part of a stage's destination. Only the last `max_jobs`
+    jobs are kept.
+    """
+
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()
+        # (jobId, messageId, worker name) -> stages not finished yet, oldest first
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def new_job(self, origin: str) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self.jobs[job_id] = {"jobId": job_id, "projectId": None, "origin": origin, "created": time.time(), "stages": []}
+            while len(self.jobs) > self.max_jobs:
+                dropped, _ = self.jobs.popitem(last=False)
+                self._open = {key: stages for key, stages in self._open.items() if key[0] != dropped}
+        return job_id
+
+    def enqueued(self, job_id: str, message_id: str, destination: str) -> None:
+        parts = destination.split("/")
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            if not job["projectId"] and len(parts) > 2 and parts[2]:
+                job["projectId"] = parts[2]
+            stage = {"stage": "/".join(parts[:2]), "pid": None, "enqueued": time.time(), "started": None, "finished": None}
+            job["stages"].append(stage)
+            self._open.setdefault((job_id, message_id, parts[0].split(".")[0]), []).append(stage)
+
+    def started(self, job_id: str, message_id: str, worker_name: str, pid: int) -> None:
+        with self._lock:
+            for stage in self._open.get((job_id, message_id, worker_name), []):
+                if stage["started"] is None:
+                    stage["started"] = time.time()
+                    stage["pid"] = pid
+                    return
+
+    def finished(self, job_id: str, message_id: str, worker_name: str) -> None:
+        key = (job_id, message_id, worker_name)
+        with self._lock:
+            stages = self._open.get(key, [])
+            for stage in stages:
+                if stage["started"] is not None:
+                    stage["finished"] = time.time()
+                    stages.remove(stage)
+                    if not stages:
+                        del self._open[key]
+                    return
+
+    def jobs_of(self, project_id: str) -> list:
+        """Summaries of the jobs of a project, oldest first."""
+        with self._lock:
+            return [self.summary(job) for job in self.jobs.values() if job["projectId"] == project_id]
+
+    @staticmethod
+    def summary(job: dict) -> dict:
+        """
+        A job with the wait (enqueued to started) and run (started to finished)
+        seconds of every stage, its end-to-end duration so far and the stage
+        that took longest.
+        """
+        now = time.time()
+        stages = []
+        for stage in job["stages"]:
+            started, finished = stage["started"], stage["finished"]
+            stages.append({
+                **stage,
+                "wait": round((started or now) - stage["enqueued"], 3),
+                "run": round((finished or now) - started, 3) if started else None,
+            })
+        done = bool(stages) and all(stage["finished"] for stage in stages)
+        end = max(stage["finished"] for stage in stages) if done else now
+        slowest = max(stages, key=lambda stage: stage["wait"] + (stage["run"] or 0), default=None)
+        return {
+            **{key: value for key, value in job.items() if key != "stages"},
+            "status": "completed" if done else "running",
+            "duration": round(end - job["created"], 3),
+            "bottleneck": slowest["stage"] if slowest else None,
+            "stages": stages,
+        }
@@ -0,0 +1,302 @@
+"""
+Offline stand-in for the Azure OpenAI chat-completions API.
+
+Point AZURE_OPENAI_ENDPOINT at it to run the PreprocessingWorker and
+LLMWorker without network access, for example in CI or for load tests:
+
+    python src/utils/llmStubServer.py --port 8089 --latency-mean 0.8 --rpm 600
+
+Replies are deterministic for a given --seed and request body, and have the
+shape each caller expects: the augmentation {"items": [...]} object (or a
+Python list for the old prompt), the LLMWorker topic-context JSON list, and
+a short explanation paragraph for anything else.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# src, when run as a script from its own directory
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# the same count the augmentation scheduler budgets tokens-per-minute with
+from utils.augmentationScheduler import estimate_tokens
+
+_POSTS = re.compile(r'Posts:\s*(\[.*?\])\s*\n', re.S)
+_TOPICS = re.compile(r'kata kunci berikut:\s*(\[.*\])\s*Buatkan', re.S)
+_TOPIC_COUNT = re.compile(r'yaitu:\s*(\d+)')
+_KEYWORD = re.compile(r'kata kunci berikut di Indonesia:\s*(.+?)\.?\s*$', re.S)
+
+_FILLER = [
+    "masyarakat", "pemerintah", "kebijakan", "harga", "informasi", "daerah", "publik",
+    "ekonomi", "warga", "layanan", "perubahan", "program", "isu", "diskusi", "media",
+]
+
+
+def augmentation_reply(prompt: str, json_mode: bool):
+    """Echo the posts back in the format the prompt asks for, or None when the prompt has no posts."""
+    match = _POSTS.search(prompt)
+    if not match:
+        return None
+    try:
+        posts = json.loads(match.group(1))
+    except ValueError:
+        try:
+            posts = ast.literal_eval(match.group(1))
+        except (ValueError, SyntaxError):
+            return None
+    if posts and isinstance(posts[0], dict):
+        items = [{"id": post.get("id"), "text": " ".join(str(post.get("text", "")).split())} for post in posts]
+        return json.dumps({"items": items}, ensure_ascii=False)
+    texts = [" ".join(str(post).split()) for post in posts]
+    return json.dumps({"items": [{"id": i, "text": t} for i, t in enumerate(texts)]}) if json_mode else repr(texts)
+
+
+def context_reply(prompt: str, rng: random.Random):
+    """Answer the LLMWorker topic-context prompt with one {kata_kunci, kalimat} object per topic."""
+    count = _TOPIC_COUNT.search(prompt)
+    if "kata_kunci" not in prompt or not count:
+        return None
+    topics = []
+    match = _TOPICS.search(prompt)
+    if match:
+        try:
+            topics = ast.literal_eval(match.group(1))
+        except (ValueError, SyntaxError):
+            topics = []
+    reply = []
+    for index in range(int(count.group(1))):
+        words = [str(word) for word in topics[index]][:5] if index < len(topics) else rng.sample(_FILLER, 5)
+        reply.append({
+            "kata_kunci": ", ".join(words),
+            "kalimat": f"Topik ini tentang {' '.join(words[:3])} yang dibicarakan {rng.choice(_FILLER)}.",
+        })
+    return json.dumps(reply, ensure_ascii=False)
+
+
+def explanation_reply(prompt: str, rng: random.Random) -> str:
+    match = _KEYWORD.search(prompt)
+    keyword = match.group(1).strip() if match else "topik ini"
+    words = " ".join(rng.choice(_FILLER) for _ in range(20))
+    return f"{keyword} adalah topik yang banyak dibicarakan di Indonesia terkait {words}."
+
+
+class LLMStubServer:
+    """
+    Threaded HTTP server answering */chat/completions like Azure OpenAI.
+
+    Latency per request is drawn from the configured distribution plus
+    `latency_per_token` for every completion token. Throttling can be
+    injected at random (`rate_429`, `rate_500`) or by a requests-per-minute
+    budget (`rpm`), and 429 replies carry a Retry-After header.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8089,
+        seed: int = 0,
+        latency_distribution: str = "fixed",
+        latency_mean: float = 0.0,
+        latency_std: float = 0.0,
+        latency_per_token: float = 0.0,
+        rate_429: float = 0.0,
+        rate_500: float = 0.0,
+        rpm: int = 0,
+        retry_after: float = 1.0,
+        verbose: bool = False,
+    ):
+        self.seed = seed
+        self.latency_distribution = latency_distribution
+        self.latency_mean = latency_mean
+        self.latency_std = latency_std
+        self.latency_per_token = latency_per_token
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.verbose = verbose
+        self.stats = {"requests": 0, "completed": 0, "throttled": 0, "errors": 0, "kinds": {}}
+        self._lock = threading.Lock()
+        self._attempts = {}
+        self._window = []
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "LLMStubServer":
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def latency(self, rng: random.Random, completion_tokens: int) -> float:
+        if self.latency_distribution == "uniform":
+            base = rng.uniform(max(0.0, self.latency_mean - self.latency_std), self.latency_mean + self.latency_std)
+        elif self.latency_distribution == "normal":
+            base = rng.gauss(self.latency_mean, self.latency_std)
+        elif self.latency_distribution == "lognormal" and self.latency_mean > 0:
+            # parameters chosen so the mean and standard deviation match the configured ones
+            variance = 1 + (self.latency_std / self.latency_mean) ** 2
+            base = rng.lognormvariate(math.log(self.latency_mean / math.sqrt(variance)), math.sqrt(math.log(variance)))
+        else:
+            base = self.latency_mean
+        return max(0.0, base) + self.latency_per_token * completion_tokens
+
+    def complete(self, body: dict):
+        """Return (status, headers, payload, delay) for one chat-completions request body."""
+        raw = json.dumps(body, sort_keys=True)
+        digest = hashlib.sha256(f"{self.seed}\x1f{raw}".encode("utf-8")).hexdigest()
+        with self._lock:
+            self.stats["requests"] += 1
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+            throttled_by_budget = False
+            wait = 0.0
+            if self.rpm:
+                now = time.monotonic()
+                self._window = [at for at in self._window if now - at < 60.0]
+                throttled_by_budget = len(self._window) >= self.rpm
+                if not throttled_by_budget:
+                    self._window.append(now)
+                else:
+                    wait = 60.0 - (now - self._window[0])
+        # retries of the same body get a fresh draw, so injected failures are not permanent
+        rng = random.Random(f"{digest}:{attempt}")
+
+        if throttled_by_budget or rng.random() < self.rate_429:
+            retry_after = wait if throttled_by_budget else self.retry_after
+            with self._lock:
+                self.stats["throttled"] += 1
+            headers = {"retry-after": str(max(1, round(retry_after))), "retry-after-ms": str(int(retry_after * 1000))}
+            payload = {"error": {"code": "429", "message": "Requests to the stub have exceeded the rate limit."}}
+            return 429, headers, payload, 0.0
+        if rng.random() < self.rate_500:
+            with self._lock:
+                self.stats["errors"] += 1
+            return 500, {}, {"error": {"code": "InternalServerError", "message": "Injected stub failure."}}, 0.0
+
+        messages = body.get("messages") or []
+        prompt = str(messages[-1].get("content", "")) if messages else ""
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        content = augmentation_reply(prompt, json_mode)
+        kind = "augmentation"
+        if content is None:
+            content = context_reply(prompt, rng)
+            kind = "context"
+        if content is None:
+            content = explanation_reply(prompt, rng)
+            kind = "explanation"
+        prompt_tokens = sum(estimate_tokens(str(message.get("content", ""))) for message in messages)
+        completion_tokens = estimate_tokens(content)
+        with self._lock:
+            self.stats["completed"] += 1
+            self.stats["kinds"][kind] = self.stats["kinds"].get(kind, 0) + 1
+        payload = {
+            "id": f"chatcmpl-{digest[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+        return 200, {}, payload, self.latency(rng, completion_tokens)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                path = self.path.split("?", 1)[0]
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if not path.endswith("/chat/completions"):
+                    return self._reply(404, {}, {"error": {"code": "404", "message": f"Unknown path {path}"}})
+                try:
+                    body = json.loads(raw or b"{}")
+                except ValueError:
+                    return self._reply(400, {}, {"error": {"code": "400", "message": "Body is not JSON."}})
+                status, headers, payload, delay = server.complete(body)
+                if delay:
+                    time.sleep(delay)
+                self._reply(status, headers, payload)
+
+            def do_GET(self):
+                if self.path.split("?", 1)[0] == "/stats":
+                    with server._lock:
+                        payload = json.loads(json.dumps(server.stats))
+                    return self._reply(200, {}, payload)
+                self._reply(404, {}, {"error": {"code": "404", "message": "Not found"}})
+
+            def _reply(self, status, headers, payload):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                if server.verbose:
+                    super().log_message(format, *args)
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible chat-completions stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-distribution", choices=["fixed", "uniform", "normal", "lognormal"], default="fixed")
+    parser.add_argument("--latency-mean", type=float, default=0.0, help="seconds")
+    parser.add_argument("--latency-std", type=float, default=0.0, help="seconds (half-width for uniform)")
+    parser.add_argument("--latency-per-token", type=float, default=0.0, help="extra seconds per completion token")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="probability of an injected 429")
+    parser.add_argument("--rate-500", type=float, default=0.0, help="probability of an injected 500")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before answering 429 (0 = unlimited)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds of injected 429s")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    server = LLMStubServer(**vars(args))
+    print(f"LLM stub listening on {server.url} (set AZURE_OPENAI_ENDPOINT to this URL)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
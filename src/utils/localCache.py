@@ -0,0 +1,143 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class LocalCache:
+    """
+    JSON key/value cache stored in a local SQLite file, with an optional Redis
+    tier in front of it.
+
+    Entries older than `ttl` seconds are treated as missing (0 keeps them
+    forever) and, once a namespace holds more than `max_entries` rows, the
+    least recently read ones are evicted (0 disables the limit). Several
+    namespaces, and several processes, can share one file: it is opened in
+    WAL mode and a writer waits up to `timeout` seconds for another one's
+    lock. Expiry and eviction run once per `max_entries / 100` written rows,
+    so a namespace can go about 1% over its limit between two passes.
+    """
+
+    _SQLITE_MAX_VARIABLES = 500
+
+    def __init__(self, path: str, namespace: str, ttl: int = 0, max_entries: int = 0, redis_client=None, timeout: float = 30):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.redis = redis_client
+        self.redis_prefix = f"CACHE_{namespace.upper()}_"
+        self._lock = threading.Lock()
+        # rows written since the last expiry/eviction pass
+        self._written = 0
+        self._evict_every = max(1, max_entries // 100)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=timeout)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA busy_timeout = {int(timeout * 1000)}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (namespace, accessed_at)")
+        self._db.commit()
+
+    def get(self, key: str, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set(self, key: str, value) -> None:
+        self.set_many({key: value})
+
+    def get_many(self, keys: list) -> dict:
+        """Return a dict with the cached value of every key that is present and not expired."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        if self.redis is not None and keys:
+            try:
+                values = self.redis.mget([self.redis_prefix + key for key in keys])
+                found = {key: json.loads(value) for key, value in zip(keys, values) if value is not None}
+            except Exception:
+                # the disk tier is authoritative, a Redis outage only costs latency
+                found = {}
+
+        missing = [key for key in keys if key not in found]
+        from_disk = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(missing), self._SQLITE_MAX_VARIABLES):
+                part = missing[i:i + self._SQLITE_MAX_VARIABLES]
+                placeholders = ",".join("?" * len(part))
+                query = f"SELECT key, value FROM cache WHERE namespace = ? AND key IN ({placeholders})"
+                params = [self.namespace, *part]
+                if self.ttl:
+                    query += " AND created_at >= ?"
+                    params.append(now - self.ttl)
+                for key, value in self._db.execute(query, params):
+                    from_disk[key] = json.loads(value)
+            if from_disk:
+                self._db.executemany(
+                    "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    [(now, self.namespace, key) for key in from_disk],
+                )
+                self._db.commit()
+
+        if from_disk and self.redis is not None:
+            self._set_redis(from_disk)
+        found.update(from_disk)
+        return found
+
+    def set_many(self, items: dict) -> None:
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                [(self.namespace, key, json.dumps(value), now, now) for key, value in items.items()],
+            )
+            self._written += len(items)
+            if self._written >= self._evict_every:
+                self._written = 0
+                self._evict(now)
+            self._db.commit()
+        if self.redis is not None:
+            self._set_redis(items)
+
+    def _evict(self, now: float) -> None:
+        if self.ttl:
+            self._db.execute(
+                "DELETE FROM cache WHERE namespace = ? AND created_at < ?",
+                (self.namespace, now - self.ttl),
+            )
+        if self.max_entries:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)
+            ).fetchone()
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                    " SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+                    (self.namespace, self.namespace, count - self.max_entries),
+                )
+
+    def _set_redis(self, items: dict) -> None:
+        try:
+            pipe = self.redis.pipeline()
+            for key, value in items.items():
+                if self.ttl:
+                    pipe.setex(self.redis_prefix + key, self.ttl, json.dumps(value))
+                else:
+                    pipe.set(self.redis_prefix + key, json.dumps(value))
+            pipe.execute()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
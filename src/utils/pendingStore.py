@@ -0,0 +1,175 @@
+import json
+import os
+import struct
+import threading
+
+from utils.handleMessage import decodeHeader
+from utils.log import log
+
+# every log record: header length, frame length, JSON header, frame
+_RECORD = struct.Struct(">II")
+
+
+class PendingStore:
+    """
+    Messages sent to a worker type that it has not finished yet.
+
+    Entries are kept per worker type in send order and indexed by messageId,
+    so adding and acknowledging a message does not scan the others. With a
+    `path`, every change is appended to a write-ahead log there and the log
+    is replayed when the store is created, so a restarted supervisor sends
+    again what its workers had not finished. The log is rewritten with only
+    the live entries once most of it is acknowledged.
+    """
+
+    def __init__(self, path: str = "", fsync: bool = False, compact_after: int = 1000):
+        self.path = path
+        self.fsync = fsync
+        self.compact_after = compact_after
+        # worker name -> {seq: message} in send order, (worker name, messageId) -> [seq]
+        self._entries = {}
+        self._index = {}
+        # shared memory name -> pending messages whose payload is in it
+        self._segments = {}
+        self._seq = 0
+        self._dead = 0
+        self._file = None
+        self._lock = threading.RLock()
+        if path:
+            self._replay()
+
+    def add(self, worker_name: str, message: dict) -> None:
+        with self._lock:
+            self._seq += 1
+            self._insert(worker_name, self._seq, message)
+            self._append_add(worker_name, self._seq, message)
+            self._flush()
+
+    def remove(self, worker_name: str, message_id: str, pid: int = None) -> list:
+        """Drop the messages with `message_id` (only those delivered to `pid` when given) and return them."""
+        with self._lock:
+            entries = self._entries.get(worker_name, {})
+            seqs = [
+                seq for seq in self._index.get((worker_name, message_id), [])
+                if pid is None or entries[seq].get('pid') in (pid, None)
+            ]
+            return self._delete(worker_name, seqs)
+
+    def discard(self, worker_name: str, message: dict) -> None:
+        """Drop this very message, not the others with its messageId."""
+        with self._lock:
+            entries = self._entries.get(worker_name, {})
+            seqs = [seq for seq in self._index.get((worker_name, message.get('messageId')), []) if entries[seq] is message]
+            self._delete(worker_name, seqs)
+
+    def messages(self, worker_name: str) -> list:
+        with self._lock:
+            return list(self._entries.get(worker_name, {}).values())
+
+    __getitem__ = messages
+
+    def uses_segment(self, name: str) -> bool:
+        return self._segments.get(name, 0) > 0
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _insert(self, worker_name: str, seq: int, message: dict) -> None:
+        self._entries.setdefault(worker_name, {})[seq] = message
+        self._index.setdefault((worker_name, message.get('messageId')), []).append(seq)
+        if message.get('shm'):
+            self._segments[message['shm']] = self._segments.get(message['shm'], 0) + 1
+
+    def _delete(self, worker_name: str, seqs: list) -> list:
+        removed = []
+        for seq in seqs:
+            message = self._entries[worker_name].pop(seq)
+            key = (worker_name, message.get('messageId'))
+            self._index[key].remove(seq)
+            if not self._index[key]:
+                del self._index[key]
+            if message.get('shm'):
+                self._segments[message['shm']] -= 1
+                if not self._segments[message['shm']]:
+                    del self._segments[message['shm']]
+            removed.append(message)
+        if removed and self._file:
+            self._write({"op": "remove", "worker": worker_name, "seqs": seqs})
+            self._dead += len(seqs)
+            if self._dead >= self.compact_after and self._dead > len(self):
+                self._compact()
+            self._flush()
+        return removed
+
+    def _append_add(self, worker_name: str, seq: int, message: dict) -> None:
+        # only frames received from workers are logged, they are the bytes a resend needs
+        if self._file and message.get('frame'):
+            self._write({"op": "add", "worker": worker_name, "seq": seq}, message['frame'])
+
+    def _write(self, record: dict, frame: bytes = b"") -> None:
+        header = json.dumps(record).encode("utf-8")
+        self._file.write(_RECORD.pack(len(header), len(frame)) + header + frame)
+
+    def _flush(self) -> None:
+        if self._file:
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def _replay(self) -> None:
+        """Load the messages the log still holds, then rewrite it with only those."""
+        data = b""
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                data = f.read()
+        live = {}
+        offset = 0
+        while offset + _RECORD.size <= len(data):
+            header_length, frame_length = _RECORD.unpack_from(data, offset)
+            start = offset + _RECORD.size
+            end = start + header_length + frame_length
+            if end > len(data):
+                break
+            record = json.loads(data[start:start + header_length])
+            if record["op"] == "add":
+                live[record["seq"]] = (record["worker"], data[start + header_length:end])
+                self._seq = max(self._seq, record["seq"])
+            else:
+                for seq in record["seqs"]:
+                    live.pop(seq, None)
+            offset = end
+        if offset < len(data):
+            log(f"Ignoring {len(data) - offset} bytes of a partly written record at the end of {self.path}", "warn")
+        for seq in sorted(live):
+            worker_name, frame = live[seq]
+            try:
+                self._insert(worker_name, seq, {**decodeHeader(frame), 'frame': frame})
+            except Exception as e:
+                log(f"Skipping unreadable pending message {seq} in {self.path}: {e}", "error")
+        if live:
+            log(f"Replayed {len(self)} pending messages from {self.path}", "info")
+        self._compact()
+
+    def _compact(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self._file:
+            self._file.close()
+        temporary = f"{self.path}.tmp"
+        self._file = open(temporary, "wb")
+        for worker_name, entries in self._entries.items():
+            for seq, message in entries.items():
+                self._append_add(worker_name, seq, message)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(temporary, self.path)
+        self._file = open(self.path, "ab")
+        self._dead = 0
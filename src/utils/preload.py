@@ -0,0 +1,49 @@
+import importlib
+import time
+from functools import lru_cache
+
+from utils.log import log
+
+
+def preload_modules(modules: list) -> dict:
+    """Import `modules` and return the seconds each one took; modules that fail to import are skipped."""
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            log(f"Could not preload {name}: {e}", "warn")
+            continue
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+@lru_cache(maxsize=None)
+def stemmer():
+    """Sastrawi stemmer; its dictionary is read once per process, or once in the forkserver."""
+    from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+    return StemmerFactory().create_stemmer()
+
+
+@lru_cache(maxsize=None)
+def root_words() -> frozenset:
+    """Sastrawi's root word dictionary."""
+    from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+    return frozenset(StemmerFactory().get_words())
+
+
+def preload(settings: dict) -> dict:
+    """Load everything `settings` asks for and return the seconds each part took."""
+    start = time.perf_counter()
+    timings = preload_modules(settings.get("preload", []))
+    if settings.get("preload_stemmer"):
+        part = time.perf_counter()
+        try:
+            stemmer()
+            root_words()
+            timings["stemmer"] = time.perf_counter() - part
+        except Exception as e:
+            log(f"Could not preload the stemmer: {e}", "warn")
+    log(f"Preloaded {len(timings)} modules and resources in {time.perf_counter() - start:.1f}s", "info")
+    return timings
@@ -0,0 +1,79 @@
+import hashlib
+import threading
+
+STRATEGIES = ("round_robin", "least_outstanding", "sticky")
+
+
+class Router:
+    """
+    Pick which instance of a worker type receives a message.
+
+    Every instance has an in-flight counter, raised when a message is sent to
+    it and lowered when it reports the message done. Strategies:
+
+    - round_robin: instances in turn
+    - least_outstanding: the instance with the fewest messages in flight,
+      ties broken in turn
+    - sticky: the same instance for the same project id (the third part of
+      "Worker/method/projectId"), by rendezvous hashing so only the projects
+      of a dead instance move when the set of instances changes
+    """
+
+    def __init__(self, default: str = "least_outstanding"):
+        self.default = default if default in STRATEGIES else "least_outstanding"
+        self.strategies = {}
+        self.in_flight = {}
+        self._turns = {}
+        self._lock = threading.Lock()
+
+    def set_strategy(self, worker_name: str, strategy: str) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown routing strategy {strategy}, expected one of {', '.join(STRATEGIES)}")
+        self.strategies[worker_name] = strategy
+
+    def strategy(self, worker_name: str) -> str:
+        return self.strategies.get(worker_name, self.default)
+
+    def pick(self, worker_name: str, pids: list, destination: str = "", available: list = None) -> int:
+        """
+        Choose one of `pids` for a message to `destination` and count it as in flight.
+
+        `available` limits the choice to instances that can take a message
+        now. A sticky message whose own instance is not available gets None
+        and waits for it rather than moving to another one.
+        """
+        available = sorted(pids if available is None else available)
+        if not pids or not available:
+            return None
+        strategy = self.strategy(worker_name)
+        with self._lock:
+            if strategy == "sticky" and self._key(destination):
+                key = self._key(destination)
+                pid = max(pids, key=lambda pid: hashlib.sha1(f"{key}:{pid}".encode("utf-8")).digest())
+                if pid not in available:
+                    return None
+            else:
+                turn = self._turns.get(worker_name, 0)
+                self._turns[worker_name] = turn + 1
+                ordered = available[turn % len(available):] + available[:turn % len(available)]
+                if strategy == "least_outstanding":
+                    pid = min(ordered, key=lambda pid: self.in_flight.get(pid, 0))
+                else:
+                    pid = ordered[0]
+            self.in_flight[pid] = self.in_flight.get(pid, 0) + 1
+        return pid
+
+    def done(self, pid: int) -> None:
+        with self._lock:
+            if self.in_flight.get(pid, 0) > 0:
+                self.in_flight[pid] -= 1
+
+    def forget(self, pid: int) -> None:
+        """Drop the counter of an instance that is gone."""
+        with self._lock:
+            self.in_flight.pop(pid, None)
+
+    @staticmethod
+    def _key(destination: str) -> str:
+        parts = destination.split("/")
+        return parts[2] if len(parts) > 2 else ""
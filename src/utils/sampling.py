@@ -0,0 +1,80 @@
+import random
+from datetime import date, datetime
+
+_MONTHS = {
+    "Jan": 1, "Feb": 2, "Mar": 3, "Apr": 4, "May": 5, "Jun": 6,
+    "Jul": 7, "Aug": 8, "Sep": 9, "Oct": 10, "Nov": 11, "Dec": 12,
+}
+
+
+def day_of(created_at) -> str:
+    """
+    Day stratum of a tweet's created_at.
+
+    Understands Twitter's "Mon Jan 01 10:00:00 +0000 2024" format, ISO
+    strings and datetime/date values; anything else falls in "unknown".
+    """
+    if isinstance(created_at, (datetime, date)):
+        return created_at.strftime("%Y-%m-%d")
+    if isinstance(created_at, str):
+        parts = created_at.split()
+        if len(parts) == 6 and parts[1] in _MONTHS and parts[2].isdigit() and parts[5].isdigit():
+            return f"{parts[5]}-{_MONTHS[parts[1]]:02d}-{int(parts[2]):02d}"
+        if len(created_at) >= 10 and created_at[4] == "-" and created_at[7] == "-":
+            return created_at[:10]
+    return "unknown"
+
+
+def allocate(counts: dict, k: int) -> dict:
+    """
+    Split `k` slots across strata in proportion to their sizes (largest remainder).
+
+    When there are at least as many slots as strata, every stratum keeps at
+    least one item so quiet days are not dropped entirely; the slot is taken
+    from the largest quota.
+    """
+    total = sum(counts.values())
+    if k >= total:
+        return dict(counts)
+    shares = {key: k * count / total for key, count in counts.items()}
+    quotas = {key: int(share) for key, share in shares.items()}
+    leftover = k - sum(quotas.values())
+    for key in sorted(shares, key=lambda key: (shares[key] - quotas[key], counts[key]), reverse=True)[:leftover]:
+        quotas[key] += 1
+    if k >= len(counts):
+        for key in [key for key, quota in quotas.items() if quota == 0]:
+            largest = max(quotas, key=quotas.get)
+            quotas[largest] -= 1
+            quotas[key] = 1
+    return quotas
+
+
+def stratified_sample(strata: list, k: int, seed: int = 0) -> list:
+    """
+    Return the sorted indices of a sample of at most `k` items.
+
+    `strata` holds the stratum of each item in input order. Quotas are
+    proportional to stratum sizes and every stratum is sampled with its own
+    reservoir (Algorithm R) in a single pass over the items, so the result
+    is uniform within each day and deterministic for a given seed.
+    """
+    if k <= 0 or k >= len(strata):
+        return list(range(len(strata)))
+    counts = {}
+    for stratum in strata:
+        counts[stratum] = counts.get(stratum, 0) + 1
+    quotas = allocate(counts, k)
+    rng = random.Random(seed)
+    reservoirs = {stratum: [] for stratum in counts}
+    seen = dict.fromkeys(counts, 0)
+    for index, stratum in enumerate(strata):
+        quota = quotas[stratum]
+        seen[stratum] += 1
+        reservoir = reservoirs[stratum]
+        if len(reservoir) < quota:
+            reservoir.append(index)
+        elif quota:
+            slot = rng.randrange(seen[stratum])
+            if slot < quota:
+                reservoir[slot] = index
+    return sorted(index for reservoir in reservoirs.values() for index in reservoir)
@@ -0,0 +1,74 @@
+import contextlib
+import time
+
+import psutil
+
+
+class StageTimer:
+    """
+    Per-job timings of pipeline stages.
+
+    Each stage records wall time, process CPU time, the number of items it
+    handled and the change in resident memory. A stage that runs several
+    times (once per chunk) is accumulated under the same name. CPU time is
+    process-wide, so it also counts other jobs running at the same moment.
+    """
+
+    def __init__(self):
+        self.stages: dict = {}
+        self.started_at = time.time()
+        self._wall_start = time.perf_counter()
+        self._process = psutil.Process()
+
+    def rss_mb(self) -> float:
+        return self._process.memory_info().rss / (1024 * 1024)
+
+    @contextlib.contextmanager
+    def stage(self, name: str, items: int = 0):
+        """Time the block as stage `name`. Set `items` on the yielded dict when the count is only known inside."""
+        record = {"items": items}
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        rss = self.rss_mb()
+        try:
+            yield record
+        finally:
+            self.add(
+                name,
+                wall=time.perf_counter() - wall,
+                cpu=time.process_time() - cpu,
+                items=record["items"],
+                memory_delta=self.rss_mb() - rss,
+            )
+
+    def add(self, name: str, wall: float, cpu: float = 0.0, items: int = 0, memory_delta: float = 0.0) -> None:
+        entry = self.stages.setdefault(
+            name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "items": 0, "memory_delta_mb": 0.0, "peak_rss_mb": 0.0}
+        )
+        entry["calls"] += 1
+        entry["wall_s"] += wall
+        entry["cpu_s"] += cpu
+        entry["items"] += items
+        entry["memory_delta_mb"] += memory_delta
+        entry["peak_rss_mb"] = max(entry["peak_rss_mb"], self.rss_mb())
+
+    def summary(self) -> dict:
+        stages = {}
+        for name, entry in self.stages.items():
+            stages[name] = {
+                **{key: round(value, 4) if isinstance(value, float) else value for key, value in entry.items()},
+                "items_per_s": round(entry["items"] / entry["wall_s"], 2) if entry["wall_s"] > 0 else None,
+            }
+        return {
+            "started_at": self.started_at,
+            "total_wall_s": round(time.perf_counter() - self._wall_start, 4),
+            "stages": stages,
+        }
+
+    def format(self) -> str:
+        """One-line digest for the log, slowest stage first."""
+        ordered = sorted(self.stages.items(), key=lambda item: item[1]["wall_s"], reverse=True)
+        return ", ".join(
+            f"{name}={entry['wall_s']:.2f}s/{entry['cpu_s']:.2f}cpu/{entry['items']}it/{entry['memory_delta_mb']:+.1f}MB"
+            for name, entry in ordered
+        )
@@ -0,0 +1,44 @@
+from array import array
+from collections import Counter
+
+
+class TokenCorpus:
+    """
+    Append-only corpus that keeps every document as a compact array of token ids.
+
+    Only the vocabulary, the id arrays and the term frequencies needed for
+    stopword curation are kept, so intermediate token lists can be dropped
+    as soon as a chunk has been added.
+    """
+
+    def __init__(self):
+        self.word2id: dict = {}
+        self.id2word: list = []
+        self.word_freq: Counter = Counter()
+        self._docs: list = []
+
+    def add(self, tokens: list) -> None:
+        ids = array('I')
+        for token in tokens:
+            token_id = self.word2id.get(token)
+            if token_id is None:
+                token_id = len(self.id2word)
+                self.word2id[token] = token_id
+                self.id2word.append(token)
+            ids.append(token_id)
+        self.word_freq.update(tokens)
+        self._docs.append(ids)
+
+    def extend(self, documents: list) -> None:
+        for tokens in documents:
+            self.add(tokens)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __getitem__(self, index: int) -> list:
+        return [self.id2word[i] for i in self._docs[index]]
+
+    def __iter__(self):
+        for ids in self._docs:
+            yield [self.id2word[i] for i in ids]
@@ -0,0 +1,64 @@
+import numpy
+from scipy import sparse
+
+
+def bag_of_words(documents: list, word2id: dict) -> sparse.csr_matrix:
+    """Count matrix (documents x vocabulary) of token lists or space-separated strings; unknown words are ignored."""
+    indptr = [0]
+    indices = []
+    for document in documents:
+        tokens = document.split() if isinstance(document, str) else document
+        indices.extend(word2id[token] for token in tokens if token in word2id)
+        indptr.append(len(indices))
+    data = numpy.ones(len(indices), dtype=numpy.float64)
+    matrix = sparse.csr_matrix((data, indices, indptr), shape=(len(documents), len(word2id)))
+    matrix.sum_duplicates()
+    return matrix
+
+
+def infer_documents(
+    documents: list,
+    vocabulary: list,
+    topic_word,
+    topic_prior=None,
+    iterations: int = 30,
+    batch_size: int = 10000,
+):
+    """
+    Fold unseen documents into a trained topic model.
+
+    `topic_word` is the (topics x vocabulary) matrix of word probabilities
+    per topic, in the order of `vocabulary`. Each document's topic
+    proportions are estimated by EM with the topics held fixed, starting
+    from `topic_prior` (uniform by default), so documents without any known
+    word keep the prior. Returns (topic proportions, best topic, its
+    proportion) as numpy arrays.
+    """
+    beta = numpy.clip(numpy.asarray(topic_word, dtype=numpy.float64), 1e-12, None)
+    beta /= beta.sum(axis=1, keepdims=True)
+    num_topics = beta.shape[0]
+    prior = numpy.full(num_topics, 1.0 / num_topics) if topic_prior is None else numpy.asarray(topic_prior, dtype=numpy.float64)
+    prior = prior / prior.sum()
+    word2id = {word: index for index, word in enumerate(vocabulary)}
+
+    thetas = []
+    for start in range(0, len(documents), batch_size):
+        counts = bag_of_words(documents[start:start + batch_size], word2id)
+        entries = counts.tocoo()
+        rows, cols, values = entries.row, entries.col, entries.data
+        theta = numpy.tile(prior, (counts.shape[0], 1))
+        for _ in range(iterations):
+            # p(word | document) for every non-zero entry under the current proportions
+            denominator = numpy.einsum('nk,kn->n', theta[rows], beta[:, cols])
+            weights = sparse.csr_matrix((values / denominator, (rows, cols)), shape=counts.shape)
+            updated = theta * (weights @ beta.T)
+            totals = updated.sum(axis=1, keepdims=True)
+            empty = totals[:, 0] == 0
+            updated[~empty] /= totals[~empty]
+            updated[empty] = prior
+            theta = updated
+        thetas.append(theta)
+
+    theta = numpy.vstack(thetas) if thetas else numpy.empty((0, num_topics))
+    best = theta.argmax(axis=1)
+    return theta, best, theta[numpy.arange(len(best)), best]
@@ -6,7 +6,7 @@ from datetime import datetime
 import traceback
 import asyncio
 from utils.log import log
-from utils.handleMessage import sendMessage
+from utils.handleMessage import sendMessage, receiveMessage, completeMessage, advertiseCredit
 import time
 
 import redis
@@ -19,6 +19,8 @@ class CacheWorker(Worker):
     # dont edit this part
     ################
     isBusy: bool = False
+    # messages handled at once, the supervisor queues the rest
+    credit: int = 1
     redisInstance: redis.Redis
     prefixKey: str = "CACHE_TOPIC_"
     conn: Connection
@@ -62,22 +64,11 @@ class CacheWorker(Worker):
 
     async def listen_task(self):
         print("CacheWorker is listening for messages...")
+        advertiseCredit(self.conn, self.credit)
         while True:
             try:
-                # Change poll(1) to poll(0.1) to reduce blocking time
-                if CacheWorker.conn.poll(0.1):  # Shorter timeout
-                    message = self.conn.recv()
-                    if self.isBusy:
-                        print("CacheWorker is busy, ignoring message.")
-                        self.sendToOtherWorker(
-                            messageId=message.get("messageId"),
-                            destination=message.get("destination", []),
-                            data=message.get("data", {}),
-                            status="failed",
-                            reason="SERVER_BUSY"
-                        )
-                        continue
-                    
+                if CacheWorker.conn.poll(None):  # Block until a message arrives
+                    message = receiveMessage(self.conn)
                     self.isBusy = True
                     
                     try:
@@ -130,6 +121,7 @@ class CacheWorker(Worker):
                         )
                     finally:
                         self.isBusy = False
+                        completeMessage(self.conn, message)
           
             except EOFError:
                 log("Connection closed by supervisor", 'error')
@@ -139,7 +131,6 @@ class CacheWorker(Worker):
                 print(e)
                 log(f"Message loop error: {e}", 'error')
                 break
-            await asyncio.sleep(0.1)  # Sleep to prevent busy-waiting
 
     def sendToOtherWorker(self, messageId: str, destination: list, data: dict, status: str, reason: str = ""):
         """Helper method to send messages to other workers"""
@@ -5,7 +5,7 @@ import traceback
 from pymongo import MongoClient
 import asyncio
 from utils.log import log
-from utils.handleMessage import sendMessage
+from utils.handleMessage import sendMessage, receiveMessage, completeMessage, advertiseCredit
 import time
 
 
@@ -15,6 +15,8 @@ class DatabaseInteractionWorker(Worker):
   # dont edit this part
   ################
   _isBusy: bool = False
+  # messages handled at once, the supervisor queues the rest
+  credit: int = 1
   _client: MongoClient 
   _db: str 
   _dbTweet:str
@@ -35,22 +37,13 @@ class DatabaseInteractionWorker(Worker):
 
   
   async def listen_task(self) -> None:
+    advertiseCredit(self.conn, self.credit)
     while True:
       try:
-          if self.conn.poll(1):  # Check for messages with 1 second timeout
-              if(self._isBusy):
-                print("DatabaseInteractionWorker is busy, ignoring message.")
-                self.sendToOtherWorker(
-                    messageId=message.get("messageId"),
-                    destination=message.get("destination", []),
-                    data=message.get("data", {}),
-                    status="failed",
-                    reason="SERVER_BUSY"
-                )
-                return
+          if self.conn.poll(None):  # Block until a message arrives
               self._isBusy =True
 
-              message = self.conn.recv()
+              message = receiveMessage(self.conn)
               dest = [
                   d
                   for d in message["destination"]
@@ -69,6 +62,7 @@ class DatabaseInteractionWorker(Worker):
                   messageId=message["messageId"],
                   data=convertObjectIdToStr(result.get('data', [])),
               )
+              completeMessage(self.conn, message)
               self._isBusy =False
       except EOFError:
           log("Connection closed by supervisor",'error')
@@ -170,7 +164,8 @@ class DatabaseInteractionWorker(Worker):
             'full_text': 1,
             'username': 1,
             'in_reply_to_screen_name': 1,
-            'tweet_url': 1
+            'tweet_url': 1,
+            'created_at': 1
         }
     }
     pipeline.append(project_stage)
@@ -182,7 +177,8 @@ class DatabaseInteractionWorker(Worker):
           "tweets":list(cursor),
           "keyword": keyword,
           'start_date': start_date,
-          'end_date': end_date
+          'end_date': end_date,
+          'max_documents': data.get('max_documents'),
           },
         "destination": [f"PreprocessingWorker/run_preprocessing/{id}"]
     }
@@ -1,5 +1,7 @@
 import asyncio
 from multiprocessing.connection import Connection
+import os
+import shutil
 import threading
 import traceback
 import uuid
@@ -7,7 +9,8 @@ import time
 
 import numpy as np
 from  utils.log import log 
-from utils.handleMessage import sendMessage, convertMessage
+from utils.handleMessage import sendMessage, convertMessage, receiveMessage, completeMessage, advertiseCredit, reportProgress
+from utils.topicInference import infer_documents
 
 from octis.models.ETM import ETM
 from octis.evaluation_metrics.coherence_metrics import Coherence
@@ -25,6 +28,8 @@ class ETMWorker(Worker):
     ###############
     conn:Connection
     _isBusy: bool = False
+    # messages handled at once, the supervisor queues the rest
+    credit: int = 1
 
         
     def run(self, conn: Connection, config:dict):
@@ -34,8 +39,7 @@ class ETMWorker(Worker):
         #### add your worker initialization code here
         
         self.dataset_path = './src/vocabs/octis_data/'
-        self.dataset =Dataset()
-        self.dataset.load_custom_dataset_from_folder(self.dataset_path)
+        self.dataset = self.load_dataset(self.dataset_path)
         log("ETMWorker initialized", "info")
         
         #### until this part
@@ -45,10 +49,11 @@ class ETMWorker(Worker):
 
 
     async def listen_task(self):
+        advertiseCredit(self.conn, self.credit)
         while True:
             try:
-                if ETMWorker.conn.poll(1):  # Check for messages with 1 second timeout
-                    message = self.conn.recv()
+                if ETMWorker.conn.poll(None):  # Block until a message arrives
+                    message = receiveMessage(self.conn)
                     dest = [
                         d
                         for d in message["destination"]
@@ -59,6 +64,7 @@ class ETMWorker(Worker):
                     param= destSplited[2]
                     instance_method = getattr(self,method)
                     instance_method(id=param,data=message['data'],message=message)
+                    completeMessage(self.conn, message)
             except EOFError:
                 break
             except Exception as e:
@@ -79,7 +85,11 @@ class ETMWorker(Worker):
     # add your worker methods here
     ##########################################
     
-    
+    def load_dataset(self, path):
+        dataset = Dataset()
+        dataset.load_custom_dataset_from_folder(path)
+        return dataset
+
     def create_and_train_etm(self, num_topics):
       try:
         log(f"Creating and training ETM model with {num_topics} topics", "info")
@@ -111,8 +121,8 @@ class ETMWorker(Worker):
         coh_score_list = []
         topics = range(1, 7)
 
-        # 2) Parallel execution
-        results = Parallel(n_jobs=-1)(
+        # 2) Parallel execution, results come back one trained model at a time
+        results = Parallel(n_jobs=-1, return_as="generator")(
             delayed(self.create_and_train_etm)(topic)
             for topic in topics
         )
@@ -120,6 +130,7 @@ class ETMWorker(Worker):
         # print("\n=== Summary ===")
         # 3) Process results
         for num_topics, _, model_output in results:
+            reportProgress()
             coh_score = self.evaluate_coherence(self.dataset, model_output)
             print(f"[{num_topics} topics] Coherence: {coh_score:.4f}")
 
@@ -130,6 +141,7 @@ class ETMWorker(Worker):
         # print(f"\nBest model has {best_topic} topics with coherence={best_coh:.4f}",end="\n")
 
         model = self.create_and_train_etm(best_topic)
+        reportProgress()
         return model
         
     # def document(self, data_tweet, etm_model):
@@ -151,6 +163,27 @@ class ETMWorker(Worker):
         
     #     return documents_probability
     
+    def infer_unsampled(self, data_tweet, etm_model):
+        """Assign topics to tweets left out of training by sampling, with the trained topics held fixed."""
+        output = etm_model[2]
+        # the average training document is the starting point of every fold-in
+        prior = np.asarray(output['topic-document-matrix']).mean(axis=1)
+        _, topics, probabilities = infer_documents(
+            [tweet['full_text'] for tweet in data_tweet],
+            self.dataset.get_vocabulary(),
+            output['topic-word-matrix'],
+            prior,
+        )
+        return [
+            {
+                **tweet,
+                "topic": str(topic_index),
+                "probability": str(probability),
+                "inferred": True,
+            }
+            for tweet, topic_index, probability in zip(data_tweet, topics, probabilities)
+        ]
+
     def document(self, data_tweet, etm_model):
         train_corpus = self.dataset.get_partitioned_corpus()[0]
         full_texts = [doc['full_text'] for doc in data_tweet]
@@ -167,14 +200,18 @@ class ETMWorker(Worker):
         print("Number of documents:", num_docs)
         try:
             
-            for i in range(num_docs):
-                column = probs[:, i]
+            for i, tweet in enumerate(data_tweet):
+                # duplicates collapsed during preprocessing share their representative's column
+                doc_index = tweet.get('doc_index', i)
+                if doc_index >= num_docs:
+                    continue
+                column = probs[:, doc_index]
                 topic_index = np.argmax(column)
                 probability = column[topic_index]
                 print("Doc {}: topic={}, prob={}".format(i+1, topic_index+1, probability))
 
                 full_texts[i] ={
-                    **data_tweet[i],
+                    **tweet,
                     "full_text": full_texts[i],
                     "topic": str(topic_index),
                     "probability": str(probability)
@@ -201,6 +238,9 @@ class ETMWorker(Worker):
     def run_etm(self,id,data,message):
       try:
         log(f"Running ETM with id {id}", "info")
+        if data.get('dataset_path'):
+            # every project gets its own corpus directory from the PreprocessingWorker
+            self.dataset = self.load_dataset(data['dataset_path'])
         generated_topic = self.generateTopic()
         num_of_topic = generated_topic[0]
         topics = generated_topic[2]['topics']
@@ -214,6 +254,10 @@ class ETMWorker(Worker):
         print(f"Number of tweets: {len(tweets)}",)
         documents_prob = self.document(data_tweet=tweets, etm_model=generated_topic)
         log(f"Generated {len(documents_prob)}/{len(tweets)}/{len(data['tweets'])} documents with topics", "info")
+        unsampled = data.get('unsampled_tweets') or []
+        if unsampled:
+            documents_prob.extend(self.infer_unsampled(unsampled, generated_topic))
+            log(f"Inferred topics for {len(unsampled)} tweets left out by sampling", "info")
         self.sendToOtherWorker(
             destination=[f"DatabaseInteractionWorker/saveDocuments/{id}"],
             messageId=str(uuid.uuid4()),
@@ -236,6 +280,9 @@ class ETMWorker(Worker):
                 "end_date": end_date,
             }
         )
+        if data.get('dataset_path') and os.path.abspath(data['dataset_path']) != os.path.abspath(self.dataset_path):
+            # the project's results are out, a failed run keeps its corpus for the next delivery
+            shutil.rmtree(data['dataset_path'], ignore_errors=True)
         # print(documents_prob)
         # print("Topics:")
         
@@ -6,7 +6,7 @@ import asyncio
 import time
 import json
 import utils.log as log
-from utils.handleMessage import sendMessage, convertMessage
+from utils.handleMessage import sendMessage, convertMessage, receiveMessage, completeMessage, advertiseCredit
 from strawberry.flask.views import GraphQLView
 from schemas.schema import schema
 import strawberry
@@ -34,6 +34,8 @@ class CustomGraphQLView(GraphQLView):
         return super().as_view(name, **kwargs)
 class GraphQLWorker:
     requests: dict = {}
+    # replies are handed to the waiting request right away
+    credit: int = 64
     def __init__(self):
         self.app = Flask(__name__)
         self.schema = strawberry.federation.Schema(
@@ -99,15 +101,16 @@ class GraphQLWorker:
         self.app.run(debug=True, port=self._port, use_reloader=False, host="0.0.0.0")
     
     async def listen_task(self):
+        advertiseCredit(GraphQLWorker.conn, self.credit)
         while True:
             try:
-                if GraphQLWorker.conn.poll(1):  # Check for messages with 1 second timeout
+                if GraphQLWorker.conn.poll(None):  # Block until a message arrives
                     print("[GRAPHQLWORKER]Listening for messages...")
                     
-                    raw = GraphQLWorker.conn.recv()
+                    raw = receiveMessage(GraphQLWorker.conn)
                     msg = convertMessage(raw)
                     self.onProcessed(raw)
-                    await asyncio.sleep(0.1)  # Yield control to the event loop
+                    completeMessage(GraphQLWorker.conn, raw)
             except EOFError:
                 break
             except Exception as e:
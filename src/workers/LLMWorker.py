@@ -8,7 +8,7 @@ import time
 
 from openai import AzureOpenAI
 from  utils.log import log 
-from utils.handleMessage import sendMessage, convertMessage
+from utils.handleMessage import sendMessage, convertMessage, receiveMessage, completeMessage, advertiseCredit
 
 from .Worker import Worker
 
@@ -18,6 +18,8 @@ class LLMWorker(Worker):
     ###############
     conn:Connection
     _isBusy: bool = False
+    # messages handled at once, the supervisor queues the rest
+    credit: int = 1
    
     def run(self, conn: Connection, config:dict):
         # assign here
@@ -42,10 +44,11 @@ class LLMWorker(Worker):
 
 
     async def listen_task(self):
+        advertiseCredit(self.conn, self.credit)
         while True:
             try:
-                if LLMWorker.conn.poll(1):  # Check for messages with 1 second timeout
-                    message = self.conn.recv()
+                if LLMWorker.conn.poll(None):  # Block until a message arrives
+                    message = receiveMessage(self.conn)
                     dest = [
                         d
                         for d in message["destination"]
@@ -56,6 +59,7 @@ class LLMWorker(Worker):
                     param= destSplited[2]
                     instance_method = getattr(self,method)
                     instance_method(id=param,data=message['data'],message=message)
+                    completeMessage(self.conn, message)
             except EOFError:
                 break
             except Exception as e:
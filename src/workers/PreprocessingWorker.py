@@ -1,27 +1,50 @@
-import ast
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
+import gc
 import json
 from multiprocessing.connection import Connection
 import traceback
 from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
 from sklearn.feature_extraction.text import TfidfVectorizer
+import hashlib
+import inspect
 import os
 import re
 import threading
 from typing import Counter
 import uuid
 import time
-import nest_asyncio
 
 import numpy
-from openai import AsyncAzureOpenAI, AzureOpenAI
+from openai import AsyncAzureOpenAI
 import pandas
+import psutil
+import redis
 from  utils.log import log 
-from utils.handleMessage import sendMessage, convertMessage
+from utils.handleMessage import sendMessage, convertMessage, receiveMessage, completeMessage, advertiseCredit, useJob, reportProgress
+from utils.augmentationParser import format_items, parse_augmentation
+from utils.augmentationScheduler import AugmentationScheduler, estimate_tokens
+from utils.dedup import TweetDeduplicator
+from utils.formality import FormalityClassifier
+from utils.localCache import LocalCache
+from utils.preload import root_words, stemmer
+from utils.sampling import day_of, stratified_sample
+from utils.stageTimer import StageTimer
+from utils.tokenCorpus import TokenCorpus
 from .Worker import Worker
 
+# PRON (kata ganti)
+PRON = [
+    "aku","saya","gue","gw","kamu","kau","engkau",
+    "dia","ia","kita","kami","mereka","anda","lo","lu", "kalian"
+]
+# bump whenever a prompt changes so cached LLM output is not reused
+AUGMENTATION_PROMPT_VERSION = "2"
+EXPLANATION_PROMPT_VERSION = "1"
+# bump whenever cleaning, normalization, the slang list or stemming changes so cached tokens are recomputed
+PIPELINE_VERSION = "2"
+CURATED_STOPWORDS = ['aduh','sangat','amp', 'the', 'link', 'yang', "iya", "ada", "tin", 'tidak', 'jadi', 'mungkin', 'apa', 'orang', 'wah', 'sih']
+
 class PreprocessingWorker(Worker):
     ###############
     # dont edit this part
@@ -29,27 +52,58 @@ class PreprocessingWorker(Worker):
     route_base = "/"
     conn:Connection
     requests: dict = {}
+    chunk_size: int = 2000
+    memory_limit_mb: int = 0
+    max_concurrent_jobs: int = 2
+    credit: int = 3
+    limits: dict = {"run_preprocessing": 2}
+    max_documents: int = 0
+    max_job_stats: int = 100
+    dataset_root: str = "./src/vocabs/octis_data/"
+    _slang_dict: dict = None
+    augmentation_cache: LocalCache = None
+    explanation_cache: LocalCache = None
+    token_cache: LocalCache = None
+    stats_cache: LocalCache = None
+    formality: FormalityClassifier = None
+    json_mode: bool = True
+    _redis_client = None
     def __init__(self):
         # we'll assign these in run()
         self._port: int = None
 
         self.requests: dict = {}
+        self.scheduler = AugmentationScheduler()
+        self.deduplicator = TweetDeduplicator()
+        self.explanations: dict = {}
+        self.jobs: set = set()
+        self.job_stats: dict = {}
+        self.job_slots = asyncio.Semaphore(self.max_concurrent_jobs)
+        self.receiver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preprocessing-recv")
+        self.cpu_executor = ThreadPoolExecutor(max_workers=self.max_concurrent_jobs, thread_name_prefix="preprocessing-cpu")
         
     def run(self, conn: Connection, config:dict):
         # assign here
         PreprocessingWorker.conn = conn
 
         #### add your worker initialization code here
+        self.setup(config)
+        
+        #### until this part
+        # start background threads *before* blocking server
+
+        asyncio.run(self.listen_task())
+
+    def setup(self, config: dict):
+        """Build the stemmer, LLM client, caches and helpers from the worker config, without a connection."""
         log("Initializing PreprocessingWorker", "info")
-        self.client = AzureOpenAI(
-            api_version=config['azure']['api_version'],
-            azure_endpoint=config['azure']['endpoint'],
-            api_key=config['azure']['api_key'],
-        )
-        print("Azure OpenAI client initialized")
         self.model_name = config['azure']['model']['completion']
-        factory = StemmerFactory()
-        self.stemmer = factory.create_stemmer()
+        # built once per process, or inherited from the forkserver
+        self.stemmer = stemmer()
+        # Sastrawi's default list plus our own words, built once per worker
+        self.stopwords = frozenset(
+            StopWordRemoverFactory().get_stop_words() + PRON + CURATED_STOPWORDS
+        )
         
         
         self.async_client = AsyncAzureOpenAI(
@@ -59,29 +113,63 @@ class PreprocessingWorker(Worker):
                 )
         
         log(f"Initialized OpenAI client with model {self.model_name}", "info")
-        
-        
-        
-        #### until this part
-        # start background threads *before* blocking server
-
-        asyncio.run(self.listen_task())
+        self.chunk_size = config.get('chunk_size', self.chunk_size)
+        self.memory_limit_mb = config.get('memory_limit_mb', self.memory_limit_mb)
+        self.max_concurrent_jobs = max(1, config.get('max_concurrent_jobs', self.max_concurrent_jobs))
+        # one slot over the job limit that only quick requests can take, so they are not stuck behind running jobs
+        self.credit = self.max_concurrent_jobs + 1
+        self.limits = {"run_preprocessing": self.max_concurrent_jobs}
+        self.max_documents = config.get('max_documents', self.max_documents)
+        self.job_slots = asyncio.Semaphore(self.max_concurrent_jobs)
+        self.cpu_executor = ThreadPoolExecutor(max_workers=self.max_concurrent_jobs, thread_name_prefix="preprocessing-cpu")
+        self.augmentation_cache = self.create_cache(config, "augmentation")
+        self.explanation_cache = self.create_cache(
+            config, "explanation", ttl=config.get('augmentation_cache', {}).get('explanation_ttl')
+        )
+        self.token_cache = self.create_cache(config, "tokens")
+        # in the shared cache file, so any instance can answer for a job another one ran
+        self.stats_cache = self.create_cache(config, "job_stats", max_entries=self.max_job_stats)
+        augmentation_config = dict(config.get('augmentation', {}))
+        self.json_mode = augmentation_config.pop('json_mode', self.json_mode)
+        self.scheduler = AugmentationScheduler(**augmentation_config)
+        formality_config = config.get('formality', {})
+        if formality_config.get('enabled', True):
+            self.formality = self.create_formality_classifier(
+                max_slang_ratio=formality_config.get('max_slang_ratio', 0.05),
+                min_indonesian_ratio=formality_config.get('min_indonesian_ratio', 0.8),
+            )
+        dedup_config = config.get('dedup', {})
+        if dedup_config.get('enabled', True):
+            self.deduplicator = TweetDeduplicator(threshold=dedup_config.get('threshold', 0.8))
+        else:
+            self.deduplicator = None
 
-    def listen_task(self):
+    async def listen_task(self):
+        loop = asyncio.get_running_loop()
+        advertiseCredit(PreprocessingWorker.conn, self.credit, self.limits)
         while True:
             try:
-                if PreprocessingWorker.conn.poll(1):  # Check for messages with 1 second timeout
-                    message = self.conn.recv()
-                    dest = [
-                        d
-                        for d in message["destination"]
-                        if d.split("/", 1)[0] == "PreprocessingWorker"
-                    ]
-                    destSplited = dest[0].split('/')
-                    method = destSplited[1]
-                    param= destSplited[2]
-                    instance_method = getattr(self,method)
-                    instance_method(id=param,data=message['data'], message=message)
+                # recv blocks in its own thread so running jobs keep the loop
+                message = await loop.run_in_executor(self.receiver, receiveMessage, PreprocessingWorker.conn)
+                # received on another thread, so the job is set here for the handler and the tasks it starts
+                useJob(message)
+                dest = [
+                    d
+                    for d in message["destination"]
+                    if d.split("/", 1)[0] == "PreprocessingWorker"
+                ]
+                destSplited = dest[0].split('/')
+                method = destSplited[1]
+                param= destSplited[2]
+                instance_method = getattr(self,method)
+                result = instance_method(id=param,data=message['data'], message=message)
+                if inspect.isawaitable(result):
+                    job = asyncio.ensure_future(result)
+                    self.jobs.add(job)
+                    job.add_done_callback(self.jobs.discard)
+                    job.add_done_callback(lambda _, message=message: completeMessage(PreprocessingWorker.conn, message))
+                else:
+                    completeMessage(PreprocessingWorker.conn, message)
             except EOFError:
                 break
             except Exception as e:
@@ -102,18 +190,49 @@ class PreprocessingWorker(Worker):
     # add your worker methods here
     ##########################################
     
+    def create_cache(self, config, namespace, ttl=None, max_entries=None):
+        cache_config = config.get('augmentation_cache')
+        if not cache_config:
+            return None
+        if cache_config.get('use_redis') and self._redis_client is None:
+            redis_config = config.get('redis', {})
+            self._redis_client = redis.Redis(
+                host=redis_config.get('host', 'localhost'),
+                port=redis_config.get('port', 6379),
+                db=redis_config.get('db', 0),
+                username=redis_config.get('username') or None,
+                password=redis_config.get('password') or None,
+                decode_responses=True,
+            )
+        log(f"Using {namespace} cache at {cache_config['path']}{' with Redis tier' if self._redis_client else ''}", "info")
+        return LocalCache(
+            cache_config['path'],
+            namespace,
+            ttl=cache_config.get('ttl', 0) if ttl is None else ttl,
+            max_entries=cache_config.get('max_entries', 0) if max_entries is None else max_entries,
+            redis_client=self._redis_client,
+        )
+
+    def create_formality_classifier(self, **thresholds):
+        slang = self.load_slang_dictionary()
+        # Sastrawi's root words, the stopwords and the formal side of kbba.txt
+        lexicon = set(root_words()) | self.stopwords
+        lexicon.update(word for expansion in slang.values() for word in expansion.split())
+        return FormalityClassifier(lexicon, slang.keys(), **thresholds)
+
     def create_dataframe(self,tweets):
+        # token lists are joined once here, the corpus file and ETM only need the text
         df = pandas.DataFrame({
-            'tweets': tweets
+            'tweets': [' '.join(tokens) for tokens in tweets]
         })
         return df
     
-    def create_explanation(self, keyword):
+    async def create_explanation_async(self, keyword):
         # print("Initialized OpenAI")
        
         # print("Initialized Response")
         # print(self.model_name)
-        response = self.client.chat.completions.create(
+        response = await self.async_client.chat.completions.create(
             messages=[{"role": "system",
                         "content": f"""You are a diligent assistant. The fate of
                                     the world depends on your answer being
@@ -133,6 +252,26 @@ class PreprocessingWorker(Worker):
         # print("Konten:", content)
     
         return content
+
+    async def get_explanation(self, keyword):
+        """
+        Return the explanation for a keyword, asking the LLM only when it is not cached.
+
+        Explanations live in the explanation cache (with its own TTL) and fall
+        back to an in-process dict when no cache is configured.
+        """
+        raw_key = "\x1f".join([keyword.lower().strip(), self.model_name, EXPLANATION_PROMPT_VERSION])
+        key = hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+        cached = await self.run_cpu(self.explanation_cache.get, key) if self.explanation_cache else self.explanations.get(key)
+        if cached:
+            return cached
+        log(f"Creating explanation for keyword '{keyword}'", "info")
+        explanation = await self.create_explanation_async(keyword)
+        if self.explanation_cache:
+            await self.run_cpu(self.explanation_cache.set, key, explanation)
+        else:
+            self.explanations[key] = explanation
+        return explanation
             
     
 
@@ -148,97 +287,201 @@ class PreprocessingWorker(Worker):
     ) -> list:
         """
         Create augmentation for a single batch of tweets, with retry and fallback.
+
+        Every post is sent with its position as id and the reply is parsed
+        item by item, so a retry only asks again for the posts that are still
+        missing. The returned list has the rewrite of each post in input
+        order, or None where every attempt failed.
         """
         attempt = 0
-        success_count = 0
-        error_count = 0
-        result =[]
+        remaining = dict(enumerate(tweets))
+        rewritten = {}
+        if inspect.isawaitable(explanation):
+            # shared explanation task started by augment_all_batches, the batch goes on without it if it failed
+            try:
+                explanation = await explanation
+            except Exception as e:
+                log(f"[Batch] Augmenting without an explanation of '{keyword}': {e}", "warn")
+                explanation = ""
         log(f"[Batch] Processing {len(tweets)} tweets with batch size {batch_size}...", "info")
-        # print(f"[Batch] Processing {len(tweets)} tweets with batch size {batch_size}...")
-        while attempt < max_retries:
+        while remaining and attempt < max_retries:
+            request = {}
             try:
-                
-
                 prompt = f"""
-    You are given a list of {batch_size} posts from an {keyword} community on a social network.
+    You are given a JSON list of {len(remaining)} posts from an {keyword} community on a social network.
+    Each post has an "id" and a "text".
     For each post in the list:
     - If the post is already in Indonesian, rephrase it into formal Bahasa Indonesia.
     - If the post is in a foreign language, translate and rephrase it into formal Bahasa Indonesia.
 
-    Return your answer as a Python list of strings, containing only the final formal Indonesian version of each post.
-    Return your answer as a Python list of {batch_size} strings, in the same order as the input.
+    Return a JSON object with a single key "items" holding one object per post,
+    with the same "id" as the input and the final formal Indonesian version as "text".
     Do NOT include the original text or any translation notes—only the final formal Indonesian versions.
 
     Topic: {keyword}
     Explanation: {explanation}
-    Posts: {tweets}
+    Posts: {format_items(remaining)}
 
     Example input:
-    ["This is a test.", "Kita harus bekerja sama.", "¡Vamos a ganar!"]
+    [{{"id": 0, "text": "This is a test."}}, {{"id": 1, "text": "Kita harus bekerja sama."}}, {{"id": 2, "text": "¡Vamos a ganar!"}}]
 
     Example output:
-    [
-        "Ini adalah sebuah uji coba.",
-        "Kita harus bekerja sama.",
-        "Kita akan menang!"
-    ]
+    {{"items": [
+        {{"id": 0, "text": "Ini adalah sebuah uji coba."}},
+        {{"id": 1, "text": "Kita harus bekerja sama."}},
+        {{"id": 2, "text": "Kita akan menang!"}}
+    ]}}
 
-    Answer ONLY with the Python list of strings, nothing else.
+    Answer ONLY with the JSON object, nothing else.
     """
-                # print(self.model_name)
-                # print(f"[Batch] Attempt {attempt + 1}")
-                
-                response = await self.async_client.chat.completions.create(
-                    messages=[{"role": "user", "content": prompt}],
-                    max_completion_tokens=4096,
-                    model=self.model_name,
-                )
+                request = {
+                    "messages": [{"role": "user", "content": prompt}],
+                    "max_completion_tokens": 4096,
+                    "model": self.model_name,
+                }
+                if self.json_mode:
+                    request["response_format"] = {"type": "json_object"}
+                # the rewrite is about as long as the input, so budget the prompt twice
+                request_tokens = 2 * estimate_tokens(prompt)
+                async with self.scheduler.slot(request_tokens):
+                    response = await self.async_client.chat.completions.create(**request)
                 output = response.choices[0].message.content or ""
-                
-                # print(output)
-                # print(type(output))
-                # print('==============================')
-                # Parse output safely
-                output.strip()
-                augmented = ast.literal_eval(output.strip()) 
 
+                parsed = parse_augmentation(output, list(remaining))
+                for item_id, text in parsed.items():
+                    rewritten[item_id] = text
+                    del remaining[item_id]
+                if remaining:
+                    raise ValueError(f"{len(remaining)} of {len(parsed) + len(remaining)} posts missing from the reply")
                 log(f"[Batch] Attempt {attempt + 1} succeeded with {len(tweets)} tweets", "info")
-                success_count += 1
-                return augmented
 
             except Exception as e:
+                if request.get("response_format") and getattr(e, "status_code", None) == 400 and "response_format" in str(e):
+                    # older api versions reject JSON mode, the parser copes with plain replies
+                    log("JSON mode is not supported by this deployment, retrying without response_format", "warn")
+                    self.json_mode = False
+                    continue
                 attempt += 1
-                error_count += 1
                 log(f"[Batch] Error on attempt {attempt}: {e}", "error")
-                # print(f"[Batch] Error on attempt {attempt}: {e}")
-                await asyncio.sleep(1)
+                if attempt < max_retries:
+                    await self.scheduler.backoff(e, attempt)
 
-        # If all retries fail, fallback
-        # print("[Batch] All retries failed—returning original batch.")
-        # print(f"[Batch] Success count: {success_count}/{attempt}, Error count: {error_count}/{attempt}")
-        return tweets
+        if remaining:
+            log(f"[Batch] Keeping the original text of {len(remaining)} of {len(tweets)} tweets after {attempt} attempts", "warn")
+        reportProgress()
+        return [rewritten.get(i) for i in range(len(tweets))]
             
         
+    def augmentation_cache_key(self, tweet: str, keyword: str) -> str:
+        normalized = " ".join(tweet.lower().split())
+        raw_key = "\x1f".join([normalized, keyword.lower(), self.model_name, AUGMENTATION_PROMPT_VERSION])
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def token_cache_key(self, tweet: dict, keyword: str, augmented: bool = True) -> str:
+        """Key of a tweet's final token list: its URL (or text hash), the keyword and every version it depends on."""
+        identity = tweet.get('tweet_url') or hashlib.sha256(" ".join(tweet['full_text'].split()).encode("utf-8")).hexdigest()
+        if augmented:
+            raw_key = "\x1f".join([
+                identity, keyword.lower(), self.model_name, AUGMENTATION_PROMPT_VERSION, PIPELINE_VERSION
+            ])
+        else:
+            raw_key = "\x1f".join([identity, "raw", PIPELINE_VERSION])
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    async def tokenize_chunk(self, chunk: list, keyword: str, timer: StageTimer, stats: dict, augment: bool = True) -> list:
+        """
+        Return the stemmed token list of every tweet in `chunk`.
+
+        Tweets already processed for the same keyword by an earlier project
+        come from the token cache. Only the rest is augmented (unless
+        `augment` is False) and run through the cleaning stages, and their
+        results are cached for the next one.
+        """
+        keys = [self.token_cache_key(tweet, keyword, augment) for tweet in chunk]
+        with timer.stage("token_cache_lookup", len(keys)):
+            cached = await self.run_cpu(self.token_cache.get_many, keys) if self.token_cache else {}
+        missing = {key: tweet for key, tweet in zip(keys, chunk) if key not in cached}
+        stats['token_hits'] = stats.get('token_hits', 0) + len(chunk) - len(missing)
+        fresh = {}
+        if missing:
+            if augment:
+                with timer.stage("augmentation", len(missing)):
+                    augmented = await self.augment_all_batches(
+                        all_tweets=[tweet['full_text'] for tweet in missing.values()],
+                        keyword=keyword,
+                        stats=stats,
+                    )
+            else:
+                augmented = [tweet['full_text'] for tweet in missing.values()]
+            tokens = await self.run_cpu(self.preprocess_chunk, augmented, timer)
+            fresh = dict(zip(missing, tokens))
+            if self.token_cache:
+                await self.run_cpu(self.token_cache.set_many, fresh)
+        return [cached[key] if key in cached else fresh[key] for key in keys]
+
     async def augment_all_batches(
         self,
         all_tweets: list,
         keyword: str,
+        explanation: str = None,
+        stats: dict = None,
     ):
-        batch_size=10
+        """
+        Rephrase tweets into formal Indonesian, sending only cache misses to the LLM.
+
+        Tweets the formality classifier considers already formal Indonesian
+        are kept as they are. Tweets whose normalized text was already
+        augmented for the same keyword, model and prompt version are served
+        from the augmentation cache, and identical tweets in the same call are
+        sent once. When `stats` is given, skipped tweets, cache hits, misses
+        and saved LLM calls are added to it.
+        """
         temperature=0.5
         tokens=4000
         top_p=1
+        if explanation is None:
+            # resolved while the cache lookup and batch planning run, awaited by every batch
+            explanation = asyncio.ensure_future(self.get_explanation(keyword))
+        if self.formality:
+            # a pass over the whole chunk, kept off the event loop like the other CPU-bound stages
+            needs_rewrite = await self.run_cpu(lambda: [self.formality.needs_rewrite(tweet) for tweet in all_tweets])
+        else:
+            needs_rewrite = [True] * len(all_tweets)
+        candidates = [tweet for tweet, needed in zip(all_tweets, needs_rewrite) if needed]
+        keys = [self.augmentation_cache_key(tweet, keyword) for tweet in candidates]
+        cached = await self.run_cpu(self.augmentation_cache.get_many, keys) if self.augmentation_cache else {}
+        pending = {}
+        for key, tweet in zip(keys, candidates):
+            if key not in cached:
+                pending.setdefault(key, tweet)
+        pending_keys = list(pending)
+        pending_tweets = list(pending.values())
+        if stats is not None:
+            stats['skipped'] = stats.get('skipped', 0) + len(all_tweets) - len(candidates)
+            stats['hits'] = stats.get('hits', 0) + len(candidates) - len(pending_tweets)
+            stats['misses'] = stats.get('misses', 0) + len(pending_tweets)
+            stats['saved_calls'] = stats.get('saved_calls', 0) + (
+                len(self.scheduler.plan_batches(all_tweets)) - len(self.scheduler.plan_batches(pending_tweets))
+            )
+
+        def merge(augmented):
+            rewritten = iter([cached[key] if key in cached else augmented[key] for key in keys])
+            return [next(rewritten) if needed else tweet for tweet, needed in zip(all_tweets, needs_rewrite)]
+
+        if not pending_tweets:
+            log(f"No tweets to send to the LLM out of {len(all_tweets)} ({len(all_tweets) - len(candidates)} already formal) with keyword '{keyword}'", "info")
+            if isinstance(explanation, asyncio.Future):
+                explanation.cancel()
+            return merge({})
+
         # Divide tweets into batches
-        # print("Membuat eksplanasi")
-        explanation = self.create_explanation(keyword)
         # print("Membuat batches")
-        batches = [all_tweets[i:i+batch_size] for i in range(0, len(all_tweets), batch_size)]
-        # print(f"Processing {len(batches)} batches of {batch_size}...")
-        log(f"Processing {len(batches)} batches of {batch_size}/{len(all_tweets)} tweets with keyword '{keyword}'", "info")
+        batches = self.scheduler.plan_batches(pending_tweets)
+        log(f"Processing {len(batches)} batches for {len(pending_tweets)} tweets with keyword '{keyword}' ({len(all_tweets) - len(candidates)} already formal, {len(candidates) - len(pending_tweets)} from cache)", "info")
         tasks = [
             self.create_augmentation_async(
                 tweets=batch,
-                batch_size=batch_size,
+                batch_size=len(batch),
                 temperature=temperature,
                 tokens=tokens,
                 top_p=top_p,
@@ -247,11 +490,25 @@ class PreprocessingWorker(Worker):
             )
             for batch in batches
         ]
-        log(f"Starting augmentation for {len(batches)} batches of size {batch_size} with keyword '{keyword}'", "info")
-        # Run all batches concurrently
+        log(f"Starting augmentation for {len(batches)} batches with keyword '{keyword}', scheduler {self.scheduler.stats()}", "info")
+        # Batches run concurrently, the scheduler bounds how many are in flight
         augmented_results = await asyncio.gather(*tasks)
-        # Flatten results (list of lists → single list)
-        all_augmented = [aug for batch in augmented_results for aug in batch]
+        augmented = {}
+        fresh = {}
+        offset = 0
+        for batch, result in zip(batches, augmented_results):
+            batch_keys = pending_keys[offset:offset + len(batch)]
+            offset += len(batch)
+            for key, tweet, text in zip(batch_keys, batch, result):
+                if text is None:
+                    # never cache the fallback, the next run asks again
+                    augmented[key] = tweet
+                else:
+                    augmented[key] = text
+                    fresh[key] = text
+        if self.augmentation_cache and fresh:
+            await self.run_cpu(self.augmentation_cache.set_many, fresh)
+        all_augmented = merge(augmented)
         log(f"Augmentation completed for {len(all_augmented)} tweets with keyword '{keyword}'", "info")
         return all_augmented
         
@@ -361,23 +618,22 @@ class PreprocessingWorker(Worker):
             for sentence in tweets
         ]
     
-    def normalization(self, tweets):
-        res = []
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        with open(os.path.abspath(base_path+'/../utils/kbba.txt'), 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-
-            data = [line.strip().split('\t') for line in lines]
-            data_singkatan = pandas.DataFrame(data, columns=['Kata', 'Asli'])
-
-            kontraksi_dict = dict(zip(data_singkatan['Kata'], data_singkatan['Asli']))
+    def load_slang_dictionary(self):
+        # kbba.txt is read once per worker, normalization runs once per chunk
+        if PreprocessingWorker._slang_dict is None:
+            base_path = os.path.dirname(os.path.abspath(__file__))
+            with open(os.path.abspath(base_path+'/../utils/kbba.txt'), 'r', encoding='utf-8') as file:
+                data = [line.strip().split('\t') for line in file]
+            PreprocessingWorker._slang_dict = dict(row for row in data if len(row) == 2)
+        return PreprocessingWorker._slang_dict
 
-            for tweet in tweets:
-                expanded_text = [kontraksi_dict[word] if word in kontraksi_dict else word for word in tweet]
-
-                res.append(expanded_text)
-
-            return res
+    def normalization(self, tweets):
+        kontraksi_dict = self.load_slang_dictionary()
+        # some slang expands to several words ("yadah" -> "iya deh"), split them so later stages see single words
+        return [
+            [part for word in tweet for part in kontraksi_dict.get(word, word).split()]
+            for tweet in tweets
+        ]
 
     def stem_tokens(self, tokens):
         return [self.stemmer.stem(token) for token in tokens]
@@ -389,14 +645,17 @@ class PreprocessingWorker(Worker):
         return results
 
     def curating_stopword(self, tweets):
-        result = [" ".join(sublist) for sublist in tweets]
+        result = (" ".join(sublist) for sublist in tweets)
         tr_idf_model  = TfidfVectorizer()
         tf_idf_vector = tr_idf_model.fit_transform(result)
-        tf_idf_array = tf_idf_vector.toarray()
         words_set = tr_idf_model.get_feature_names_out()
-        df_tf_idf = pandas.DataFrame(tf_idf_array, columns = words_set)
-        columns_with_one = df_tf_idf.columns[(df_tf_idf > 0.7).any()].tolist()
-        word_freq = Counter(word for doc in tweets for word in doc)
+        # column-wise max on the sparse matrix instead of densifying docs x vocab
+        max_tf_idf = tf_idf_vector.max(axis=0).toarray().ravel()
+        columns_with_one = words_set[max_tf_idf > 0.7].tolist()
+        if isinstance(tweets, TokenCorpus):
+            word_freq = tweets.word_freq
+        else:
+            word_freq = Counter(word for doc in tweets for token in doc for word in token.split())
         if (len(tweets))>=10000:
             rare_words = [word for word, freq in word_freq.items() if freq <= 10]
         elif (len(tweets))<10000 and (len(tweets))>=100:
@@ -418,33 +677,16 @@ class PreprocessingWorker(Worker):
         """
         # print("Removing stopwords, short tokens, and custom words...")
         log("Removing stopwords, short tokens, and custom words...", "info")
-        factory = StopWordRemoverFactory()
-        stopword_remover = factory.create_stop_word_remover()
-
-        # PRON (kata ganti)
-        PRON = [
-            "aku","saya","gue","gw","kamu","kau","engkau",
-            "dia","ia","kita","kami","mereka","anda","lo","lu", "kalian"
-        ]
         log("Curating stopwords...", "info")
         
         log("before curating stopwords len tweets: " + str(len(tweets)), "info")
         columns_with_one, rare_words = self.curating_stopword(tweets)
-        custom_stopwords = set(columns_with_one + rare_words + ['aduh','sangat','amp', 'the', 'link', 'yang', "iya", "ada", "tin", 'sangat', 'tidak', 'jadi', 'mungkin', 'apa', 'orang', 'wah'] + PRON)
+        stopwords = self.stopwords.union(columns_with_one, rare_words)
         
-        cleaned_texts = []
-        for tokens in tweets:
-            sentence = ' '.join(tokens)
-            # Step 1: Remove default Indonesian stopwords using Sastrawi
-            cleaned_sentence = stopword_remover.remove(sentence)
-            # Step 2: Tokenize and filter short/custom tokens
-            cleaned_tokens = [
-                token for token in cleaned_sentence.split()
-                if len(token) > 2 and token.lower() not in custom_stopwords
-            ]
-            cleaned_texts.append(cleaned_tokens)
-        cleaned_texts =[tweet for tweet in cleaned_texts ]
-        return cleaned_texts
+        return [
+            [word for token in tokens for word in token.split() if len(word) > 2 and word.lower() not in stopwords]
+            for tokens in tweets
+        ]
     
     def split_dataset(self, tweets):
 
@@ -452,50 +694,28 @@ class PreprocessingWorker(Worker):
         train_size = int(0.85 * len(tweets))
         val_size = int(0.05 * len(tweets))
 
-        # Label rows
-        tweets['label'] = numpy.where(
-            tweets.index < train_size,
-            'train',
-            numpy.where(
-                tweets.index < train_size + val_size,
-                'val',
-                'test'
-            )
+        # Label rows: the first 85% train, the next 5% val, the rest test
+        tweets['label'] = numpy.repeat(
+            ['train', 'val', 'test'],
+            [train_size, val_size, len(tweets) - train_size - val_size],
         )
-
-        # Ensure tweets are string and clean
-        tweets['tweets'] = tweets['tweets'].astype(str)
-        tweets['tweets'] = tweets['tweets'].apply(self.clean_tweet_string)
-        
         return tweets
 
-
-    def clean_tweet_string(self, tweet_str):
-        try:
-            # Convert string representation of list to actual list
-            tweet_list = ast.literal_eval(tweet_str)
-            # Join list elements with spaces
-            return ' '.join(tweet_list)
-        except (ValueError, SyntaxError):
-            # Fallback if the string isn't a valid list representation
-            return tweet_str.replace('[', '').replace(']', '').replace('\'', '')
-
     
-    def saving_vocab_corpus(self, vocabulary, tweet):
-        path = "./src/vocabs/octis_data/"
-        with open(path + 'vocabulary.txt', 'w') as file:
-            for word in sorted(vocabulary):
-                file.write(word + '\n')
-        # print("Vocabulary file created successfully!")
-        tweet.to_csv(path +"corpus.tsv", index=False, sep="\t", header=False) 
-        # print("Corpus file created successfully!") 
+    def saving_vocab_corpus(self, vocabulary, tweet, path):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'vocabulary.txt'), 'w') as file:
+            file.writelines(word + '\n' for word in sorted(vocabulary))
+        # tokens hold no tabs, quotes or newlines, so rows are written as-is
+        with open(os.path.join(path, "corpus.tsv"), 'w') as file:
+            file.writelines(f"{text}\t{label}\n" for text, label in zip(tweet['tweets'], tweet['label']))
     
             
-    def create_vocabulary(self, tweets):
+    def create_vocabulary(self, tweets, path):
 
         vocabulary = set(word.lower() for text in tweets['tweets'] for word in text.split())
         # Save vocabulary to .txt file
-        self.saving_vocab_corpus(vocabulary, tweets[['tweets','label']])
+        self.saving_vocab_corpus(vocabulary, tweets[['tweets','label']], path)
         
         # print("Done!")
         
@@ -514,97 +734,256 @@ class PreprocessingWorker(Worker):
           data={
               'keyword': keyword,
               'start_date': start_date,
-              'end_date': end_date
+              'end_date': end_date,
+              'max_documents': data.get('max_documents'),
           }
       )
       log(f"Sent request to DatabaseInteractionWorker for keyword: {keyword}, project_id: {project_id}, messageId: {m_id}", "info")
-    def run_preprocessing(self, id,data,message):
+    async def run_cpu(self, func, *args):
+        """Run a CPU-bound stage on the worker's executor so other jobs keep the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self.cpu_executor, func, *args)
+
+    def dataset_path(self, project_id):
+        """
+        Corpus directory of one project, so concurrent jobs never overwrite each other's files.
+
+        The ETMWorker deletes it once the project's run_etm has finished.
+        """
+        return os.path.join(self.dataset_root, str(project_id))
+
+    def build_dataset(self, documents, path):
+        data = self.create_dataframe(documents)
+        data = self.split_dataset(data)
+        return self.create_vocabulary(data, path)
+
+    def current_memory_mb(self):
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+
+    def iter_chunks(self, items):
+        """
+        Yield consecutive slices of `items`.
+
+        When `memory_limit_mb` is set and the process RSS is above it after a
+        chunk, garbage is collected and, if that is not enough, the chunk size
+        is halved (down to 100 items) for the remaining chunks.
+        """
+        chunk_size = self.chunk_size
+        start = 0
+        while start < len(items):
+            yield items[start:start + chunk_size]
+            start += chunk_size
+            if self.memory_limit_mb and self.current_memory_mb() > self.memory_limit_mb:
+                gc.collect()
+                if self.current_memory_mb() > self.memory_limit_mb and chunk_size > 100:
+                    chunk_size = max(100, chunk_size // 2)
+                    log(f"RSS above {self.memory_limit_mb} MB, reducing preprocessing chunk size to {chunk_size}", "warn")
+
+    def pipeline_stages(self):
+        return [
+            ("remove_url", self.remove_url),
+            ("replace_emoticons", self.replace_emoticons),
+            ("remove_twitter_symbols", self.remove_twitter_symbols),
+            ("remove_symbols_and_punctuation", self.remove_symbols_and_punctuation),
+            ("tokenizing", self.tokenizing),
+            ("case_folding", self.case_folding),
+            ("delete_extra_letters", self.delete_extra_letters),
+            ("normalization", self.normalization),
+            ("stemming", self.stem_tokenized_list_parallel),
+        ]
+
+    def preprocess_chunk(self, texts, timer):
+        """Run one chunk of (augmented) tweet strings through cleaning, tokenization, normalization and stemming."""
+        data = texts
+        for stage, step in self.pipeline_stages():
+            with timer.stage(stage, len(data)):
+                data = step(data)
+        return data
+
+    def record_job_stats(self, id, keyword, timer, augmentation_stats, tweet_count, document_count, unsampled_count=0):
+        """
+        Keep the summary of a finished job so getPreprocessingStats can answer for it later.
+
+        Summaries go to the stats cache shared by every instance, or stay in
+        this instance when no cache is configured.
+        """
+        summary = {
+            "project_id": id,
+            "keyword": keyword,
+            "tweets": tweet_count,
+            "documents": document_count,
+            "unsampled": unsampled_count,
+            "augmentation": {**augmentation_stats, **self.scheduler.stats()},
+            **timer.summary(),
+        }
+        if self.stats_cache:
+            self.stats_cache.set(str(id), summary)
+            return summary
+        self.job_stats[id] = summary
+        while len(self.job_stats) > self.max_job_stats:
+            self.job_stats.pop(next(iter(self.job_stats)))
+        return summary
+
+    def getPreprocessingStats(self, id, data, message):
+        self.sendToOtherWorker(
+            destination=["RestApiWorker/onProcessed"],
+            messageId=message['messageId'],
+            data=self.stats_cache.get(str(id), {}) if self.stats_cache else self.job_stats.get(id, {}),
+        )
+
+    def tokenize_unsampled(self, texts, vocabulary, stems, timer):
+        """
+        Return the words of `vocabulary` in each text, for topic inference only.
+
+        The cleaning stages run as for the corpus, but stemming looks every
+        distinct word up in `stems` first, so only words not seen before are
+        stemmed.
+        """
+        data = texts
+        for stage, step in self.pipeline_stages():
+            if stage == "stemming":
+                break
+            with timer.stage(stage, len(data)):
+                data = step(data)
+        with timer.stage("stemming", len(data)):
+            documents = []
+            for tokens in data:
+                words = []
+                for token in tokens:
+                    stem = stems.get(token)
+                    if stem is None:
+                        stem = stems[token] = self.stemmer.stem(token)
+                    words.extend(word for word in stem.split() if word in vocabulary)
+                documents.append(words)
+        return documents
+
+    async def prepare_unsampled(self, tweets, unsampled_index, representative, weights, corpus_texts, timer):
+        """
+        Clean the tweets left out by sampling so the ETMWorker can infer their topics.
+
+        They skip LLM augmentation and the token cache, each distinct word is
+        stemmed once, and only words of the training vocabulary are kept.
+        Duplicates follow their representative, and tweets with no known word
+        are dropped like empty documents in the corpus.
+        """
+        if not unsampled_index:
+            return []
+        vocabulary = {word for text in corpus_texts for word in text.split()}
+        # stem of every distinct word seen so far, shared by all chunks of the job
+        stems = {}
+        documents = {}
+        for chunk_index in self.iter_chunks(unsampled_index):
+            texts = [tweets[index]['full_text'] for index in chunk_index]
+            words = await self.run_cpu(self.tokenize_unsampled, texts, vocabulary, stems, timer)
+            reportProgress()
+            for index, document in zip(chunk_index, words):
+                if document:
+                    documents[index] = ' '.join(document)
+        return [
+            {
+                **tweet,
+                'full_text': documents[representative[index]],
+                "raw_text": tweet['full_text'],
+                'duplicate_count': weights[representative[index]],
+            }
+            for index, tweet in enumerate(tweets) if representative[index] in documents
+        ]
+
+    async def run_preprocessing(self, id,data,message):
+        """
+        Preprocess one project's tweets and hand the corpus to the ETMWorker.
+
+        Runs as a task on the worker's event loop. At most
+        `max_concurrent_jobs` projects are processed at a time, LLM calls are
+        awaited and CPU-bound stages run on the worker's executor, so a large
+        project does not hold up the others.
+        """
+        async with self.job_slots:
+            await self.preprocess_project(id, data, message)
+
+    async def preprocess_project(self, id, data, message):
+        keyword = data.get('keyword')
         try:
             # log(f"Running preprocessing for keyword: {data['keyword']}, project_id: {id}, messageId: {message['messageId']}", "info")
-            tweets=data['tweets']
+            tweets = [tweet for tweet in data['tweets'] if 'full_text' in tweet]
             print(f"Received {len(tweets)} tweets for keyword: {data['keyword']}, project_id: {id}, messageId: {message['messageId']}", "info")
             keyword=data['keyword']
             start_date=data['start_date']
             end_date=data['end_date']
             
-            
-            text_tweet = [tweet['full_text'] for tweet in tweets if 'full_text' in tweet]
-            try:
-                log(f"Starting augmentation for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-                
-                evt_loop = asyncio.get_event_loop() 
-
-                # Run async augmentation synchronously
-                if evt_loop.is_running():
-                    log(f"Event loop is already running for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-                    nest_asyncio.apply()
-                    
-                    data = evt_loop.run_until_complete(
-                        self.augment_all_batches(
-                        all_tweets=text_tweet,
-                        keyword=keyword,
-                    ))
-                    # data = text_tweet
-                else:
-                    log(f"Creating new event loop for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-                    data = asyncio.run(
-                        self.augment_all_batches(
-                        all_tweets=text_tweet,
-                        keyword=keyword,
-                    ))
-                    # data = text_tweet
-                    
-                    # print(data)
-            except Exception as e:
-                data = asyncio.run(
-                        self.augment_all_batches(
-                        all_tweets=text_tweet,
-                        keyword=keyword,
-                    ))
-            log(f"Augmentation returned {len(data)}/{len(tweets)} tweets for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            # log(f"Augmentation completed for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            log(f"Starting preprocessing steps for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            log(f"Removing URLs for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            data = self.remove_url(data)
-            log(f"success removing url {len(data)}/{len(tweets)}, Removing Emoticons for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            data = self.replace_emoticons(data)
-            log(f"success removing emoticon {len(data)}/{len(tweets)} ,Removing Twitter symbols for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            data = self.remove_twitter_symbols(data)
-            log(f"success remove tweet symbol {len(data)}/{len(tweets)}, Removing symbols and punctuation for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            data = self.remove_symbols_and_punctuation(data)
-            log(f"success remove symbol {len(data)}/{len(tweets)}, Tokenizing for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            data = self.tokenizing(data)
-            log(f"success tokenize {len(data)}/{len(tweets)}, Case folding for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            data = self.case_folding(data)
-            log(f"successs casefolding {len(data)}/{len(tweets)}, Deleting extra letters for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            data = self.delete_extra_letters(data)
-            log(f"success delete extra later {len(data)}/{len(tweets)}.Normalization for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            data = self.normalization(data)
-            log(f"success normalization {len(data)}/{len(tweets)}, Stemming for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            data = self.stem_tokenized_list_parallel(data)
-            log(f"success steaming {len(data)}/{len(tweets)},Curating stopwords for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
-            data = self.stopword_removal(data)
+            timer = StageTimer()
+            if self.deduplicator:
+                with timer.stage("dedup", len(tweets)):
+                    representative = await self.run_cpu(self.deduplicator.cluster, [tweet['full_text'] for tweet in tweets])
+            else:
+                representative = list(range(len(tweets)))
+            unique_index = [index for index, rep in enumerate(representative) if rep == index]
+            weights = Counter(representative)
+            unique_tweets = [tweets[index] for index in unique_index]
+            log(f"Collapsed {len(tweets)} tweets into {len(unique_tweets)} unique tweets for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
+
+            max_documents = data.get('max_documents') or self.max_documents
+            unsampled_index = []
+            if max_documents and len(unique_tweets) > max_documents:
+                with timer.stage("sampling", len(unique_tweets)):
+                    chosen = stratified_sample(
+                        [day_of(tweet.get('created_at')) for tweet in unique_tweets],
+                        max_documents,
+                        seed=int(hashlib.sha1(str(id).encode("utf-8")).hexdigest()[:8], 16),
+                    )
+                chosen_positions = set(chosen)
+                unsampled_index = [index for position, index in enumerate(unique_index) if position not in chosen_positions]
+                unique_index = [unique_index[position] for position in chosen]
+                unique_tweets = [tweets[index] for index in unique_index]
+                log(f"Sampled {len(unique_tweets)} of {len(unique_tweets) + len(unsampled_index)} unique tweets by day for keyword: {keyword}, project_id: {id}, the rest gets topics by inference", "info")
+
+            log(f"Starting augmentation and preprocessing in chunks of {self.chunk_size} for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
+            corpus = TokenCorpus()
+            augmentation_stats = {}
+            for chunk in self.iter_chunks(unique_tweets):
+                corpus.extend(await self.tokenize_chunk(chunk, keyword, timer, augmentation_stats))
+                reportProgress()
+                log(f"Preprocessed {len(corpus)}/{len(unique_tweets)} unique tweets for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
+
+            log(f"Curating stopwords for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
+            with timer.stage("stopword_removal", len(corpus)):
+                data = await self.run_cpu(self.stopword_removal, corpus)
+            del corpus
             removed_index = [index for index, tweet in enumerate(data) if len(tweet) == 0]
             cleaned_data = [tweet for index, tweet in enumerate(data) if len(tweet) > 0]
             print(f"Removed {len(removed_index)} empty tweets from {len(data)} = {len(cleaned_data)} total tweets for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']}", "info")
             
-            data = cleaned_data
-            data = self.create_dataframe(data)
-            print(len(data))
-            
-            data = self.split_dataset(data)
-            print(len(data))
-            
-            data = self.create_vocabulary(data)
+            dataset_path = self.dataset_path(id)
+            with timer.stage("build_dataset", len(cleaned_data)):
+                data = await self.run_cpu(self.build_dataset, cleaned_data, dataset_path)
             
             log(f"Preprocessing completed for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']} len {len(data)}/{len(tweets)}", "info")
+            hits = augmentation_stats.get('hits', 0)
+            lookups = hits + augmentation_stats.get('misses', 0)
+            log(f"Token cache: {augmentation_stats.get('token_hits', 0)}/{len(unique_tweets)} unique tweets reused from earlier projects for project_id: {id}", "info")
+            log(f"Augmentation: {augmentation_stats.get('skipped', 0)}/{len(unique_tweets)} tweets skipped as already formal, cache {hits}/{lookups} hits ({hits / max(lookups, 1):.1%}), {augmentation_stats.get('saved_calls', 0)} LLM calls saved for project_id: {id}", "info")
+            log(f"Stage timings for project_id: {id}: {timer.format()}", "info")
             # remove tweets on index same at # removed_index
-            removedUncleanTweet = [tweet for i, tweet in enumerate(tweets) if i not in removed_index]
-            print(f"Removed {len(removedUncleanTweet)} unclean tweets from original data", "info")
+            removed_index = set(removed_index)
+            kept_index = [index for position, index in enumerate(unique_index) if position not in removed_index]
+            # position of every kept representative in the corpus handed to ETM
+            doc_index = {index: position for position, index in enumerate(kept_index)}
             full_text = data['tweets'].tolist()
             
-            combined_data = [{**tweet, 'full_text': full_text[index],"raw_text":tweet['full_text']} for index, tweet in enumerate(removedUncleanTweet)]
+            # every original tweet, duplicates included, points at its representative's document
+            combined_data = [
+                {
+                    **tweet,
+                    'full_text': full_text[doc_index[representative[index]]],
+                    "raw_text": tweet['full_text'],
+                    'doc_index': doc_index[representative[index]],
+                    'duplicate_count': weights[representative[index]],
+                }
+                for index, tweet in enumerate(tweets) if representative[index] in doc_index
+            ]
             print(f"Combined data length: {len(combined_data)}", "info")
+            unsampled_tweets = await self.prepare_unsampled(
+                tweets, unsampled_index, representative, weights, full_text, timer
+            )
             log(f"Sending preprocessed data for keyword: {keyword}, project_id: {id}, messageId: {message['messageId']} with length of tweets {len(full_text)} and raw data {len(combined_data)}", "info")
             self.sendToOtherWorker(
                 destination=[f'ETMWorker/run_etm/{id}'],
@@ -614,8 +993,14 @@ class PreprocessingWorker(Worker):
                     'tweets': full_text,
                     "raw_tweets": combined_data,
                     'label': data['label'].tolist(),
+                    'weights': [weights[index] for index in kept_index],
                     "start_date": start_date,
                     "end_date": end_date,
+                    "dataset_path": dataset_path,
+                    "unsampled_tweets": unsampled_tweets,
+                    "preprocessing_stats": self.record_job_stats(
+                        id, keyword, timer, augmentation_stats, len(tweets), len(full_text), len(unsampled_tweets)
+                    ),
                 }
             )
             
@@ -5,7 +5,7 @@ import threading
 import uuid
 import time
 from  utils.log import log 
-from utils.handleMessage import sendMessage, convertMessage
+from utils.handleMessage import sendMessage, convertMessage, receiveMessage, completeMessage, advertiseCredit
 import traceback
 import pika 
 
@@ -19,6 +19,8 @@ class RabbitMQWorker(Worker):
     ###############
     route_base = "/"
     conn:Connection
+    # messages handled at once, the supervisor queues the rest
+    credit: int = 1
     
     string_connection:str
     connection: pika.BlockingConnection
@@ -75,10 +77,11 @@ class RabbitMQWorker(Worker):
 
     def listen_task(self):
         log("RabbitMQWorker is listening for messages...", "info")
+        advertiseCredit(self.conn, self.credit)
         while True:
             try:
-                if RabbitMQWorker.conn.poll(1):  # Check for messages with 1 second timeout
-                    message = self.conn.recv()
+                if RabbitMQWorker.conn.poll(None):  # Block until a message arrives
+                    message = receiveMessage(self.conn)
                     dest = [
                         d
                         for d in message["destination"]
@@ -89,6 +92,7 @@ class RabbitMQWorker(Worker):
                     param= destSplited[2]
                     instance_method = getattr(self,method)
                     instance_method(message)
+                    completeMessage(self.conn, message)
             except EOFError:
                 break
             except Exception as e:
@@ -6,7 +6,7 @@ import uuid
 import asyncio
 import time
 import utils.log as log
-from utils.handleMessage import sendMessage, convertMessage
+from utils.handleMessage import sendMessage, convertMessage, receiveMessage, completeMessage, advertiseCredit
 
 app = Flask(__name__)
 
@@ -17,6 +17,8 @@ class RestApiWorker(FlaskView):
     route_base = "/"
     conn:Connection
     requests: dict = {}
+    # replies are handed to the waiting request right away
+    credit: int = 64
    
         
     def run(self, conn: Connection, port: int):
@@ -36,16 +38,17 @@ class RestApiWorker(FlaskView):
 
 
     async def listen_task(self):
+        advertiseCredit(RestApiWorker.conn, self.credit)
         while True:
             try:
-                if RestApiWorker.conn.poll(1):  # Check for messages with 1 second timeout
+                if RestApiWorker.conn.poll(None):  # Block until a message arrives
                     print("Listening for messages...")
                     
-                    raw = RestApiWorker.conn.recv()
+                    raw = receiveMessage(RestApiWorker.conn)
                     print(f"Received raw message: {raw}")
                     msg = convertMessage(raw)
                     self.onProcessed(raw)
-                    asyncio.sleep(0.1)  # Yield control to the event loop
+                    completeMessage(RestApiWorker.conn, raw)
             except EOFError:
                 break
             except Exception as e:
@@ -158,7 +161,35 @@ class RestApiWorker(FlaskView):
                 }
             )
         return jsonify(result), 200
-    
+    @route('/preprocessing-stats/<projectId>', methods=['GET'])
+    def getPreprocessingStats(self, projectId):
+        """
+        Get per-stage timings of the last preprocessing job of a project
+        """
+        result = self.sendToOtherWorker(
+            destination=[f"PreprocessingWorker/getPreprocessingStats/{projectId}"],
+            data={}
+        )
+        if result["status"] != "completed":
+            return jsonify(result), 504
+        if not result["result"]:
+            return jsonify({"message": f"No preprocessing stats for project {projectId}"}), 404
+        return jsonify(result["result"]), 200
+    @route('/jobs/<projectId>', methods=['GET'])
+    def getJobsByProjectId(self, projectId):
+        """
+        Get the pipeline jobs of a project with per-stage wait and run times
+        """
+        result = self.sendToOtherWorker(
+            destination=[f"supervisor/getJobs/{projectId}"],
+            data={}
+        )
+        if result["status"] != "completed":
+            return jsonify(result), 504
+        if not result["result"]:
+            return jsonify({"message": f"No jobs for project {projectId}"}), 404
+        return jsonify(result["result"]), 200
+
 
 def main(conn: Connection, config: dict):
     worker = RestApiWorker()
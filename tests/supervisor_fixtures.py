@@ -0,0 +1,61 @@
+"""Supervisor instances for tests, without worker processes or background threads."""
+import multiprocessing
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from supervisor import Supervisor
+    from utils.router import Router
+    from utils.pendingStore import PendingStore
+    from utils.jobTracker import JobTracker
+except ImportError:  # psutil or python-dotenv missing
+    Supervisor = None
+
+
+class FakeProcess:
+    def __init__(self, pid, alive=True):
+        self.pid = pid
+        self.alive = alive
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.alive = False
+
+    def join(self, timeout=None):
+        self.joined = True
+
+
+def bare_supervisor(**attributes):
+    """
+    A Supervisor that starts no workers and no threads.
+
+    The dicts the class shares between instances are replaced with fresh
+    ones, and `attributes` are set on top of these defaults.
+    """
+    supervisor = object.__new__(Supervisor)
+    supervisor._workers = {}
+    supervisor.pending_messages = PendingStore()
+    supervisor.segments = {}
+    supervisor.queues = {}
+    supervisor.credits = {}
+    supervisor.limits = {}
+    supervisor.heartbeats = {}
+    supervisor.draining = {}
+    supervisor.router = Router("least_outstanding")
+    supervisor.queue_size = 10
+    supervisor.job_tracker = JobTracker()
+    for name, value in attributes.items():
+        setattr(supervisor, name, value)
+    return supervisor
+
+
+def add_worker(supervisor, pid, name, **info):
+    """Register a fake instance of `name` under `pid` and return the worker's end of its pipe."""
+    parent, child = multiprocessing.Pipe()
+    supervisor._workers[pid] = {"process": FakeProcess(pid), "conn": parent, "name": name, **info}
+    return child
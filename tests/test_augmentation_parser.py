@@ -0,0 +1,59 @@
+import json
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.augmentationParser import format_items, parse_augmentation
+
+
+class TestAugmentationParser(unittest.TestCase):
+    def test_json_mode_object(self):
+        """Test that the JSON-mode reply is mapped by id."""
+        output = json.dumps({"items": [{"id": 1, "text": "b"}, {"id": 0, "text": "a"}]})
+        self.assertEqual(parse_augmentation(output, [0, 1]), {0: "a", 1: "b"})
+
+    def test_code_fence_and_prose(self):
+        """Test that fences and text around the JSON are ignored."""
+        output = 'Berikut hasilnya:\n```json\n{"items": [{"id": 3, "text": "Halo."}]}\n```'
+        self.assertEqual(parse_augmentation(output, [3]), {3: "Halo."})
+
+    def test_missing_items_are_left_out(self):
+        """Test that a reply with fewer items keeps the ones it has."""
+        output = json.dumps({"items": [{"id": 0, "text": "a"}]})
+        self.assertEqual(parse_augmentation(output, [0, 1, 2]), {0: "a"})
+
+    def test_unknown_ids_are_ignored(self):
+        """Test that ids that were not requested are dropped."""
+        output = json.dumps({"items": [{"id": 0, "text": "a"}, {"id": 9, "text": "z"}]})
+        self.assertEqual(parse_augmentation(output, [0]), {0: "a"})
+
+    def test_truncated_reply_is_salvaged(self):
+        """Test that complete items survive a reply cut off mid-way."""
+        output = '{"items": [{"id": 0, "text": "Satu \\"dua\\"."}, {"id": 1, "text": "Ti'
+        self.assertEqual(parse_augmentation(output, [0, 1]), {0: 'Satu "dua".'})
+
+    def test_plain_list_in_order(self):
+        """Test that the legacy Python list reply is still accepted when complete."""
+        self.assertEqual(parse_augmentation("['a', 'b']", [4, 5]), {4: "a", 5: "b"})
+
+    def test_plain_list_with_wrong_length(self):
+        """Test that a plain list that cannot be aligned is rejected."""
+        self.assertEqual(parse_augmentation("['a']", [4, 5]), {})
+
+    def test_garbage(self):
+        """Test that an unparseable reply yields nothing."""
+        self.assertEqual(parse_augmentation("maaf, saya tidak bisa", [0]), {})
+        self.assertEqual(parse_augmentation(None, [0]), {})
+
+    def test_format_items(self):
+        """Test that the prompt payload round-trips through the parser."""
+        payload = format_items({0: "halo", 2: "apa kabar"})
+        self.assertEqual(json.loads(payload), [{"id": 0, "text": "halo"}, {"id": 2, "text": "apa kabar"}])
+        self.assertEqual(parse_augmentation(payload, [0, 2]), {0: "halo", 2: "apa kabar"})
+
+
+if __name__ == '__main__':
+    unittest.main()
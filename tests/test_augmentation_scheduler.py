@@ -0,0 +1,80 @@
+import unittest
+import asyncio
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.augmentationScheduler import AugmentationScheduler
+
+
+class ThrottledError(Exception):
+    status_code = 429
+
+    class response:
+        headers = {"retry-after-ms": "10"}
+
+
+class TestAugmentationScheduler(unittest.TestCase):
+    def test_plan_batches_respects_size_and_token_target(self):
+        """Test that batches are capped by item count and by estimated tokens."""
+        scheduler = AugmentationScheduler(max_batch_size=3, batch_token_target=20)
+        short = ["abc"] * 7
+        self.assertEqual([len(b) for b in scheduler.plan_batches(short)], [3, 3, 1])
+
+        long = ["x" * 60, "y" * 60, "z"]
+        self.assertEqual([len(b) for b in scheduler.plan_batches(long)], [1, 2])
+
+    def test_concurrency_is_bounded(self):
+        """Test that no more than max_concurrency requests run at once."""
+        scheduler = AugmentationScheduler(max_concurrency=3)
+        state = {"active": 0, "peak": 0}
+
+        async def request():
+            async with scheduler.slot(10):
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+                await asyncio.sleep(0.01)
+                state["active"] -= 1
+
+        async def main():
+            await asyncio.gather(*(request() for _ in range(20)))
+
+        asyncio.run(main())
+        self.assertEqual(state["peak"], 3)
+
+    def test_throttling_halves_limit_once_per_pause(self):
+        """Test that a burst of 429s halves the concurrency limit only once."""
+        scheduler = AugmentationScheduler(max_concurrency=8)
+
+        async def main():
+            await asyncio.gather(*(scheduler.backoff(ThrottledError(), 1) for _ in range(4)))
+
+        asyncio.run(main())
+        self.assertEqual(scheduler.limit, 4.0)
+        self.assertEqual(scheduler.throttled, 4)
+
+    def test_success_grows_limit_back(self):
+        """Test that successful requests raise the limit up to max_concurrency."""
+        scheduler = AugmentationScheduler(max_concurrency=4)
+        scheduler.limit = 1.0
+
+        async def main():
+            for _ in range(20):
+                async with scheduler.slot(1):
+                    pass
+
+        asyncio.run(main())
+        self.assertEqual(scheduler.limit, 4.0)
+
+    def test_requests_per_minute_budget_delays_admission(self):
+        """Test that an exhausted request budget reports a positive delay."""
+        scheduler = AugmentationScheduler(requests_per_minute=60)
+        scheduler._request_budget = 0
+
+        self.assertGreater(scheduler._admission_delay(1), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# and this directory for the shared supervisor fixtures
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.autoscaler import Autoscaler
+from supervisor_fixtures import Supervisor, bare_supervisor, add_worker
+
+
+def autoscaler(**options):
+    return Autoscaler({"ETMWorker": (1, 3)}, queue_per_instance=2, max_queue_age=5, scale_up_cooldown=10, scale_down_cooldown=60, **options)
+
+
+class TestAutoscaler(unittest.TestCase):
+    def test_scales_up_on_queue_depth(self):
+        """Test that a queue deeper than the per-instance allowance adds an instance."""
+        scaler = autoscaler()
+        self.assertEqual(scaler.decide("ETMWorker", instances=1, queued=2, busy=1, now=0), 0)
+        self.assertEqual(scaler.decide("ETMWorker", instances=1, queued=3, busy=1, now=0), 1)
+
+    def test_scales_up_on_queue_age(self):
+        """Test that a short queue whose oldest message waits too long also adds an instance."""
+        scaler = autoscaler()
+        self.assertEqual(scaler.decide("ETMWorker", instances=1, queued=1, oldest_age=6, busy=1, now=0), 1)
+
+    def test_scale_up_cooldown_and_maximum(self):
+        """Test that instances are added one per cooldown and never beyond the maximum."""
+        scaler = autoscaler()
+        self.assertEqual(scaler.decide("ETMWorker", instances=1, queued=10, busy=1, now=0), 1)
+        self.assertEqual(scaler.decide("ETMWorker", instances=2, queued=10, busy=2, now=5), 0)
+        self.assertEqual(scaler.decide("ETMWorker", instances=2, queued=10, busy=2, now=10), 1)
+        self.assertEqual(scaler.decide("ETMWorker", instances=3, queued=10, busy=3, now=30), 0)
+
+    def test_no_scale_up_without_headroom(self):
+        """Test that a busy host or too little free memory for one more instance blocks scaling up."""
+        scaler = autoscaler(max_cpu=85, max_memory=85)
+        self.assertEqual(scaler.decide("ETMWorker", instances=1, queued=10, busy=1, cpu_percent=90, now=0), 0)
+        self.assertEqual(scaler.decide("ETMWorker", instances=1, queued=10, busy=1, memory_percent=90, now=0), 0)
+        self.assertEqual(scaler.decide("ETMWorker", instances=1, queued=10, busy=1, free_memory=100, instance_memory=200, now=0), 0)
+        self.assertEqual(scaler.decide("ETMWorker", instances=1, queued=10, busy=1, free_memory=300, instance_memory=200, now=0), 1)
+
+    def test_scales_down_after_idle_cooldown(self):
+        """Test that an idle instance is retired only after the queue stayed empty for the cooldown."""
+        scaler = autoscaler()
+        self.assertEqual(scaler.decide("ETMWorker", instances=2, queued=0, busy=1, now=0), 0)
+        self.assertEqual(scaler.decide("ETMWorker", instances=2, queued=0, busy=1, now=59), 0)
+        self.assertEqual(scaler.decide("ETMWorker", instances=2, queued=0, busy=2, now=60), 0)
+        self.assertEqual(scaler.decide("ETMWorker", instances=2, queued=0, busy=1, now=61), 0)
+        self.assertEqual(scaler.decide("ETMWorker", instances=2, queued=0, busy=0, now=121), -1)
+        self.assertEqual(scaler.decide("ETMWorker", instances=1, queued=0, busy=0, now=500), 0)
+
+    def test_limits(self):
+        """Test that counts outside the limits are corrected and unscaled types are ignored."""
+        scaler = autoscaler()
+        self.assertEqual(scaler.decide("ETMWorker", instances=0, queued=0), 1)
+        self.assertEqual(scaler.decide("ETMWorker", instances=4, queued=10), -1)
+        self.assertEqual(scaler.decide("CacheWorker", instances=1, queued=100), 0)
+        self.assertEqual(scaler.minimum("ETMWorker"), 1)
+        self.assertEqual(scaler.minimum("CacheWorker"), 1)
+
+
+@unittest.skipIf(Supervisor is None, "supervisor dependencies are not installed")
+class TestSupervisorAutoscale(unittest.TestCase):
+    def setUp(self):
+        supervisor = bare_supervisor(
+            queue_size=100,
+            autoscaler=Autoscaler({"ETMWorker": (1, 3)}, max_cpu=101, max_memory=101, scale_down_cooldown=0),
+        )
+        self.created = []
+        supervisor.create_worker = lambda name, count=1, config=None: self.created.append(name)
+        self.supervisor = supervisor
+
+    def add_worker(self, pid, started):
+        add_worker(self.supervisor, pid, "ETMWorker", started=started)
+        self.supervisor.credits[pid] = 1
+
+    def test_backlog_adds_an_instance(self):
+        """Test that messages waiting for credit make the supervisor start another instance."""
+        self.add_worker(1, started=0)
+        for index in range(4):
+            self.supervisor._send_to_worker("ETMWorker/run_etm/p", {"messageId": str(index), "destination": ["ETMWorker/run_etm/p"]})
+        self.supervisor.autoscale()
+        self.assertEqual(self.created, ["ETMWorker"])
+
+    def test_idle_instance_is_retired(self):
+        """Test that the newest idle instance is stopped when there is nothing to do."""
+        self.add_worker(1, started=0)
+        self.add_worker(2, started=5)
+        self.supervisor.autoscale()
+        self.supervisor.autoscale()
+        self.assertEqual(list(self.supervisor._workers), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import sys
+import os
+
+# Add benchmarks to path to import the helpers
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from synthetic_tweets import generate_tweets, parse_size
+
+try:
+    from common import compare
+except ImportError:  # psutil missing
+    compare = None
+
+
+class TestSyntheticTweets(unittest.TestCase):
+    def test_generation_is_deterministic(self):
+        """Test that the same seed gives the same corpus."""
+        self.assertEqual(generate_tweets(50, seed=3), generate_tweets(50, seed=3))
+        self.assertNotEqual(generate_tweets(50, seed=3), generate_tweets(50, seed=4))
+
+    def test_tweets_have_worker_fields(self):
+        """Test that tweets look like the documents the DatabaseInteractionWorker returns."""
+        tweets = generate_tweets(200)
+        self.assertEqual(len({tweet["tweet_url"] for tweet in tweets}), 200)
+        for tweet in tweets:
+            self.assertTrue(tweet["full_text"])
+            self.assertIn("+0000", tweet["created_at"])
+
+    def test_noise_is_present(self):
+        """Test that the corpus contains the noise every stage has to handle."""
+        texts = " ".join(tweet["full_text"] for tweet in generate_tweets(1000))
+        for marker in ("https://t.co/", "@user", "RT @", "#"):
+            self.assertIn(marker, texts)
+
+    def test_parse_size(self):
+        """Test that size shorthands are understood."""
+        self.assertEqual(parse_size("1m"), 1000000)
+        self.assertEqual(parse_size("250"), 250)
+
+
+@unittest.skipIf(compare is None, "psutil is not installed")
+class TestBaselineComparison(unittest.TestCase):
+    def test_regression_is_flagged(self):
+        """Test that a slowdown beyond the tolerance is a regression and noise is not."""
+        baseline = {"results": {"1000": {"stemming": {"seconds": 1.0}, "tokenizing": {"seconds": 0.001}}}}
+        current = {"results": {"1000": {"stemming": {"seconds": 1.5}, "tokenizing": {"seconds": 0.01}}}}
+        rows = {row["stage"]: row for row in compare(baseline, current, tolerance=0.25)}
+        self.assertTrue(rows["stemming"]["regression"])
+        self.assertFalse(rows["tokenizing"]["regression"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from utils.dedup import TweetDeduplicator, normalize_for_dedup
+except ImportError:  # numpy is not installed
+    TweetDeduplicator = None
+
+
+@unittest.skipIf(TweetDeduplicator is None, "numpy is not installed")
+class TestTweetDeduplicator(unittest.TestCase):
+    def test_normalize_drops_twitter_noise(self):
+        """Test that URLs, mentions, RT and punctuation do not affect the normalized text."""
+        self.assertEqual(
+            normalize_for_dedup("RT @budi: Harga cabai NAIK!! https://t.co/abc"),
+            "harga cabai naik",
+        )
+
+    def test_exact_and_retweet_duplicates_collapse(self):
+        """Test that retweets and exact copies point at the first tweet."""
+        texts = [
+            "Harga cabai naik lagi hari ini",
+            "RT @budi: Harga cabai naik lagi hari ini https://t.co/x",
+            "harga cabai naik lagi hari ini!!",
+            "Makanan enak di Bandung",
+        ]
+        self.assertEqual(TweetDeduplicator().cluster(texts), [0, 0, 0, 3])
+
+    def test_near_duplicates_collapse(self):
+        """Test that a copy-paste post with a small edit joins the original's cluster."""
+        original = "Pemerintah resmi menaikkan harga bahan bakar minyak mulai besok pagi di seluruh Indonesia"
+        edited = original + " guys"
+        self.assertEqual(TweetDeduplicator().cluster([original, edited]), [0, 0])
+
+    def test_distinct_tweets_stay_separate(self):
+        """Test that unrelated tweets are their own representatives."""
+        texts = ["Makanan enak di Bandung", "Macet parah di tol Cikampek pagi ini", ""]
+        self.assertEqual(TweetDeduplicator().cluster(texts), [0, 1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
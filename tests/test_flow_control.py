@@ -0,0 +1,145 @@
+import threading
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# and this directory for the shared supervisor fixtures
+sys.path.insert(0, os.path.dirname(__file__))
+
+from supervisor_fixtures import Supervisor, bare_supervisor, add_worker
+from utils.handleMessage import decodeHeader, decodeMessage, encodeMessage
+
+
+@unittest.skipIf(Supervisor is None, "supervisor dependencies are not installed")
+class TestCreditFlowControl(unittest.TestCase):
+    def setUp(self):
+        self.supervisor = bare_supervisor(queue_size=5)
+        self.ends = {}
+
+    def add_worker(self, pid, name="DatabaseInteractionWorker", credit=None):
+        self.ends[pid] = add_worker(self.supervisor, pid, name)
+        if credit is not None:
+            self.supervisor.set_credit(pid, credit)
+
+    def send(self, index, destination="DatabaseInteractionWorker/getTweetByKeyword/p"):
+        frame = encodeMessage({"messageId": str(index), "status": "completed", "destination": [destination], "data": index})
+        self.supervisor.handle_worker_message({**decodeHeader(frame), "frame": frame}, 0)
+
+    def received(self, pid):
+        messages = []
+        while self.ends[pid].poll():
+            messages.append(decodeMessage(self.ends[pid].recv_bytes())["data"])
+        return messages
+
+    def test_messages_wait_for_credit(self):
+        """Test that an instance never gets more messages than its credit."""
+        self.add_worker(1, credit=2)
+        for index in range(4):
+            self.send(index)
+        self.assertEqual(self.received(1), [0, 1])
+        self.assertEqual(len(self.supervisor.queues["DatabaseInteractionWorker"]), 2)
+
+    def test_done_releases_the_next_message(self):
+        """Test that a completion sends the next queued message right away instead of after a timer."""
+        self.add_worker(1, credit=1)
+        for index in range(3):
+            self.send(index)
+        self.assertEqual(self.received(1), [0])
+        self.supervisor.handle_worker_message({"messageId": "0", "reason": "DONE", "destination": ["supervisor"]}, 1)
+        self.assertEqual(self.received(1), [1])
+        self.assertEqual([m["messageId"] for m in self.supervisor.pending_messages["DatabaseInteractionWorker"]], ["1", "2"])
+
+    def test_queue_waits_for_a_worker_to_start(self):
+        """Test that messages for a worker type with no instance are queued, then sent once it advertises credit."""
+        self.send(0)
+        self.send(1)
+        self.add_worker(1)
+        self.supervisor.handle_worker_message({"reason": "CREDIT", "credit": 2, "destination": ["supervisor"]}, 1)
+        self.assertEqual(self.received(1), [0, 1])
+
+    def test_full_queue_drops_new_messages(self):
+        """Test that the per-type queue is bounded."""
+        self.add_worker(1, credit=1)
+        for index in range(10):
+            self.send(index)
+        self.assertEqual(len(self.supervisor.queues["DatabaseInteractionWorker"]), 5)
+        self.assertEqual(len(self.supervisor.pending_messages["DatabaseInteractionWorker"]), 6)
+
+    def test_messages_of_a_dead_instance_are_requeued(self):
+        """Test that work held by a killed instance goes to the remaining one."""
+        self.add_worker(1, credit=1)
+        self.add_worker(2, credit=1)
+        self.send(0)
+        self.send(1)
+        first = self.received(1) + self.received(2)
+        self.assertEqual(sorted(first), [0, 1])
+        self.supervisor._kill_worker(1)
+        self.supervisor.resend_pending_messages("DatabaseInteractionWorker")
+        self.supervisor.handle_worker_message({"messageId": "1", "reason": "DONE", "destination": ["supervisor"]}, 2)
+        self.supervisor.handle_worker_message({"messageId": "0", "reason": "DONE", "destination": ["supervisor"]}, 2)
+        self.assertEqual(len(self.received(2)), 1)
+
+    def test_limited_method_leaves_credit_to_the_others(self):
+        """Test that messages of a method at its limit wait without holding back other methods of the instance."""
+        self.add_worker(1, name="PreprocessingWorker")
+        self.supervisor.handle_worker_message(
+            {"reason": "CREDIT", "credit": 3, "limits": {"run_preprocessing": 2}, "destination": ["supervisor"]}, 1
+        )
+        for index in range(3):
+            self.send(index, f"PreprocessingWorker/run_preprocessing/p{index}")
+        self.send(3, "PreprocessingWorker/getPreprocessingStats/p0")
+        self.assertEqual(self.received(1), [0, 1, 3])
+        self.assertEqual(len(self.supervisor.queues["PreprocessingWorker"]), 1)
+
+        self.supervisor.handle_worker_message({"messageId": "3", "reason": "DONE", "destination": ["supervisor"]}, 1)
+        self.assertEqual(self.received(1), [])
+        self.supervisor.handle_worker_message({"messageId": "0", "reason": "DONE", "destination": ["supervisor"]}, 1)
+        self.assertEqual(self.received(1), [2])
+
+    def test_killed_instance_is_reaped(self):
+        """Test that a stopped instance is joined, so it does not stay behind as a zombie."""
+        self.add_worker(1, credit=1)
+        process = self.supervisor._workers[1]["process"]
+        self.supervisor._kill_worker(1)
+        self.assertTrue(process.joined)
+        self.assertNotIn(1, self.supervisor.limits)
+
+    def test_drain_while_instances_come_and_go(self):
+        """Test that routing keeps working while another thread adds and removes instances."""
+        self.supervisor.queue_size = 100
+        self.add_worker(1, credit=100)
+        errors = []
+
+        def churn():
+            try:
+                for pid in range(2, 100):
+                    self.add_worker(pid, credit=1)
+                    self.supervisor._kill_worker(pid)
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=churn)
+        thread.start()
+        for index in range(100):
+            self.send(index)
+        thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.supervisor.pending_messages["DatabaseInteractionWorker"]), 100)
+
+    def test_sticky_message_waits_for_its_instance(self):
+        """Test that a sticky project is not moved to another instance when its own is full."""
+        self.supervisor.router.set_strategy("ETMWorker", "sticky")
+        self.add_worker(1, name="ETMWorker", credit=1)
+        self.add_worker(2, name="ETMWorker", credit=1)
+        destination = "ETMWorker/run_etm/project"
+        self.send(0, destination)
+        self.send(1, destination)
+        owner = 1 if self.received(1) else 2
+        self.assertEqual(self.received(3 - owner), [])
+        self.assertEqual(len(self.supervisor.queues["ETMWorker"]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
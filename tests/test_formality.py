@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.formality import FormalityClassifier
+
+
+LEXICON = [
+    "pemerintah", "naik", "harga", "bahan", "bakar", "minyak", "mulai", "besok",
+    "saya", "sangat", "suka", "makan", "makanan", "khas", "bandung", "tidak", "tahu",
+    "kenapa", "sekali", "di", "pasar", "cabai", "masyarakat", "resah",
+]
+SLANG = ["gw", "ga", "tau", "knp", "bgt", "mantap"]
+
+
+class TestFormalityClassifier(unittest.TestCase):
+    def setUp(self):
+        self.classifier = FormalityClassifier(LEXICON, SLANG)
+
+    def test_formal_indonesian_is_skipped(self):
+        """Test that a formal Indonesian tweet does not need the LLM."""
+        self.assertFalse(self.classifier.needs_rewrite("Pemerintah naik harga bahan bakar minyak mulai besok."))
+
+    def test_affixed_words_look_indonesian(self):
+        """Test that unknown affixed words still score by their character trigrams."""
+        self.assertGreater(self.classifier.indonesian_likelihood("kenaikan"), 0.5)
+
+    def test_urls_and_mentions_are_ignored(self):
+        """Test that Twitter noise does not make a formal tweet look informal."""
+        self.assertFalse(self.classifier.needs_rewrite("@budi Harga cabai di pasar naik https://t.co/abc"))
+
+    def test_slang_needs_rewrite(self):
+        """Test that tweets with kbba slang are sent to the LLM."""
+        self.assertTrue(self.classifier.needs_rewrite("gw ga tau knp harga naik bgt"))
+
+    def test_foreign_language_needs_rewrite(self):
+        """Test that tweets with foreign function words are sent to the LLM."""
+        self.assertTrue(self.classifier.needs_rewrite("This is so bad for the people"))
+
+    def test_informal_marks_need_rewrite(self):
+        """Test that elongated letters and emoticons are sent to the LLM."""
+        self.assertTrue(self.classifier.needs_rewrite("Makanan khas bandung enakkkk"))
+        self.assertTrue(self.classifier.needs_rewrite("Saya suka makanan khas Bandung :)"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import multiprocessing
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# and this directory for the shared supervisor fixtures
+sys.path.insert(0, os.path.dirname(__file__))
+
+from multiprocessing import shared_memory
+
+from utils.handleMessage import (
+    convertMessage, decodeHeader, decodeMessage, encodeMessage, msgpack, receiveMessage, releaseSegment,
+    sendMessage, setCodec, setSharedMemoryThreshold
+)
+from supervisor_fixtures import Supervisor, bare_supervisor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def sample_message(**data):
+    return {
+        "messageId": "42",
+        "status": "completed",
+        "reason": "",
+        "destination": ["ETMWorker/run_etm/project"],
+        "data": data or {"tweets": ["a b", "c d"], "keyword": "banjir"},
+    }
+
+
+class TestMessageCodec(unittest.TestCase):
+    def tearDown(self):
+        setCodec("pickle")
+
+    def test_round_trip_per_codec(self):
+        """Test that every available codec gives back the same message."""
+        codecs = ["pickle", "json"] + (["msgpack"] if msgpack is not None else [])
+        for codec in codecs:
+            with self.subTest(codec=codec):
+                self.assertEqual(decodeMessage(encodeMessage(sample_message(), codec)), sample_message())
+
+    def test_header_is_readable_without_payload(self):
+        """Test that the supervisor can route a frame from its header alone."""
+        header = decodeHeader(encodeMessage(sample_message()))
+        self.assertEqual(header["destination"], ["ETMWorker/run_etm/project"])
+        self.assertEqual(header["messageId"], "42")
+        self.assertEqual(header["codec"], "pickle")
+        self.assertNotIn("data", header)
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_arrays_travel_out_of_band_and_stay_writable(self):
+        """Test that numpy arrays are sent as raw buffers and can be modified after decoding."""
+        frame = encodeMessage(sample_message(matrix=numpy.arange(6.0).reshape(2, 3)))
+        self.assertEqual(decodeHeader(frame)["buffers"], [48])
+        matrix = decodeMessage(frame)["data"]["matrix"]
+        numpy.testing.assert_array_equal(matrix, [[0, 1, 2], [3, 4, 5]])
+        matrix[0, 0] = 9
+
+    def test_unknown_codec_falls_back_to_pickle(self):
+        """Test that a misconfigured codec does not break messaging."""
+        self.assertEqual(setCodec("yaml"), "pickle")
+
+    def test_send_and_receive_through_a_pipe(self):
+        """Test that sendMessage and receiveMessage agree over a real Pipe."""
+        parent, child = multiprocessing.Pipe()
+        sendMessage(child, messageId="1", status="completed", destination=["supervisor"], data={"ok": True})
+        message = receiveMessage(parent)
+        self.assertEqual(message["data"], {"ok": True})
+        self.assertEqual(message["destination"], ["supervisor"])
+
+    def test_forwarded_frame_is_decoded_once(self):
+        """Test that a frame forwarded as raw bytes decodes on the receiving side."""
+        worker, supervisor = multiprocessing.Pipe()
+        target, receiver = multiprocessing.Pipe()
+        sendMessage(worker, messageId="7", status="completed", destination=["ETMWorker/run_etm/p"], data=[1, 2])
+        frame = supervisor.recv_bytes()
+        target.send_bytes(frame)
+        self.assertEqual(receiveMessage(receiver)["data"], [1, 2])
+
+    def test_convert_message_accepts_frames(self):
+        """Test that convertMessage decodes frames as well as JSON strings and dicts."""
+        self.assertEqual(convertMessage(encodeMessage(sample_message())), sample_message())
+        self.assertEqual(convertMessage('{"messageId": "1"}'), {"messageId": "1"})
+
+
+
+def segment_exists(name):
+    try:
+        shared_memory.SharedMemory(name=name).close()
+        return True
+    except FileNotFoundError:
+        return False
+
+
+class TestSharedMemoryTransport(unittest.TestCase):
+    def setUp(self):
+        setSharedMemoryThreshold(64)
+
+    def tearDown(self):
+        setSharedMemoryThreshold(0)
+
+    def test_large_payload_moves_to_shared_memory(self):
+        """Test that a payload over the threshold leaves only a header in the frame."""
+        message = sample_message(tweets=["tweet %d" % index for index in range(1000)])
+        frame = encodeMessage(message)
+        header = decodeHeader(frame)
+        try:
+            self.assertIn("shm", header)
+            self.assertLess(len(frame), 400)
+            self.assertEqual(decodeMessage(frame), message)
+        finally:
+            releaseSegment(header["shm"])
+        self.assertFalse(segment_exists(header["shm"]))
+
+    def test_small_payload_stays_in_the_pipe(self):
+        """Test that payloads under the threshold are not put in shared memory."""
+        self.assertNotIn("shm", decodeHeader(encodeMessage(sample_message(ok=True))))
+
+    def test_receiver_acknowledges_shared_payload(self):
+        """Test that reading a shared payload sends back an ACK naming its segment."""
+        worker, supervisor = multiprocessing.Pipe()
+        sendMessage(supervisor, messageId="9", status="completed", destination=["ETMWorker/run_etm/p"], data=list(range(500)))
+        self.assertEqual(receiveMessage(worker)["data"], list(range(500)))
+        ack = decodeHeader(supervisor.recv_bytes())
+        self.assertEqual(ack["reason"], "ACK")
+        self.assertEqual(ack["messageId"], "9")
+        self.assertTrue(segment_exists(ack["release"][0]))
+        releaseSegment(ack["release"][0])
+
+    def test_released_payload_is_skipped(self):
+        """Test that a resend whose segment is already gone does not block the next message."""
+        worker, supervisor = multiprocessing.Pipe()
+        frame = encodeMessage(sample_message(tweets=list(range(500))))
+        releaseSegment(decodeHeader(frame)["shm"])
+        supervisor.send_bytes(frame)
+        sendMessage(supervisor, messageId="next", status="completed", data=[])
+        self.assertEqual(receiveMessage(worker)["messageId"], "next")
+
+
+@unittest.skipIf(Supervisor is None, "supervisor dependencies are not installed")
+class TestSupervisorSegments(unittest.TestCase):
+    def setUp(self):
+        self.supervisor = bare_supervisor()
+        setSharedMemoryThreshold(64)
+        self.frame = encodeMessage(sample_message(tweets=list(range(500))))
+        self.message = {**decodeHeader(self.frame), "frame": self.frame}
+        self.name = self.message["shm"]
+
+    def tearDown(self):
+        setSharedMemoryThreshold(0)
+        releaseSegment(self.name)
+
+    def test_segment_is_unlinked_after_last_ack(self):
+        """Test that a segment delivered twice is unlinked only when both deliveries are acknowledged."""
+        self.supervisor.retain_segment(self.message, 1)
+        self.supervisor.retain_segment(self.message, 2)
+        self.supervisor.acknowledge({"messageId": "42", "release": [self.name]}, 1)
+        self.assertTrue(segment_exists(self.name))
+        self.supervisor.acknowledge({"messageId": "42", "release": [self.name]}, 2)
+        self.assertFalse(segment_exists(self.name))
+        self.assertEqual(self.supervisor.segments, {})
+
+    def test_dropped_message_releases_its_segment(self):
+        """Test that a message dropped by a full queue, never delivered to anyone, does not leave its segment behind."""
+        self.supervisor.queue_size = 0
+        self.supervisor._send_to_worker("ETMWorker/run_etm/p", self.message)
+        self.assertFalse(segment_exists(self.name))
+        self.assertEqual(self.supervisor.pending_messages.messages("ETMWorker"), [])
+
+    def test_pending_message_keeps_segment_for_resend(self):
+        """Test that a crashed worker's payload survives until the resend is done."""
+        self.supervisor.track_pending_message("ETMWorker", self.message)
+        self.supervisor.retain_segment(self.message, 1)
+        self.supervisor.release_segment(self.name, 1, all_deliveries=True)
+        self.assertTrue(segment_exists(self.name))
+        self.supervisor._workers[2] = {"name": "ETMWorker"}
+        self.supervisor.retain_segment(self.message, 2)
+        self.supervisor.acknowledge({"messageId": "42", "release": [self.name]}, 2)
+        self.assertTrue(segment_exists(self.name))
+        self.supervisor.complete({"messageId": "42"}, 2)
+        self.assertFalse(segment_exists(self.name))
+        self.assertEqual(self.supervisor.pending_messages["ETMWorker"], [])
+
+if __name__ == '__main__':
+    unittest.main()
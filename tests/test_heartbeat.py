@@ -0,0 +1,187 @@
+import multiprocessing
+import time
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# and this directory for the shared supervisor fixtures
+sys.path.insert(0, os.path.dirname(__file__))
+
+import utils.handleMessage as handleMessage
+from utils.handleMessage import (
+    encodeMessage, decodeHeader, receiveMessage, completeMessage, workerLoad, startHeartbeat, setSharedMemoryThreshold,
+    reportProgress
+)
+
+from supervisor_fixtures import Supervisor, bare_supervisor, add_worker
+
+
+class TestWorkerHeartbeat(unittest.TestCase):
+    def setUp(self):
+        setSharedMemoryThreshold(0)
+        # other tests receive messages without completing them
+        handleMessage._active.clear()
+        self.supervisor_end, self.worker_end = multiprocessing.Pipe()
+
+    def test_load_follows_received_messages(self):
+        """Test that queue depth and the current message follow receive and complete."""
+        self.supervisor_end.send_bytes(encodeMessage({"messageId": "1", "status": "processing", "destination": ["ETMWorker/run_etm/p1"], "data": {}}))
+        message = receiveMessage(self.worker_end)
+        load = workerLoad()
+        self.assertEqual(load["queue_depth"], 1)
+        self.assertEqual(load["current"], "ETMWorker/run_etm/p1")
+        self.assertGreaterEqual(load["stalled_for"], 0)
+        completeMessage(self.worker_end, message)
+        self.assertEqual(workerLoad()["queue_depth"], 0)
+        self.assertIsNone(workerLoad()["current"])
+
+    def test_progress_is_counted(self):
+        """Test that reported steps show up in the load."""
+        before = workerLoad()["progress"]
+        reportProgress()
+        reportProgress(2)
+        self.assertEqual(workerLoad()["progress"], before + 3)
+
+    def test_heartbeats_are_sent_periodically(self):
+        """Test that the heartbeat thread keeps sending its load in the frame header."""
+        startHeartbeat(self.worker_end, 0.01)
+        headers = []
+        while len(headers) < 3:
+            self.assertTrue(self.supervisor_end.poll(2))
+            headers.append(decodeHeader(self.supervisor_end.recv_bytes()))
+        self.worker_end.close()
+        self.assertTrue(all(header["reason"] == "HEARTBEAT" for header in headers))
+        self.assertIn("queue_depth", headers[0]["heartbeat"])
+
+    def test_heartbeat_survives_a_failed_beat(self):
+        """Test that an error while building one heartbeat is logged and the thread keeps beating."""
+        calls = []
+
+        def failing_once():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("dictionary changed size during iteration")
+            return {"queue_depth": 0}
+
+        self.addCleanup(setattr, handleMessage, "workerLoad", workerLoad)
+        handleMessage.workerLoad = failing_once
+        startHeartbeat(self.worker_end, 0.01)
+        self.assertTrue(self.supervisor_end.poll(2))
+        self.assertEqual(decodeHeader(self.supervisor_end.recv_bytes())["heartbeat"], {"queue_depth": 0})
+        self.worker_end.close()
+
+
+@unittest.skipIf(Supervisor is None, "supervisor dependencies are not installed")
+class TestSupervisorLiveness(unittest.TestCase):
+    def setUp(self):
+        supervisor = bare_supervisor(heartbeat_deadline=2, startup_deadline=60, stall_deadline=100)
+        self.restarted = []
+        supervisor.create_worker = lambda name, count=1, config=None: self.restarted.append(name)
+        self.supervisor = supervisor
+
+    def add_worker(self, pid, started_ago=0):
+        add_worker(self.supervisor, pid, "ETMWorker", started=time.monotonic() - started_ago)
+
+    def beat(self, pid, ago=0, **load):
+        self.supervisor.handle_worker_message({"reason": "HEARTBEAT", "destination": ["supervisor"], "heartbeat": load}, pid)
+        self.supervisor.heartbeats[pid]["received"] -= ago
+
+    def age_progress(self, pid, seconds):
+        self.supervisor.heartbeats[pid]["progressed"] -= seconds
+
+    def test_fresh_heartbeat_keeps_worker(self):
+        """Test that a worker that beats in time is left alone."""
+        self.add_worker(1)
+        self.beat(1, queue_depth=0)
+        self.supervisor.check_worker_health()
+        self.assertEqual(self.restarted, [])
+        self.assertEqual(self.supervisor.heartbeats[1]["queue_depth"], 0)
+
+    def test_missed_heartbeat_restarts_worker(self):
+        """Test that a worker whose process is alive but silent past the deadline is restarted."""
+        self.add_worker(1)
+        self.beat(1, ago=3)
+        self.supervisor.check_worker_health()
+        self.assertEqual(self.restarted, ["ETMWorker"])
+        self.assertNotIn(1, self.supervisor._workers)
+
+    def test_busy_worker_survives_a_long_silence(self):
+        """Test that the default deadline tolerates a heartbeat gap from a long GIL-holding call on a busy worker."""
+        self.supervisor.heartbeat_deadline = Supervisor.heartbeat_deadline
+        self.add_worker(1)
+        self.supervisor.router.in_flight[1] = 1
+        self.beat(1, ago=5, queue_depth=1, current="PreprocessingWorker/run_preprocessing/p1", stalled_for=5)
+        self.supervisor.check_worker_health()
+        self.assertEqual(self.restarted, [])
+        self.assertIn(1, self.supervisor._workers)
+
+    def test_startup_deadline(self):
+        """Test that a new worker gets the startup deadline for its first heartbeat."""
+        self.add_worker(1, started_ago=30)
+        self.add_worker(2, started_ago=90)
+        self.supervisor.check_worker_health()
+        self.assertEqual(list(self.supervisor._workers), [1])
+
+    def test_exited_worker_restarts(self):
+        """Test that a dead process is replaced without waiting for its heartbeat deadline."""
+        self.add_worker(1)
+        self.beat(1)
+        self.supervisor._workers[1]["process"].alive = False
+        self.supervisor.check_worker_health()
+        self.assertEqual(self.restarted, ["ETMWorker"])
+
+    def test_stalled_worker_is_drained_then_restarted(self):
+        """Test that a worker stuck on one message gets no new work and is restarted once its other messages finish."""
+        self.add_worker(1)
+        self.supervisor.router.in_flight[1] = 2
+        self.beat(1, stalled_for=150, current="ETMWorker/run_etm/p1")
+        self.age_progress(1, 150)
+        self.supervisor.check_worker_health()
+        self.assertIn(1, self.supervisor.draining)
+        self.assertEqual(self.restarted, [])
+
+        self.supervisor.credits[1] = 5
+        self.supervisor._send_to_worker("ETMWorker/run_etm/p2", {"messageId": "2", "destination": ["ETMWorker/run_etm/p2"]})
+        self.assertEqual(len(self.supervisor.queues["ETMWorker"]), 1)
+
+        self.supervisor.router.done(1)
+        self.supervisor.check_worker_health()
+        self.assertEqual(self.restarted, ["ETMWorker"])
+        self.assertNotIn(1, self.supervisor.draining)
+
+    def test_long_job_with_progress_is_not_stalled(self):
+        """Test that a worker on one message past the stall deadline is left alone while its progress keeps moving."""
+        self.add_worker(1)
+        self.supervisor.router.in_flight[1] = 1
+        self.beat(1, stalled_for=150, progress=4, current="ETMWorker/run_etm/p1")
+        self.age_progress(1, 150)
+        self.beat(1, stalled_for=151, progress=5, current="ETMWorker/run_etm/p1")
+        self.supervisor.check_worker_health()
+        self.assertNotIn(1, self.supervisor.draining)
+
+        self.beat(1, stalled_for=300, progress=5, current="ETMWorker/run_etm/p1")
+        self.age_progress(1, 150)
+        self.supervisor.check_worker_health()
+        self.assertEqual(self.restarted, ["ETMWorker"])
+
+    def test_message_is_dropped_after_max_attempts(self):
+        """Test that a message whose instance is restarted on every delivery stops being sent after max_attempts."""
+        self.supervisor.max_attempts = 3
+        ends = {1: add_worker(self.supervisor, 1, "ETMWorker")}
+        self.supervisor.set_credit(1, 1)
+        self.supervisor._send_to_worker("ETMWorker/run_etm/p1", {"messageId": "1", "destination": ["ETMWorker/run_etm/p1"]})
+        for pid in range(2, 5):
+            self.supervisor._restart_worker(pid - 1)
+            ends[pid] = add_worker(self.supervisor, pid, "ETMWorker")
+            self.supervisor.set_credit(pid, 1)
+            self.supervisor.resend_pending_messages("ETMWorker")
+        for pid in (1, 2, 3):
+            self.assertEqual(decodeHeader(ends[pid].recv_bytes())["messageId"], "1")
+        self.assertFalse(ends[4].poll())
+        self.assertEqual(self.supervisor.pending_messages.messages("ETMWorker"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import multiprocessing
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# and this directory for the shared supervisor fixtures
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.jobTracker import JobTracker
+from utils.handleMessage import (
+    encodeMessage, decodeHeader, decodeMessage, receiveMessage, sendMessage, completeMessage, setHeader, useJob,
+    currentJob, setSharedMemoryThreshold
+)
+
+from supervisor_fixtures import Supervisor, bare_supervisor, add_worker
+
+
+class TestJobTracker(unittest.TestCase):
+    def test_stages_are_timed(self):
+        """Test that every hop records its enqueue, start and finish time and the project comes from the destination."""
+        tracker = JobTracker()
+        clock = iter(range(100))
+        with mock.patch("utils.jobTracker.time.time", side_effect=lambda: next(clock)):
+            job = tracker.new_job("RabbitMQWorker")                                         # 0
+            tracker.enqueued(job, "m1", "PreprocessingWorker/prepare_preprocessing/")        # 1
+            tracker.started(job, "m1", "PreprocessingWorker", 10)                           # 2
+            tracker.enqueued(job, "m1", "DatabaseInteractionWorker/getTweetByKeyword/p1")    # 3
+            tracker.finished(job, "m1", "PreprocessingWorker")                              # 4
+            tracker.started(job, "m1", "DatabaseInteractionWorker", 11)                     # 5
+            tracker.finished(job, "m1", "DatabaseInteractionWorker")                        # 6
+            [summary] = tracker.jobs_of("p1")
+        self.assertEqual(summary["projectId"], "p1")
+        self.assertEqual(summary["status"], "completed")
+        self.assertEqual(summary["duration"], 6)
+        self.assertEqual([stage["stage"] for stage in summary["stages"]], ["PreprocessingWorker/prepare_preprocessing", "DatabaseInteractionWorker/getTweetByKeyword"])
+        self.assertEqual([(stage["wait"], stage["run"]) for stage in summary["stages"]], [(1, 2), (2, 1)])
+        self.assertEqual(summary["stages"][1]["pid"], 11)
+        self.assertEqual(summary["bottleneck"], "PreprocessingWorker/prepare_preprocessing")
+
+    def test_same_message_id_twice_on_one_worker(self):
+        """Test that a messageId reused for a later hop to the same worker type opens a new stage."""
+        tracker = JobTracker()
+        job = tracker.new_job("RabbitMQWorker")
+        tracker.enqueued(job, "m1", "PreprocessingWorker/prepare_preprocessing/")
+        tracker.started(job, "m1", "PreprocessingWorker", 1)
+        tracker.finished(job, "m1", "PreprocessingWorker")
+        tracker.enqueued(job, "m1", "PreprocessingWorker/run_preprocessing/p1")
+        tracker.started(job, "m1", "PreprocessingWorker", 1)
+        [summary] = tracker.jobs_of("p1")
+        self.assertEqual(summary["status"], "running")
+        self.assertIsNotNone(summary["stages"][0]["finished"])
+        self.assertIsNone(summary["stages"][1]["finished"])
+
+    def test_old_jobs_are_dropped(self):
+        """Test that only the newest jobs are kept."""
+        tracker = JobTracker(max_jobs=2)
+        jobs = [tracker.new_job("RabbitMQWorker") for _ in range(3)]
+        self.assertEqual(list(tracker.jobs), jobs[1:])
+        tracker.enqueued(jobs[0], "m", "ETMWorker/run_etm/p1")
+        self.assertEqual(tracker.jobs_of("p1"), [])
+
+
+class TestJobPropagation(unittest.TestCase):
+    def setUp(self):
+        setSharedMemoryThreshold(0)
+        self.supervisor_end, self.worker_end = multiprocessing.Pipe()
+
+    def test_job_follows_into_sent_messages(self):
+        """Test that messages sent while handling a received message carry its job id, including the DONE."""
+        frame = encodeMessage({"messageId": "1", "status": "completed", "destination": ["ETMWorker/run_etm/p1"], "data": {"n": 1}})
+        self.supervisor_end.send_bytes(setHeader(frame, jobId="job-1"))
+        message = receiveMessage(self.worker_end)
+        self.assertEqual(message["jobId"], "job-1")
+        self.assertEqual(message["data"], {"n": 1})
+        sendMessage(self.worker_end, "2", "completed", destination=["LLMWorker/getContext/p1"], data={})
+        completeMessage(self.worker_end, message)
+        self.assertEqual(decodeHeader(self.supervisor_end.recv_bytes())["jobId"], "job-1")
+        self.assertEqual(decodeHeader(self.supervisor_end.recv_bytes())["jobId"], "job-1")
+        useJob({})
+        self.assertIsNone(currentJob())
+
+    def test_set_header_keeps_payload(self):
+        """Test that adding a header field leaves the payload untouched."""
+        frame = encodeMessage({"messageId": "1", "status": "completed", "destination": ["x"], "data": list(range(100))})
+        updated = setHeader(frame, jobId="job-1")
+        self.assertEqual(decodeHeader(updated)["jobId"], "job-1")
+        self.assertEqual(decodeMessage(updated)["data"], list(range(100)))
+
+
+@unittest.skipIf(Supervisor is None, "supervisor dependencies are not installed")
+class TestSupervisorJobs(unittest.TestCase):
+    def setUp(self):
+        self.supervisor = bare_supervisor()
+        self.ends = {
+            pid: add_worker(self.supervisor, pid, name)
+            for pid, name in [(1, "RabbitMQWorker"), (2, "PreprocessingWorker"), (3, "RestApiWorker")]
+        }
+
+    def route(self, pid, message):
+        frame = encodeMessage(message)
+        self.supervisor.handle_worker_message({**decodeHeader(frame), "frame": frame}, pid)
+
+    def test_origin_message_starts_a_job(self):
+        """Test that a RabbitMQ message gets a job id that reaches the next worker and the /jobs answer."""
+        self.route(1, {"messageId": "m1", "status": "completed", "destination": ["PreprocessingWorker/run_preprocessing/p1"], "data": {}})
+        delivered = decodeHeader(self.ends[2].recv_bytes())
+        self.assertIsNotNone(delivered["jobId"])
+        self.route(2, {"messageId": "m1", "status": "completed", "reason": "DONE", "destination": ["supervisor"], "jobId": delivered["jobId"]})
+
+        self.route(3, {"messageId": "q", "status": "processing", "destination": ["supervisor/getJobs/p1"], "data": {}})
+        reply = decodeMessage(self.ends[3].recv_bytes())
+        self.assertEqual(reply["messageId"], "q")
+        self.assertEqual(reply["destination"], ["RestApiWorker/onProcessed"])
+        [job] = reply["data"]
+        self.assertEqual(job["jobId"], delivered["jobId"])
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["stages"][0]["pid"], 2)
+
+    def test_reply_is_routed_to_the_asking_instance(self):
+        """Test that the /jobs answer takes credit like other messages and goes only to the instance that asked."""
+        other = add_worker(self.supervisor, 4, "RestApiWorker")
+        self.supervisor.router.in_flight[3] = 1
+        self.route(3, {"messageId": "q", "status": "processing", "destination": ["supervisor/getJobs/p1"], "data": {}})
+        self.assertFalse(self.ends[3].poll())
+        self.assertFalse(other.poll())
+
+        self.route(3, {"messageId": "x", "status": "completed", "reason": "DONE", "destination": ["supervisor"]})
+        self.assertEqual(decodeMessage(self.ends[3].recv_bytes())["messageId"], "q")
+        self.assertFalse(other.poll())
+        self.assertEqual(self.supervisor.router.in_flight[3], 1)
+        self.route(3, {"messageId": "q", "status": "completed", "reason": "DONE", "destination": ["supervisor"]})
+        self.assertEqual(self.supervisor.pending_messages["RestApiWorker"], [])
+
+    def test_other_senders_are_not_tracked(self):
+        """Test that messages from non-origin workers without a job stay out of the tracker."""
+        self.route(3, {"messageId": "m2", "status": "processing", "destination": ["PreprocessingWorker/getPreprocessingStats/p1"], "data": {}})
+        self.assertNotIn("jobId", decodeHeader(self.ends[2].recv_bytes()))
+        self.assertEqual(self.supervisor.job_tracker.jobs, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
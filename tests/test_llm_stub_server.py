@@ -0,0 +1,97 @@
+import json
+import unittest
+import sys
+import os
+import urllib.error
+import urllib.request
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.augmentationParser import format_items, parse_augmentation
+from utils.llmStubServer import LLMStubServer
+
+PATH = "/openai/deployments/stub/chat/completions?api-version=2024-10-21"
+
+
+def post(server, body):
+    request = urllib.request.Request(
+        server.url + PATH,
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json", "api-key": "test"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, dict(response.headers), json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, dict(error.headers), json.loads(error.read())
+
+
+def chat(content, **extra):
+    return {"model": "stub", "messages": [{"role": "user", "content": content}], **extra}
+
+
+class TestLLMStubServer(unittest.TestCase):
+    def setUp(self):
+        self.server = LLMStubServer(port=0).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def test_augmentation_reply_parses(self):
+        """Test that an augmentation prompt gets one item per post id."""
+        posts = {0: "harga naik", 1: "gw ga tau"}
+        status, _, body = post(self.server, chat(f"Topic: x\n    Posts: {format_items(posts)}\n", response_format={"type": "json_object"}))
+        self.assertEqual(status, 200)
+        content = body["choices"][0]["message"]["content"]
+        self.assertEqual(parse_augmentation(content, [0, 1]), posts)
+        self.assertGreater(body["usage"]["total_tokens"], 0)
+
+    def test_context_reply_has_one_entry_per_topic(self):
+        """Test that the LLMWorker context prompt gets a JSON list of kata_kunci/kalimat."""
+        prompt = (
+            "kata kunci berikut: [['harga', 'beras', 'naik'], ['banjir', 'jakarta', 'hujan']] "
+            "Buatkan dengan format JSON ... yaitu: 2. Berikut ini adalah format JSON-nya: kata_kunci kalimat"
+        )
+        _, _, body = post(self.server, chat(prompt))
+        reply = json.loads(body["choices"][0]["message"]["content"])
+        self.assertEqual(len(reply), 2)
+        self.assertTrue(reply[0]["kata_kunci"].startswith("harga"))
+
+    def test_responses_are_deterministic(self):
+        """Test that the same seed and body give the same explanation."""
+        body = chat("Berikan penjelasan ... di Indonesia: banjir.")
+        first = post(self.server, body)[2]["choices"][0]["message"]["content"]
+        other = LLMStubServer(port=0).start()
+        try:
+            second = post(other, body)[2]["choices"][0]["message"]["content"]
+        finally:
+            other.stop()
+        self.assertEqual(first, second)
+
+    def test_injected_429_has_retry_after(self):
+        """Test that throttling answers 429 with Retry-After headers."""
+        self.server.rate_429 = 1.0
+        self.server.retry_after = 2.5
+        status, headers, _ = post(self.server, chat("halo"))
+        headers = {key.lower(): value for key, value in headers.items()}
+        self.assertEqual(status, 429)
+        self.assertEqual(headers["retry-after-ms"], "2500")
+        self.assertEqual(self.server.stats["throttled"], 1)
+
+    def test_rpm_budget(self):
+        """Test that requests beyond the per-minute budget are throttled."""
+        self.server.rpm = 2
+        statuses = [post(self.server, chat(f"halo {i}"))[0] for i in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+
+    def test_unknown_path(self):
+        """Test that only chat completions are served."""
+        request = urllib.request.Request(self.server.url + "/v1/embeddings", data=b"{}")
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            urllib.request.urlopen(request, timeout=5)
+        self.assertEqual(context.exception.code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
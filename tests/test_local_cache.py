@@ -0,0 +1,132 @@
+import unittest
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.localCache import LocalCache
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self):
+        return self
+
+    def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    def set(self, key, value):
+        self.store[key] = value
+
+    def execute(self):
+        pass
+
+
+class TestLocalCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_set_and_get_many(self):
+        """Test that only stored keys are returned."""
+        cache = LocalCache(self.path, "augmentation")
+        cache.set_many({"a": "Ini adalah uji coba.", "b": ["x", "y"]})
+
+        self.assertEqual(cache.get_many(["a", "b", "c"]), {"a": "Ini adalah uji coba.", "b": ["x", "y"]})
+        self.assertIsNone(cache.get("c"))
+        cache.close()
+
+    def test_namespaces_are_isolated(self):
+        """Test that two namespaces in one file do not see each other's keys."""
+        first = LocalCache(self.path, "augmentation")
+        second = LocalCache(self.path, "explanation")
+        first.set("a", 1)
+
+        self.assertEqual(second.get_many(["a"]), {})
+        first.close()
+        second.close()
+
+    def test_expired_entries_are_missing(self):
+        """Test that entries older than the TTL are not returned."""
+        cache = LocalCache(self.path, "augmentation", ttl=60)
+        cache.set("a", 1)
+        cache._db.execute("UPDATE cache SET created_at = ?", (time.time() - 120,))
+
+        self.assertEqual(cache.get_many(["a"]), {})
+        cache.close()
+
+    def test_evicts_least_recently_read(self):
+        """Test that size eviction keeps the most recently read entries."""
+        cache = LocalCache(self.path, "augmentation", max_entries=2)
+        cache.set("a", 1)
+        time.sleep(0.01)
+        cache.set("b", 2)
+        time.sleep(0.01)
+        cache.get("a")
+        time.sleep(0.01)
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get_many(["a", "b", "c"]), {"a": 1, "c": 3})
+        cache.close()
+
+    def test_concurrent_writers_share_the_file(self):
+        """Test that instances writing one file at the same time wait for each other instead of failing."""
+        caches = [LocalCache(self.path, "augmentation", timeout=10) for _ in range(4)]
+        self.assertEqual(caches[0]._db.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        errors = []
+
+        def write(cache, prefix):
+            try:
+                for index in range(50):
+                    cache.set_many({f"{prefix}{index}-{n}": n for n in range(20)})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(cache, prefix)) for prefix, cache in enumerate(caches)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(caches[0].get_many([f"{prefix}49-19" for prefix in range(4)])), 4)
+        for cache in caches:
+            cache.close()
+
+    def test_eviction_runs_in_passes(self):
+        """Test that size eviction waits for about 1% of the limit in new rows."""
+        cache = LocalCache(self.path, "augmentation", max_entries=200)
+        count = lambda: cache._db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        cache.set_many({str(index): index for index in range(201)})
+        self.assertEqual(count(), 200)
+        cache.set("a", 1)
+        self.assertEqual(count(), 201)
+        cache.set("b", 2)
+        self.assertEqual(count(), 200)
+        cache.close()
+
+    def test_redis_tier_is_filled_from_disk(self):
+        """Test that disk hits are written through to the Redis tier."""
+        LocalCache(self.path, "augmentation").set("a", "teks")
+        redis_client = FakeRedis()
+        cache = LocalCache(self.path, "augmentation", redis_client=redis_client)
+
+        self.assertEqual(cache.get("a"), "teks")
+        self.assertIn("CACHE_AUGMENTATION_a", redis_client.store)
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import unittest
+import sys
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.pendingStore import PendingStore
+from utils.handleMessage import encodeMessage, decodeHeader, setSharedMemoryThreshold
+
+
+def received(message_id, destination="ETMWorker/run_etm/project", **extra):
+    frame = encodeMessage({"messageId": message_id, "status": "completed", "destination": [destination], "data": {"n": message_id}})
+    return {**decodeHeader(frame), "frame": frame, **extra}
+
+
+class TestPendingStore(unittest.TestCase):
+    def setUp(self):
+        setSharedMemoryThreshold(0)
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "pending.wal")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_messages_keep_send_order_per_worker(self):
+        """Test that each worker type sees its pending messages in the order they were sent."""
+        store = PendingStore()
+        for message_id in ["a", "b", "c"]:
+            store.add("ETMWorker", received(message_id))
+        store.add("LLMWorker", received("x"))
+        store.remove("ETMWorker", "b")
+        self.assertEqual([m["messageId"] for m in store["ETMWorker"]], ["a", "c"])
+        self.assertEqual([m["messageId"] for m in store["LLMWorker"]], ["x"])
+        self.assertEqual(store["CacheWorker"], [])
+
+    def test_remove_only_touches_the_delivering_instance(self):
+        """Test that a DONE from one instance leaves the copy sent to another one pending."""
+        store = PendingStore()
+        store.add("ETMWorker", received("a", pid=1))
+        store.add("ETMWorker", received("a", pid=2))
+        removed = store.remove("ETMWorker", "a", pid=2)
+        self.assertEqual([m["pid"] for m in removed], [2])
+        self.assertEqual([m["pid"] for m in store["ETMWorker"]], [1])
+        self.assertEqual(store.remove("ETMWorker", "missing"), [])
+
+    def test_discard_drops_only_that_message(self):
+        """Test that dropping a message by identity keeps others with the same messageId."""
+        store = PendingStore()
+        first, second = received("a"), received("a")
+        store.add("ETMWorker", first)
+        store.add("ETMWorker", second)
+        store.discard("ETMWorker", second)
+        self.assertEqual(len(store), 1)
+        self.assertIs(store["ETMWorker"][0], first)
+
+    def test_segments_in_use(self):
+        """Test that the store knows which shared payloads pending messages still need."""
+        store = PendingStore()
+        store.add("ETMWorker", {"messageId": "a", "shm": "psm_1"})
+        self.assertTrue(store.uses_segment("psm_1"))
+        store.remove("ETMWorker", "a")
+        self.assertFalse(store.uses_segment("psm_1"))
+
+    def test_unfinished_messages_are_replayed(self):
+        """Test that a new store on the same log holds what the previous one had not finished."""
+        store = PendingStore(self.path)
+        for message_id in ["a", "b", "c"]:
+            store.add("ETMWorker", received(message_id, pid=1))
+        store.remove("ETMWorker", "a")
+        store.close()
+
+        replayed = PendingStore(self.path)
+        self.assertEqual([m["messageId"] for m in replayed["ETMWorker"]], ["b", "c"])
+        self.assertNotIn("pid", replayed["ETMWorker"][0])
+        self.assertEqual(replayed["ETMWorker"][0]["frame"], store["ETMWorker"][0]["frame"])
+        replayed.add("ETMWorker", received("d"))
+        replayed.remove("ETMWorker", "b")
+        replayed.close()
+        self.assertEqual([m["messageId"] for m in PendingStore(self.path)["ETMWorker"]], ["c", "d"])
+
+    def test_partly_written_record_is_ignored(self):
+        """Test that a record cut off by a crash does not stop the replay of the ones before it."""
+        store = PendingStore(self.path)
+        store.add("ETMWorker", received("a"))
+        store.add("ETMWorker", received("b"))
+        store.close()
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 5)
+        self.assertEqual([m["messageId"] for m in PendingStore(self.path)["ETMWorker"]], ["a"])
+
+    def test_log_is_compacted(self):
+        """Test that acknowledged messages are dropped from the log file."""
+        store = PendingStore(self.path, compact_after=10)
+        store.add("ETMWorker", received("kept"))
+        for index in range(50):
+            store.add("ETMWorker", received(str(index)))
+            store.remove("ETMWorker", str(index))
+        store.close()
+        size = os.path.getsize(self.path)
+        self.assertLess(size, 6 * len(received("kept")["frame"]))
+        self.assertEqual([m["messageId"] for m in PendingStore(self.path)["ETMWorker"]], ["kept"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import time
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# and this directory for the shared supervisor fixtures
+sys.path.insert(0, os.path.dirname(__file__))
+
+from utils.preload import preload, preload_modules, stemmer, root_words
+
+try:
+    import Sastrawi
+except ImportError:
+    Sastrawi = None
+
+from supervisor_fixtures import Supervisor, bare_supervisor, add_worker
+
+
+class TestPreload(unittest.TestCase):
+    def test_modules_are_imported_and_timed(self):
+        """Test that preloaded modules end up in sys.modules with their import time."""
+        timings = preload_modules(["json", "xml.dom.minidom"])
+        self.assertEqual(set(timings), {"json", "xml.dom.minidom"})
+        self.assertIn("xml.dom.minidom", sys.modules)
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+
+    def test_missing_module_is_skipped(self):
+        """Test that a module that is not installed does not stop the rest from loading."""
+        timings = preload_modules(["no_such_module_here", "json"])
+        self.assertEqual(list(timings), ["json"])
+
+    @unittest.skipIf(Sastrawi is None, "Sastrawi is not installed")
+    def test_stemmer_is_built_once(self):
+        """Test that the stemmer and its dictionary are shared by every caller in the process."""
+        self.assertIs(stemmer(), stemmer())
+        self.assertIs(root_words(), root_words())
+        self.assertEqual(stemmer().stem("memakan"), "makan")
+        timings = preload({"preload": [], "preload_stemmer": True})
+        self.assertIn("stemmer", timings)
+
+
+@unittest.skipIf(Supervisor is None, "supervisor dependencies are not installed")
+class TestStartupReport(unittest.TestCase):
+    def test_ready_time_is_recorded_once(self):
+        """Test that the first credit advertisement marks when a worker finished starting."""
+        supervisor = bare_supervisor()
+        started = time.monotonic() - 3
+        add_worker(supervisor, 1, "ETMWorker", started=started)
+        supervisor.set_credit(1, 1)
+        ready = supervisor._workers[1]["ready"]
+        self.assertGreaterEqual(ready - started, 3)
+        supervisor.set_credit(1, 2)
+        self.assertEqual(supervisor._workers[1]["ready"], ready)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+import sys
+import os
+from types import SimpleNamespace
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
+
+from utils.localCache import LocalCache
+from utils.preload import stemmer
+from utils.stageTimer import StageTimer
+from workers.PreprocessingWorker import PreprocessingWorker, PRON, CURATED_STOPWORDS
+
+
+class FakeCompletions:
+    """Answers every augmentation prompt with the posts rewritten in upper case, and any other prompt with a fixed text."""
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.prompts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, **request):
+        prompt = request["messages"][-1]["content"]
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if "Posts: " not in prompt:
+            content = "penjelasan"
+        else:
+            posts = json.loads(prompt.split("Posts: ", 1)[1].split("\n", 1)[0])
+            content = json.dumps({"items": [{"id": post["id"], "text": post["text"].upper()} for post in posts]})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def make_worker(completions=None):
+    """A PreprocessingWorker with its text stages set up and a fake LLM client, without a connection."""
+    worker = PreprocessingWorker()
+    worker.stopwords = frozenset(StopWordRemoverFactory().get_stop_words() + PRON + CURATED_STOPWORDS)
+    worker.stemmer = stemmer()
+    worker.model_name = "test-model"
+    worker.async_client = SimpleNamespace(chat=SimpleNamespace(completions=completions or FakeCompletions()))
+    return worker
+
+
+class TestStopwordRemoval(unittest.TestCase):
+    def setUp(self):
+        self.worker = make_worker()
+
+    def test_filters_words_of_multi_word_tokens(self):
+        """Test that every word of a multi-word slang expansion is checked on its own."""
+        self.assertEqual(self.worker.stopword_removal([["apa sih", "makan", "tidak apa"]]), [["makan"]])
+
+    def test_normalization_splits_expansions(self):
+        """Test that slang expanding to several words comes out as separate tokens."""
+        self.assertEqual(self.worker.normalization([["yadah", "makan"]]), [["iya", "deh", "makan"]])
+
+
+class TestAugmentation(unittest.TestCase):
+    def setUp(self):
+        self.completions = FakeCompletions()
+        self.worker = make_worker(self.completions)
+
+    def test_failed_explanation_does_not_fail_the_batch(self):
+        """Test that a batch is still augmented, without an explanation, when the shared explanation task failed."""
+        async def augment():
+            async def fail():
+                raise RuntimeError("explanation unavailable")
+            explanation = asyncio.ensure_future(fail())
+            return await self.worker.create_augmentation_async(
+                ["makan nasi", "minum teh"], 2, 0.5, 100, 1, "kuliner", explanation
+            )
+
+        self.assertEqual(asyncio.run(augment()), ["MAKAN NASI", "MINUM TEH"])
+        self.assertIn("Explanation: \n", self.completions.prompts[0])
+
+    def test_formality_check_runs_off_the_event_loop(self):
+        """Test that the formality pass runs on the worker's executor, not the thread of the event loop."""
+        threads = []
+
+        class Formality:
+            def needs_rewrite(self, tweet):
+                threads.append(threading.current_thread())
+                return tweet != "formal"
+
+        self.worker.formality = Formality()
+        result = asyncio.run(self.worker.augment_all_batches(["formal", "gw laper"], "kuliner"))
+
+        self.assertEqual(result, ["formal", "GW LAPER"])
+        self.assertNotIn(threading.main_thread(), threads)
+
+
+class TestTokenizeChunk(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.completions = FakeCompletions()
+        self.worker = make_worker(self.completions)
+        self.worker.token_cache = LocalCache(os.path.join(directory, "cache.sqlite3"), "tokens")
+        self.addCleanup(self.worker.token_cache.close)
+        self.tweets = [
+            {"full_text": "harga beras naik", "tweet_url": "https://x.com/a/status/1"},
+            {"full_text": "kereta terlambat lagi"},
+        ]
+
+    def tokenize(self, tweets, keyword="pangan", augment=True):
+        stats = {}
+        tokens = asyncio.run(self.worker.tokenize_chunk(tweets, keyword, StageTimer(), stats, augment=augment))
+        return tokens, stats
+
+    def augmentation_prompts(self):
+        return [prompt for prompt in self.completions.prompts if "Posts: " in prompt]
+
+    def test_miss_augments_and_caches(self):
+        """Test that unseen tweets are augmented, preprocessed and written to the token cache."""
+        tokens, stats = self.tokenize(self.tweets)
+
+        self.assertEqual(tokens, [["harga", "beras", "naik"], ["kereta", "lambat", "lagi"]])
+        self.assertEqual(stats["token_hits"], 0)
+        self.assertEqual(len(self.augmentation_prompts()), 1)
+        keys = [self.worker.token_cache_key(tweet, "pangan") for tweet in self.tweets]
+        self.assertEqual(self.worker.token_cache.get_many(keys), dict(zip(keys, tokens)))
+
+    def test_hit_skips_augmentation(self):
+        """Test that tweets seen for the same keyword come from the cache without another LLM call."""
+        first, _ = self.tokenize(self.tweets)
+        self.completions.prompts.clear()
+
+        tokens, stats = self.tokenize(self.tweets + [{"full_text": "tiket kereta habis"}])
+
+        self.assertEqual(tokens[:2], first)
+        self.assertEqual(stats["token_hits"], 2)
+        self.assertEqual(len(self.augmentation_prompts()), 1)
+        self.assertNotIn("HARGA BERAS NAIK", self.augmentation_prompts()[0])
+
+    def test_keys_depend_on_keyword_and_identity(self):
+        """Test that a tweet's key follows its URL, or its whitespace-normalized text, and the keyword."""
+        tweet = self.tweets[0]
+        key = self.worker.token_cache_key(tweet, "pangan")
+
+        self.assertEqual(key, self.worker.token_cache_key({**tweet, "full_text": "other text"}, "Pangan"))
+        self.assertNotEqual(key, self.worker.token_cache_key(tweet, "kereta"))
+        self.assertEqual(
+            self.worker.token_cache_key({"full_text": "kereta  terlambat lagi "}, "pangan"),
+            self.worker.token_cache_key(self.tweets[1], "pangan"),
+        )
+
+    def test_without_augmentation(self):
+        """Test that augment=False preprocesses the original text and does not reuse augmented tokens."""
+        self.tokenize(self.tweets)
+        self.completions.prompts.clear()
+
+        tokens, stats = self.tokenize(self.tweets, augment=False)
+
+        self.assertEqual(self.completions.prompts, [])
+        self.assertEqual(stats["token_hits"], 0)
+        self.assertEqual(tokens, [["harga", "beras", "naik"], ["kereta", "lambat", "lagi"]])
+        self.assertNotEqual(self.worker.token_cache_key(self.tweets[0], "pangan", augmented=False), self.worker.token_cache_key(self.tweets[0], "pangan"))
+        self.assertEqual(self.tokenize(self.tweets, augment=False)[1]["token_hits"], 2)
+
+
+class CountingStemmer:
+    def __init__(self, stemmer):
+        self.stemmer = stemmer
+        self.words = []
+
+    def stem(self, word):
+        self.words.append(word)
+        return self.stemmer.stem(word)
+
+
+class TestUnsampled(unittest.TestCase):
+    def setUp(self):
+        self.completions = FakeCompletions()
+        self.worker = make_worker(self.completions)
+        self.worker.stemmer = CountingStemmer(self.worker.stemmer)
+        self.worker.chunk_size = 2
+
+    def test_unsampled_tweets_skip_the_llm_and_stem_each_word_once(self):
+        """Test that unsampled tweets keep only vocabulary words and every distinct word is stemmed once across chunks."""
+        tweets = [
+            {"full_text": "harga beras"},
+            {"full_text": "Harga beras naik di pasar"},
+            {"full_text": "beras mahal https://t.co/x"},
+            {"full_text": "cuaca cerah"},
+            {"full_text": "Harga beras naik di pasar"},
+        ]
+        representative = [0, 1, 2, 3, 1]
+
+        unsampled = asyncio.run(self.worker.prepare_unsampled(
+            tweets, [1, 2, 3], representative, {0: 1, 1: 2, 2: 1, 3: 1}, ["harga beras", "naik pasar"], StageTimer()
+        ))
+
+        self.assertEqual(self.completions.prompts, [])
+        self.assertEqual(
+            [(tweet['raw_text'], tweet['full_text'], tweet['duplicate_count']) for tweet in unsampled],
+            [
+                ("Harga beras naik di pasar", "harga beras naik pasar", 2),
+                ("beras mahal https://t.co/x", "beras", 1),
+                ("Harga beras naik di pasar", "harga beras naik pasar", 2),
+            ],
+        )
+        self.assertEqual(len(self.worker.stemmer.words), len(set(self.worker.stemmer.words)))
+
+
+class TestJobStats(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.config = {"augmentation_cache": {"path": os.path.join(directory, "cache.sqlite3")}}
+
+    def test_any_instance_answers_for_a_job(self):
+        """Test that stats recorded by one instance are returned by another one sharing the cache file."""
+        first, second = make_worker(), make_worker()
+        for worker in (first, second):
+            worker.stats_cache = worker.create_cache(self.config, "job_stats", max_entries=worker.max_job_stats)
+            self.addCleanup(worker.stats_cache.close)
+        sent = []
+        second.sendToOtherWorker = lambda destination, messageId, data=None: sent.append(data)
+
+        summary = first.record_job_stats("p1", "pangan", StageTimer(), {"hits": 1}, 10, 8)
+        second.getPreprocessingStats("p1", {}, {"messageId": "m"})
+        second.getPreprocessingStats("p2", {}, {"messageId": "m"})
+
+        self.assertEqual(sent, [summary, {}])
+        self.assertEqual(first.job_stats, {})
+
+
+class TestConcurrentProjects(unittest.TestCase):
+    def setUp(self):
+        self.dataset_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dataset_root, ignore_errors=True)
+        self.completions = FakeCompletions(delay=0.05)
+        self.worker = make_worker(self.completions)
+        self.worker.dataset_root = self.dataset_root
+        self.sent = []
+        self.worker.sendToOtherWorker = lambda destination, messageId, data=None: self.sent.append((destination, data))
+
+    def project(self, project_id, words):
+        tweets = [{"full_text": f"{words[i % len(words)]} {words[(i + 1) % len(words)]} hari ini {i}"} for i in range(6)]
+        return {"keyword": project_id, "start_date": "2024-01-01", "end_date": "2024-01-31", "tweets": tweets}
+
+    def test_projects_are_preprocessed_at_the_same_time(self):
+        """Test that two projects overlap on the LLM and each ends up with its own corpus directory."""
+        async def run():
+            await asyncio.gather(
+                self.worker.run_preprocessing("p1", self.project("p1", ["beras", "harga", "pasar"]), {"messageId": "m1"}),
+                self.worker.run_preprocessing("p2", self.project("p2", ["kereta", "stasiun", "tiket"]), {"messageId": "m2"}),
+            )
+
+        asyncio.run(run())
+
+        # one LLM call at a time per project, so two in flight means both jobs ran together
+        self.assertEqual(self.completions.max_in_flight, 2)
+        self.assertEqual(sorted(destination[0] for destination, _ in self.sent), ["ETMWorker/run_etm/p1", "ETMWorker/run_etm/p2"])
+        for destination, data in self.sent:
+            project_id = destination[0].rsplit("/", 1)[1]
+            self.assertEqual(data["dataset_path"], os.path.join(self.dataset_root, project_id))
+            with open(os.path.join(data["dataset_path"], "corpus.tsv")) as corpus:
+                self.assertEqual([line.split("\t")[0] for line in corpus], data["tweets"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.router import Router
+
+
+class TestRouter(unittest.TestCase):
+    def test_round_robin_takes_turns(self):
+        """Test that round robin cycles through every instance."""
+        router = Router("round_robin")
+        picks = [router.pick("ETMWorker", [30, 10, 20], "ETMWorker/run_etm/p") for _ in range(6)]
+        self.assertEqual(picks, [10, 20, 30, 10, 20, 30])
+
+    def test_least_outstanding_avoids_busy_instances(self):
+        """Test that new work goes to the instance with the fewest messages in flight."""
+        router = Router("least_outstanding")
+        first = router.pick("PreprocessingWorker", [1, 2], "PreprocessingWorker/run_preprocessing/a")
+        second = router.pick("PreprocessingWorker", [1, 2], "PreprocessingWorker/run_preprocessing/b")
+        self.assertNotEqual(first, second)
+        router.done(second)
+        self.assertEqual(router.pick("PreprocessingWorker", [1, 2], "PreprocessingWorker/run_preprocessing/c"), second)
+        self.assertEqual(router.in_flight, {first: 1, second: 1})
+
+    def test_sticky_keeps_a_project_on_one_instance(self):
+        """Test that messages of one project always reach the same instance."""
+        router = Router("sticky")
+        picks = {router.pick("ETMWorker", [1, 2, 3, 4], "ETMWorker/run_etm/project-7") for _ in range(10)}
+        self.assertEqual(len(picks), 1)
+        projects = {router.pick("ETMWorker", [1, 2, 3, 4], f"ETMWorker/run_etm/project-{index}") for index in range(40)}
+        self.assertGreater(len(projects), 1)
+
+    def test_sticky_moves_only_projects_of_a_removed_instance(self):
+        """Test that rendezvous hashing keeps other projects in place when an instance disappears."""
+        router = Router("sticky")
+        destinations = [f"ETMWorker/run_etm/project-{index}" for index in range(50)]
+        before = {d: router.pick("ETMWorker", [1, 2, 3], d) for d in destinations}
+        after = {d: router.pick("ETMWorker", [1, 2], d) for d in destinations}
+        for destination, pid in before.items():
+            if pid != 3:
+                self.assertEqual(after[destination], pid)
+
+    def test_per_worker_strategy_and_validation(self):
+        """Test that a worker type can override the default strategy and unknown ones are rejected."""
+        router = Router("round_robin")
+        router.set_strategy("ETMWorker", "sticky")
+        self.assertEqual(router.strategy("ETMWorker"), "sticky")
+        self.assertEqual(router.strategy("LLMWorker"), "round_robin")
+        with self.assertRaises(ValueError):
+            router.set_strategy("ETMWorker", "random")
+
+    def test_done_never_goes_negative_and_forget_drops_counter(self):
+        """Test that extra completions are ignored and dead instances are forgotten."""
+        router = Router()
+        router.done(5)
+        self.assertEqual(router.in_flight.get(5, 0), 0)
+        router.pick("LLMWorker", [5])
+        router.forget(5)
+        self.assertNotIn(5, router.in_flight)
+
+    def test_no_instances(self):
+        """Test that picking from no instances returns None."""
+        self.assertIsNone(Router().pick("LLMWorker", []))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.sampling import allocate, day_of, stratified_sample
+
+
+class TestDayOf(unittest.TestCase):
+    def test_twitter_format(self):
+        """Test that Twitter's created_at format maps to its calendar day."""
+        self.assertEqual(day_of("Mon Jan 01 10:00:00 +0000 2024"), "2024-01-01")
+
+    def test_iso_string_and_datetime(self):
+        """Test that ISO strings and datetime values map to their calendar day."""
+        self.assertEqual(day_of("2024-03-05T08:00:00Z"), "2024-03-05")
+        self.assertEqual(day_of(datetime(2024, 3, 5, 23, 59)), "2024-03-05")
+
+    def test_unknown_values(self):
+        """Test that missing or unparseable dates share one stratum."""
+        self.assertEqual(day_of(None), "unknown")
+        self.assertEqual(day_of("yesterday"), "unknown")
+
+
+class TestAllocate(unittest.TestCase):
+    def test_quotas_are_proportional_and_sum_to_k(self):
+        """Test that slots follow stratum sizes and add up to the cap."""
+        quotas = allocate({"d1": 100, "d2": 10, "d3": 1}, 20)
+        self.assertEqual(sum(quotas.values()), 20)
+        self.assertEqual(quotas, {"d1": 17, "d2": 2, "d3": 1})
+
+    def test_every_stratum_keeps_one_item(self):
+        """Test that a quiet day is not dropped when there are enough slots."""
+        quotas = allocate({"busy": 1000, "quiet": 1}, 10)
+        self.assertEqual(quotas["quiet"], 1)
+        self.assertEqual(quotas["busy"], 9)
+
+    def test_cap_above_total_keeps_everything(self):
+        """Test that a cap larger than the population keeps every item."""
+        self.assertEqual(allocate({"a": 3, "b": 2}, 10), {"a": 3, "b": 2})
+
+
+class TestStratifiedSample(unittest.TestCase):
+    def setUp(self):
+        self.strata = ["d1"] * 600 + ["d2"] * 300 + ["d3"] * 100
+
+    def test_sample_size_and_proportions(self):
+        """Test that the sample has the cap's size and each day's share."""
+        sample = stratified_sample(self.strata, 100, seed=1)
+        self.assertEqual(len(sample), 100)
+        self.assertEqual(len(set(sample)), 100)
+        per_day = {}
+        for index in sample:
+            per_day[self.strata[index]] = per_day.get(self.strata[index], 0) + 1
+        self.assertEqual(per_day, {"d1": 60, "d2": 30, "d3": 10})
+
+    def test_indices_are_sorted_and_deterministic(self):
+        """Test that a seed always picks the same sorted indices."""
+        first = stratified_sample(self.strata, 50, seed=7)
+        self.assertEqual(first, sorted(first))
+        self.assertEqual(first, stratified_sample(self.strata, 50, seed=7))
+        self.assertNotEqual(first, stratified_sample(self.strata, 50, seed=8))
+
+    def test_no_cap_returns_everything(self):
+        """Test that a zero or oversized cap keeps every item."""
+        self.assertEqual(stratified_sample(self.strata, 0), list(range(1000)))
+        self.assertEqual(stratified_sample(self.strata, 5000), list(range(1000)))
+
+    def test_reservoir_reaches_late_items(self):
+        """Test that items near the end of a stratum can still be picked."""
+        picked = set()
+        for seed in range(20):
+            picked.update(stratified_sample(["d"] * 100, 10, seed=seed))
+        self.assertTrue(any(index >= 90 for index in picked))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import time
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from utils.stageTimer import StageTimer
+except ImportError:  # psutil missing
+    StageTimer = None
+
+
+@unittest.skipIf(StageTimer is None, "psutil is not installed")
+class TestStageTimer(unittest.TestCase):
+    def test_stage_records_wall_time_and_items(self):
+        """Test that a timed block records its wall time and item count."""
+        timer = StageTimer()
+        with timer.stage("sleep", items=10):
+            time.sleep(0.05)
+        stage = timer.summary()["stages"]["sleep"]
+        self.assertGreaterEqual(stage["wall_s"], 0.04)
+        self.assertEqual(stage["items"], 10)
+        self.assertEqual(stage["calls"], 1)
+        self.assertGreater(stage["items_per_s"], 0)
+
+    def test_repeated_stage_is_accumulated(self):
+        """Test that a stage run once per chunk adds up under one name."""
+        timer = StageTimer()
+        for _ in range(3):
+            with timer.stage("chunk") as record:
+                record["items"] = 5
+        stage = timer.summary()["stages"]["chunk"]
+        self.assertEqual(stage["calls"], 3)
+        self.assertEqual(stage["items"], 15)
+
+    def test_cpu_time_is_recorded(self):
+        """Test that busy work shows up as CPU time."""
+        timer = StageTimer()
+        with timer.stage("busy"):
+            sum(i * i for i in range(300000))
+        self.assertGreater(timer.summary()["stages"]["busy"]["cpu_s"], 0)
+
+    def test_stage_is_recorded_when_it_raises(self):
+        """Test that a failing stage is still timed."""
+        timer = StageTimer()
+        with self.assertRaises(ValueError):
+            with timer.stage("failing"):
+                raise ValueError("boom")
+        self.assertIn("failing", timer.summary()["stages"])
+
+    def test_format_orders_slowest_first(self):
+        """Test that the log digest starts with the slowest stage."""
+        timer = StageTimer()
+        timer.add("fast", wall=0.1)
+        timer.add("slow", wall=2.0)
+        self.assertTrue(timer.format().startswith("slow="))
+
+
+if __name__ == '__main__':
+    unittest.main()
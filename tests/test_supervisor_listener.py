@@ -0,0 +1,67 @@
+import multiprocessing
+import threading
+import queue
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+# and this directory for the shared supervisor fixtures
+sys.path.insert(0, os.path.dirname(__file__))
+
+from supervisor_fixtures import Supervisor, bare_supervisor, add_worker
+from utils.handleMessage import encodeMessage
+
+
+@unittest.skipIf(Supervisor is None, "supervisor dependencies are not installed")
+class TestSupervisorListener(unittest.TestCase):
+    def setUp(self):
+        supervisor = bare_supervisor()
+        supervisor._wakeup_reader, supervisor._wakeup = multiprocessing.Pipe(duplex=False)
+        self.handled = queue.Queue()
+        supervisor.handle_worker_message = lambda message, pid: self.handled.put((pid, message['messageId'], threading.current_thread()))
+        self.supervisor = supervisor
+        self.ends = {}
+        threading.Thread(target=supervisor._listen_loop, daemon=True).start()
+
+    def add_worker(self, pid):
+        self.ends[pid] = add_worker(self.supervisor, pid, "CacheWorker")
+        self.supervisor._wake()
+
+    def send(self, pid, message_id):
+        self.ends[pid].send_bytes(encodeMessage({"messageId": message_id, "status": "completed", "destination": ["supervisor"]}))
+
+    def test_one_thread_reads_every_worker(self):
+        """Test that frames from all workers are handled by the single listener thread."""
+        self.add_worker(1)
+        self.add_worker(2)
+        self.send(1, "a")
+        self.send(2, "b")
+        handled = [self.handled.get(timeout=2) for _ in range(2)]
+        self.assertEqual(sorted((pid, message_id) for pid, message_id, _ in handled), [(1, "a"), (2, "b")])
+        self.assertIs(handled[0][2], handled[1][2])
+
+    def test_worker_added_later_is_picked_up(self):
+        """Test that a connection created after the listener started is waited on without a timeout."""
+        self.add_worker(1)
+        self.send(1, "a")
+        self.handled.get(timeout=2)
+        self.add_worker(2)
+        self.send(2, "b")
+        self.assertEqual(self.handled.get(timeout=2)[:2], (2, "b"))
+
+    def test_closed_worker_does_not_stop_the_others(self):
+        """Test that a worker whose pipe closed is skipped while the rest keep being read."""
+        self.add_worker(1)
+        self.add_worker(2)
+        self.ends[1].close()
+        self.send(2, "b")
+        self.assertEqual(self.handled.get(timeout=2)[:2], (2, "b"))
+        self.supervisor._kill_worker(1)
+        self.send(2, "c")
+        self.assertEqual(self.handled.get(timeout=2)[:2], (2, "c"))
+
+
+if __name__ == '__main__':
+    unittest.main()
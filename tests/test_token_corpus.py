@@ -0,0 +1,40 @@
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.tokenCorpus import TokenCorpus
+
+
+class TestTokenCorpus(unittest.TestCase):
+    def test_round_trips_documents(self):
+        """Test that documents come back in order with the same tokens."""
+        corpus = TokenCorpus()
+        corpus.extend([["makan", "nasi"], [], ["nasi", "goreng", "nasi"]])
+
+        self.assertEqual(len(corpus), 3)
+        self.assertEqual(list(corpus), [["makan", "nasi"], [], ["nasi", "goreng", "nasi"]])
+        self.assertEqual(corpus[2], ["nasi", "goreng", "nasi"])
+
+    def test_shares_ids_across_documents(self):
+        """Test that a token gets one id no matter how often it appears."""
+        corpus = TokenCorpus()
+        corpus.add(["nasi", "goreng"])
+        corpus.add(["nasi"])
+
+        self.assertEqual(corpus.id2word, ["nasi", "goreng"])
+        self.assertEqual(corpus.word2id["nasi"], 0)
+
+    def test_tracks_term_frequency(self):
+        """Test that term frequencies cover every added document."""
+        corpus = TokenCorpus()
+        corpus.extend([["nasi", "goreng"], ["nasi", "nasi"]])
+
+        self.assertEqual(corpus.word_freq["nasi"], 3)
+        self.assertEqual(corpus.word_freq["goreng"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import sys
+import os
+
+# Add src to path to import the modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    import numpy
+    from utils.topicInference import bag_of_words, infer_documents
+except ImportError:  # numpy or scipy missing
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "numpy or scipy is not installed")
+class TestTopicInference(unittest.TestCase):
+    def setUp(self):
+        self.vocabulary = ["a", "b", "c", "d"]
+        self.topic_word = numpy.array([
+            [0.45, 0.45, 0.05, 0.05],
+            [0.05, 0.05, 0.45, 0.45],
+        ])
+
+    def test_bag_of_words_counts_known_words(self):
+        """Test that the count matrix sums repeats and ignores unknown words."""
+        counts = bag_of_words(["a b a", ["d", "x"]], {"a": 0, "b": 1, "d": 2})
+        self.assertEqual(counts.toarray().tolist(), [[2, 1, 0], [0, 0, 1]])
+
+    def test_documents_get_their_dominant_topic(self):
+        """Test that documents made of one topic's words are assigned to it."""
+        theta, best, probability = infer_documents(["a b a", "c d d"], self.vocabulary, self.topic_word)
+        self.assertEqual(best.tolist(), [0, 1])
+        self.assertTrue(numpy.all(probability > 0.9))
+        numpy.testing.assert_allclose(theta.sum(axis=1), 1.0)
+
+    def test_unknown_words_keep_the_prior(self):
+        """Test that documents without a known word fall back to the prior."""
+        theta, best, _ = infer_documents(["x y", ""], self.vocabulary, self.topic_word, topic_prior=[0.2, 0.8])
+        numpy.testing.assert_allclose(theta, [[0.2, 0.8], [0.2, 0.8]])
+        self.assertEqual(best.tolist(), [1, 1])
+
+    def test_batches_match_a_single_pass(self):
+        """Test that splitting documents into batches does not change the result."""
+        documents = ["a b", "c d", "a c", "d d b", "b"]
+        whole, _, _ = infer_documents(documents, self.vocabulary, self.topic_word)
+        batched, _, _ = infer_documents(documents, self.vocabulary, self.topic_word, batch_size=2)
+        numpy.testing.assert_allclose(whole, batched)
+
+
+if __name__ == '__main__':
+    unittest.main()